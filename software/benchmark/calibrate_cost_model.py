@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+EdgeNPU Cost Model Calibration
+Fit the compiler's cost model to RTL simulation cycle counts
+
+This script:
+1. Builds single-layer programs (convs, dwconvs, FCs across shapes)
+2. Compiles and runs each through RTL simulation (rtl_benchmark)
+3. Fits the free CostModel parameters by least squares
+4. Writes a versioned calibration file (load with load_calibration)
+"""
+
+import sys
+import io
+import contextlib
+from pathlib import Path
+from dataclasses import dataclass, asdict, replace
+from typing import List, Dict, Optional
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compiler import NPUCompiler
+from compiler.frontend import IRBuilder, IRGraph
+from compiler.backend.cost_model import (HardwareConfig, read_calibration,
+                                         save_calibration)
+from benchmark.rtl_benchmark import RTLBenchmark, RTLSimConfig
+
+
+@dataclass
+class MicroLayer:
+    """Single-layer calibration program"""
+    kind: str                          # conv, dwconv, fc
+    in_ch: int
+    out_ch: int
+    hw: int = 1                        # Input height and width
+    kernel: int = 1
+    activation: Optional[str] = 'relu'
+    
+    @property
+    def name(self) -> str:
+        act = f"_{self.activation}" if self.activation else ""
+        if self.kind == 'fc':
+            return f"fc_{self.in_ch}x{self.out_ch}{act}"
+        return f"{self.kind}_{self.in_ch}x{self.out_ch}_{self.hw}_k{self.kernel}{act}"
+
+
+DEFAULT_SUITE: List[MicroLayer] = [
+    MicroLayer('conv', 3, 32, 56, 3),
+    MicroLayer('conv', 16, 16, 28, 3),
+    MicroLayer('conv', 32, 32, 28, 3, activation=None),
+    MicroLayer('conv', 32, 64, 28, 3),
+    MicroLayer('conv', 64, 64, 14, 3),
+    MicroLayer('conv', 64, 128, 14, 1),
+    MicroLayer('conv', 128, 128, 7, 3),
+    MicroLayer('conv', 256, 256, 7, 1),
+    MicroLayer('dwconv', 32, 32, 56, 3),
+    MicroLayer('dwconv', 64, 64, 28, 3),
+    MicroLayer('dwconv', 64, 64, 28, 3, activation=None),
+    MicroLayer('dwconv', 64, 64, 28, 5),
+    MicroLayer('dwconv', 128, 128, 14, 3),
+    MicroLayer('dwconv', 256, 256, 7, 3),
+    MicroLayer('fc', 128, 10, activation=None),
+    MicroLayer('fc', 256, 128),
+    MicroLayer('fc', 512, 256),
+    MicroLayer('fc', 1024, 1000, activation=None),
+]
+
+
+def build_micro_graph(layer: MicroLayer, seed: int = 0) -> IRGraph:
+    """IR graph of a single micro layer with random weights"""
+    rng = np.random.default_rng(seed)
+    builder = IRBuilder(layer.name)
+    
+    if layer.kind == 'fc':
+        x = builder.add_input("input", (1, layer.in_ch))
+        w = builder.add_constant("weight", rng.standard_normal(
+            (layer.out_ch, layer.in_ch)).astype(np.float32))
+        y = builder.fully_connected(x, w, activation=layer.activation)
+    elif layer.kind in ('conv', 'dwconv'):
+        groups = layer.in_ch if layer.kind == 'dwconv' else 1
+        k = layer.kernel
+        x = builder.add_input("input", (1, layer.in_ch, layer.hw, layer.hw))
+        w = builder.add_constant("weight", rng.standard_normal(
+            (layer.out_ch, layer.in_ch // groups, k, k)).astype(np.float32))
+        y = builder.conv2d(x, w, kernel_size=(k, k), padding=(k // 2, k // 2),
+                           groups=groups, activation=layer.activation)
+    else:
+        raise ValueError(f"Unknown micro layer kind: {layer.kind}")
+    
+    builder.add_output(y)
+    return builder.build()
+
+
+@dataclass
+class CalibrationSample:
+    """Measured cycle count of one micro layer"""
+    layer: MicroLayer
+    measured_cycles: int
+
+
+def _param_value(hardware: HardwareConfig, name: str) -> float:
+    if name == 'dma_cycles_per_byte':
+        return 1.0 / hardware.dma_bytes_per_cycle
+    return getattr(hardware, name)
+
+
+def _with_params(hardware: HardwareConfig, values: Dict[str, float]) -> HardwareConfig:
+    """Copy of hardware with the given free parameter values"""
+    changes = dict(values)
+    if 'dma_cycles_per_byte' in changes:
+        cycles_per_byte = changes.pop('dma_cycles_per_byte')
+        changes['dma_bandwidth_gbps'] = 8 * hardware.clock_mhz / (1000 * cycles_per_byte)
+    return replace(hardware, **changes)
+
+
+class CostModelCalibrator:
+    """
+    Fits CostModel parameters to measured micro-layer cycle counts
+    
+    Predictions come from a full compile, so the fit covers everything the
+    scheduler adds on top of the per-op costs (weight tiles, post-op drain).
+    The fit minimizes relative error with Gauss-Newton on finite-difference
+    sensitivities; the model is piecewise linear in these parameters, so a
+    few iterations converge.
+    """
+    
+    # Free parameter -> smallest finite-difference step
+    PARAMETERS = {
+        'tile_switch_cycles': 1.0,
+        'dma_cycles_per_byte': 0.01,
+        'dma_setup_cycles': 1.0,
+        'activation_latency': 1.0,
+    }
+    
+    def __init__(self, hardware: Optional[HardwareConfig] = None,
+                 rtl_config: Optional[RTLSimConfig] = None):
+        self.hardware = hardware or HardwareConfig()
+        self.rtl = RTLBenchmark(rtl_config)
+        self.samples: List[CalibrationSample] = []
+        self.iterations = 0
+    
+    def compile_layer(self, layer: MicroLayer, hardware: Optional[HardwareConfig] = None):
+        """Compile a micro layer (quiet)"""
+        compiler = NPUCompiler(pe_rows=self.hardware.pe_rows, pe_cols=self.hardware.pe_cols,
+                               incremental=False, hardware=hardware or self.hardware)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compiler.compile_graph(build_micro_graph(layer))
+    
+    def measure(self, layers: List[MicroLayer]) -> List[CalibrationSample]:
+        """Run micro layers through RTL simulation and record their cycles"""
+        for layer in layers:
+            binary = self.compile_layer(layer).to_binary()
+            result = self.rtl.benchmark_binary(layer.name, binary)
+            if not result.success or result.total_cycles <= 0:
+                raise RuntimeError(f"RTL simulation of {layer.name} failed: {result.error_msg}")
+            self.add_sample(layer, result.total_cycles)
+        return self.samples
+    
+    def add_sample(self, layer: MicroLayer, measured_cycles: int):
+        """Add a measured cycle count"""
+        self.samples.append(CalibrationSample(layer, measured_cycles))
+    
+    def predict(self, hardware: HardwareConfig) -> np.ndarray:
+        """Compiler-estimated cycles of every sample under hardware"""
+        return np.array([self.compile_layer(s.layer, hardware).estimated_cycles
+                         for s in self.samples], dtype=np.float64)
+    
+    def fit(self, max_iterations: int = 10, tol: float = 1e-4) -> HardwareConfig:
+        """
+        Least-squares fit of the free parameters
+        
+        Returns:
+            Calibrated hardware configuration
+        """
+        if len(self.samples) < len(self.PARAMETERS):
+            raise ValueError(f"Need at least {len(self.PARAMETERS)} samples to fit, "
+                             f"got {len(self.samples)}")
+        
+        names = list(self.PARAMETERS)
+        measured = np.array([s.measured_cycles for s in self.samples], dtype=np.float64)
+        x = np.array([_param_value(self.hardware, n) for n in names])
+        hardware = self.hardware
+        
+        for self.iterations in range(1, max_iterations + 1):
+            base = self.predict(hardware)
+            
+            # Finite-difference sensitivities d(cycles)/d(param)
+            jacobian = np.zeros((len(measured), len(names)))
+            for i, name in enumerate(names):
+                step = max(self.PARAMETERS[name], 0.05 * abs(x[i]))
+                probe = _with_params(hardware, {name: x[i] + step})
+                jacobian[:, i] = (self.predict(probe) - base) / step
+            
+            # Relative residuals so small layers count as much as large ones
+            weights = 1.0 / measured
+            dx = np.linalg.lstsq(jacobian * weights[:, None],
+                                 (measured - base) * weights, rcond=None)[0]
+            
+            new_x = x + dx
+            new_x[names.index('dma_cycles_per_byte')] = max(
+                new_x[names.index('dma_cycles_per_byte')], 1e-3)
+            new_x = np.maximum(new_x, 0.0)
+            
+            converged = np.max(np.abs(new_x - x) / np.maximum(np.abs(x), 1.0)) < tol
+            x = new_x
+            hardware = _with_params(self.hardware, dict(zip(names, x.tolist())))
+            if converged:
+                break
+        
+        return hardware
+    
+    def get_errors(self, hardware: HardwareConfig) -> np.ndarray:
+        """Relative prediction error (%) per sample"""
+        measured = np.array([s.measured_cycles for s in self.samples], dtype=np.float64)
+        return (self.predict(hardware) - measured) / measured * 100
+    
+    def get_stats(self, hardware: HardwareConfig) -> Dict:
+        """Fit statistics"""
+        errors = np.abs(self.get_errors(hardware))
+        return {
+            'samples': len(self.samples),
+            'iterations': self.iterations,
+            'mean_error_pct': float(errors.mean()) if len(errors) else 0.0,
+            'max_error_pct': float(errors.max()) if len(errors) else 0.0,
+        }
+    
+    def save(self, hardware: HardwareConfig, path: str):
+        """Write a calibration file with fit statistics and the samples used"""
+        samples = [{'layer': asdict(s.layer), 'measured_cycles': s.measured_cycles}
+                   for s in self.samples]
+        save_calibration(hardware, path, fit=self.get_stats(hardware), samples=samples)
+    
+    def load_samples(self, path: str):
+        """Reuse the measurements recorded in an earlier calibration file"""
+        for sample in read_calibration(path)['samples']:
+            self.add_sample(MicroLayer(**sample['layer']), sample['measured_cycles'])
+
+
+def print_calibration(calibrator: CostModelCalibrator,
+                      before: HardwareConfig, after: HardwareConfig):
+    """Print per-layer errors and fitted parameters"""
+    errors_before = calibrator.get_errors(before)
+    errors_after = calibrator.get_errors(after)
+    
+    print("\n" + "=" * 72)
+    print("Cost Model Calibration")
+    print("=" * 72)
+    print(f"{'Layer':<32} {'RTL cycles':>12} {'Before':>12} {'After':>12}")
+    print("-" * 72)
+    for sample, eb, ea in zip(calibrator.samples, errors_before, errors_after):
+        print(f"{sample.layer.name:<32} {sample.measured_cycles:>12,} "
+              f"{eb:>+11.1f}% {ea:>+11.1f}%")
+    print("-" * 72)
+    
+    print("\nParameters:")
+    for name in CostModelCalibrator.PARAMETERS:
+        print(f"  {name:<22} {_param_value(before, name):>10.4f} -> "
+              f"{_param_value(after, name):>10.4f}")
+    
+    stats = calibrator.get_stats(after)
+    print(f"\nMean error: {stats['mean_error_pct']:.2f}%  "
+          f"Max error: {stats['max_error_pct']:.2f}%  "
+          f"({stats['iterations']} iterations)")
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='EdgeNPU Cost Model Calibration')
+    parser.add_argument('-o', '--output', default='cost_calibration.json',
+                        help='Calibration file to write')
+    parser.add_argument('--samples', metavar='CALIBRATION',
+                        help='Refit from the measurements in an earlier calibration file '
+                             '(no simulation)')
+    parser.add_argument('--simulator', default='iverilog',
+                        choices=['verilator', 'iverilog', 'vcs'])
+    parser.add_argument('--clock', type=float, default=800, help='Clock MHz')
+    parser.add_argument('--pe-size', type=int, default=16, help='PE array size (NxN)')
+    parser.add_argument('--iterations', type=int, default=10, help='Max fit iterations')
+    
+    args = parser.parse_args()
+    
+    hardware = HardwareConfig(pe_rows=args.pe_size, pe_cols=args.pe_size,
+                              clock_mhz=int(args.clock))
+    rtl_config = RTLSimConfig(simulator=args.simulator,
+                              clock_period_ns=1000 / args.clock)
+    calibrator = CostModelCalibrator(hardware, rtl_config)
+    
+    if args.samples:
+        calibrator.load_samples(args.samples)
+        print(f"Loaded {len(calibrator.samples)} samples from {args.samples}")
+    else:
+        if not calibrator.rtl.check_simulator():
+            print(f"Error: {args.simulator} not found")
+            print("Install with:")
+            print("  Ubuntu: sudo apt install verilator iverilog")
+            print("  macOS: brew install verilator icarus-verilog")
+            return 1
+        try:
+            calibrator.measure(DEFAULT_SUITE)
+        except RuntimeError as e:
+            print(f"Calibration FAILED: {e}")
+            return 1
+    
+    fitted = calibrator.fit(max_iterations=args.iterations)
+    print_calibration(calibrator, hardware, fitted)
+    
+    calibrator.save(fitted, args.output)
+    print(f"\nCalibration written to {args.output}")
+    print("Use with: NPUCompiler(hardware=load_calibration(path))")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -23,6 +23,8 @@ import numpy as np
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from compiler.backend.cost_model import CostModel, HardwareConfig
+
 
 @dataclass
 class NPUConfig:
@@ -54,6 +56,13 @@ class NPUConfig:
     @property
     def peak_tops(self) -> float:
         return self.peak_gops / 1000
+    
+    @property
+    def hardware(self) -> HardwareConfig:
+        """Cost model parameters of this configuration"""
+        return HardwareConfig(pe_rows=self.pe_rows, pe_cols=self.pe_cols,
+                              clock_mhz=self.clock_mhz,
+                              dma_bandwidth_gbps=self.dma_bandwidth_gbps)
 
 
 @dataclass
@@ -133,10 +142,14 @@ class BenchmarkResult:
 class PerformanceModel:
     """
     Cycle-accurate performance model for EdgeNPU
+    
+    Layer estimates come from the compiler's CostModel, so benchmark and
+    scheduler latencies agree for the same hardware configuration.
     """
     
     def __init__(self, config: NPUConfig = None):
         self.config = config or NPUConfig()
+        self.cost_model = CostModel(hardware=self.config.hardware)
     
     def estimate_conv2d_cycles(self, 
                                 in_ch: int, out_ch: int,
@@ -148,76 +161,42 @@ class PerformanceModel:
         Estimate cycles for Conv2D
         Returns: (compute_cycles, memory_cycles, total_cycles)
         """
-        # Output dimensions
         out_h = in_h // stride
         out_w = in_w // stride
         
-        # MACs calculation
-        if groups == 1:
-            # Standard conv
-            macs = out_ch * in_ch * out_h * out_w * kernel_h * kernel_w
-        else:
-            # Depthwise conv
-            macs = out_ch * out_h * out_w * kernel_h * kernel_w
-        
-        # Compute cycles (systolic array)
-        macs_per_cycle = self.config.pe_rows * self.config.pe_cols
-        
-        # Tiling overhead
-        oc_tiles = (out_ch + self.config.pe_cols - 1) // self.config.pe_cols
-        ic_tiles = (in_ch + self.config.pe_rows - 1) // self.config.pe_rows
-        
-        # Base compute cycles
-        compute_cycles = (macs + macs_per_cycle - 1) // macs_per_cycle
-        
-        # Add tiling overhead (weight reload, accumulator drain)
-        tile_overhead = oc_tiles * ic_tiles * 20
-        compute_cycles += tile_overhead
-        
-        # Memory cycles (weight loading + activation I/O)
-        weight_bytes = out_ch * in_ch * kernel_h * kernel_w
-        input_bytes = in_ch * in_h * in_w
-        output_bytes = out_ch * out_h * out_w
-        
-        # DMA bandwidth limited
-        bytes_per_cycle = self.config.dma_bandwidth_gbps * 1e9 / 8 / (self.config.clock_mhz * 1e6)
-        memory_cycles = int((weight_bytes + input_bytes + output_bytes) / bytes_per_cycle)
-        
-        # Total (compute and memory can overlap partially)
-        total_cycles = max(compute_cycles, memory_cycles) + min(compute_cycles, memory_cycles) // 4
-        
-        return compute_cycles, memory_cycles, total_cycles
-
+        cost = self.cost_model.conv_cost(
+            in_ch, out_ch, out_h, out_w, kernel_h, kernel_w, groups=groups,
+            input_bytes=in_ch * in_h * in_w,
+            output_bytes=out_ch * out_h * out_w,
+            weight_bytes=out_ch * (in_ch // groups) * kernel_h * kernel_w
+        )
+        return cost.compute_cycles + cost.overhead_cycles, cost.memory_cycles, cost.total_cycles
+    
     def estimate_fc_cycles(self, in_features: int, out_features: int) -> Tuple[int, int, int]:
         """Estimate cycles for Fully Connected layer"""
-        macs = in_features * out_features
-        macs_per_cycle = self.config.pe_rows * self.config.pe_cols
-        
-        compute_cycles = (macs + macs_per_cycle - 1) // macs_per_cycle + 10
-        
-        weight_bytes = in_features * out_features
-        bytes_per_cycle = self.config.dma_bandwidth_gbps * 1e9 / 8 / (self.config.clock_mhz * 1e6)
-        memory_cycles = int(weight_bytes / bytes_per_cycle)
-        
-        total_cycles = max(compute_cycles, memory_cycles)
-        return compute_cycles, memory_cycles, total_cycles
+        cost = self.cost_model.fc_cost(
+            in_features, out_features,
+            weight_bytes=in_features * out_features,
+            io_bytes=in_features + out_features
+        )
+        return cost.compute_cycles + cost.overhead_cycles, cost.memory_cycles, cost.total_cycles
     
     def estimate_pool_cycles(self, channels: int, h: int, w: int,
                              kernel: int, stride: int) -> int:
         """Estimate cycles for pooling"""
         out_h = h // stride
         out_w = w // stride
-        # Pooling unit processes multiple elements per cycle
-        return channels * out_h * out_w // 16 + 10
+        cost = self.cost_model.pool_cost(channels, out_h, out_w, kernel, kernel,
+                                         io_bytes=channels * (h * w + out_h * out_w))
+        return cost.total_cycles
     
     def estimate_activation_cycles(self, elements: int) -> int:
         """Estimate cycles for activation function"""
-        # Activation unit processes 16 elements per cycle
-        return elements // 16 + 4
+        return self.cost_model.vector_cost(elements, io_bytes=2 * elements).total_cycles
     
     def estimate_batchnorm_cycles(self, elements: int) -> int:
         """Estimate cycles for batch normalization"""
-        return elements // 8 + 10
+        return self.cost_model.vector_cost(elements, passes=2, io_bytes=2 * elements).total_cycles
     
     def estimate_power(self, utilization: float, 
                        weight_kb_used: float,
@@ -504,7 +483,7 @@ class ModelBenchmark:
             ir_graph = optimize_graph(ir_graph, opt_level=2)
             
             # Schedule to get cycle estimates
-            scheduler = Scheduler(self.config.pe_rows, self.config.pe_cols)
+            scheduler = Scheduler(hardware=self.config.hardware)
             schedule = scheduler.schedule(ir_graph)
             
             total_cycles = schedule.total_cycles
@@ -296,6 +296,72 @@ endmodule
         
         return results
     
+    def benchmark_binary(self, model_name: str, model_binary: bytes,
+                         start_time: Optional[float] = None) -> RTLBenchmarkResult:
+        """
+        Run RTL simulation of an already compiled model binary
+        """
+        if start_time is None:
+            start_time = time.time()
+        
+        # Create temp directory
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Generate testbench
+            tb_path = os.path.join(tmpdir, 'npu_benchmark_tb.sv')
+            self.generate_testbench(model_binary, tb_path)
+            
+            # Run simulation
+            print(f"Running {self.config.simulator} simulation...")
+            
+            if self.config.simulator == 'verilator':
+                success, output = self.run_verilator(tb_path, tmpdir)
+            elif self.config.simulator == 'iverilog':
+                success, output = self.run_iverilog(tb_path, tmpdir)
+            else:
+                return RTLBenchmarkResult(
+                    model_name=model_name,
+                    total_cycles=0,
+                    compute_cycles=0,
+                    memory_cycles=0,
+                    latency_us=0,
+                    throughput_fps=0,
+                    simulation_time_s=time.time() - start_time,
+                    success=False,
+                    error_msg=f"Unknown simulator: {self.config.simulator}"
+                )
+            
+            if not success:
+                return RTLBenchmarkResult(
+                    model_name=model_name,
+                    total_cycles=0,
+                    compute_cycles=0,
+                    memory_cycles=0,
+                    latency_us=0,
+                    throughput_fps=0,
+                    simulation_time_s=time.time() - start_time,
+                    success=False,
+                    error_msg=output
+                )
+            
+            # Parse results
+            results = self.parse_results(output)
+            
+            # Calculate metrics
+            clock_mhz = 1000 / self.config.clock_period_ns
+            latency_us = results['total_cycles'] / clock_mhz
+            throughput_fps = 1_000_000 / latency_us if latency_us > 0 else 0
+            
+            return RTLBenchmarkResult(
+                model_name=model_name,
+                total_cycles=results['total_cycles'],
+                compute_cycles=results['compute_cycles'],
+                memory_cycles=results['memory_cycles'],
+                latency_us=latency_us,
+                throughput_fps=throughput_fps,
+                simulation_time_s=time.time() - start_time,
+                success=True
+            )
+    
     def benchmark_model(self, model_path: str,
                         input_shape: Tuple[int, ...] = (1, 3, 224, 224)
                         ) -> RTLBenchmarkResult:
@@ -319,65 +385,8 @@ endmodule
             compiled = compile_graph(ir_graph)
             
             model_binary = compiled.to_binary()
-            
-            # Create temp directory
-            with tempfile.TemporaryDirectory() as tmpdir:
-                # Generate testbench
-                tb_path = os.path.join(tmpdir, 'npu_benchmark_tb.sv')
-                self.generate_testbench(model_binary, tb_path)
-                
-                # Run simulation
-                print(f"Running {self.config.simulator} simulation...")
-                
-                if self.config.simulator == 'verilator':
-                    success, output = self.run_verilator(tb_path, tmpdir)
-                elif self.config.simulator == 'iverilog':
-                    success, output = self.run_iverilog(tb_path, tmpdir)
-                else:
-                    return RTLBenchmarkResult(
-                        model_name=model_name,
-                        total_cycles=0,
-                        compute_cycles=0,
-                        memory_cycles=0,
-                        latency_us=0,
-                        throughput_fps=0,
-                        simulation_time_s=time.time() - start_time,
-                        success=False,
-                        error_msg=f"Unknown simulator: {self.config.simulator}"
-                    )
-                
-                if not success:
-                    return RTLBenchmarkResult(
-                        model_name=model_name,
-                        total_cycles=0,
-                        compute_cycles=0,
-                        memory_cycles=0,
-                        latency_us=0,
-                        throughput_fps=0,
-                        simulation_time_s=time.time() - start_time,
-                        success=False,
-                        error_msg=output
-                    )
-                
-                # Parse results
-                results = self.parse_results(output)
-                
-                # Calculate metrics
-                clock_mhz = 1000 / self.config.clock_period_ns
-                latency_us = results['total_cycles'] / clock_mhz
-                throughput_fps = 1_000_000 / latency_us if latency_us > 0 else 0
-                
-                return RTLBenchmarkResult(
-                    model_name=model_name,
-                    total_cycles=results['total_cycles'],
-                    compute_cycles=results['compute_cycles'],
-                    memory_cycles=results['memory_cycles'],
-                    latency_us=latency_us,
-                    throughput_fps=throughput_fps,
-                    simulation_time_s=time.time() - start_time,
-                    success=True
-                )
-                
+            return self.benchmark_binary(model_name, model_binary, start_time)
+        
         except Exception as e:
             return RTLBenchmarkResult(
                 model_name=model_name,
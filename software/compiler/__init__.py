@@ -3,9 +3,15 @@ EdgeNPU Compiler
 Complete compilation pipeline for neural network models
 """
 
-from .frontend import IRBuilder, IRGraph, ModelParser, ONNXParser, TFLiteParser
-from .optimizer import GraphOptimizer, Quantizer
-from .backend import CodeGenerator, InstructionEmitter, MemoryAllocator, Scheduler
+import os
+from typing import Optional
+
+from .frontend import IRBuilder, IRGraph, ModelParser, ONNXParser, TFLiteParser, parse_model
+from .optimizer import GraphOptimizer, MemoryOrderingPass, Quantizer
+from .backend import (CodeGenerator, CostModel, HardwareConfig, InstructionEmitter,
+                      MemoryAllocator, MemoryConfig, Scheduler, load_calibration)
+from .compile_cache import CompileCache
+from .profiler import CompileProfiler, profile_stage, get_profiler
 
 __version__ = "1.0.0"
 
@@ -23,9 +29,21 @@ __all__ = [
     
     # Backend
     'CodeGenerator',
+    'CostModel',
+    'HardwareConfig',
     'InstructionEmitter',
     'MemoryAllocator',
+    'MemoryConfig',
     'Scheduler',
+    'load_calibration',
+    
+    # Caching
+    'CompileCache',
+    
+    # Profiling
+    'CompileProfiler',
+    'profile_stage',
+    'get_profiler',
     
     # Main compiler
     'NPUCompiler',
@@ -37,32 +55,56 @@ class NPUCompiler:
     """
     Main NPU compiler class
     Provides end-to-end compilation from model file to NPU binary
+    
+    hardware sets the cost model parameters behind schedules and cycle
+    estimates; load_calibration() reads them from an RTL calibration file.
     """
     
     def __init__(self, pe_rows: int = 16, pe_cols: int = 16,
                  weight_buf_kb: int = 256, act_buf_kb: int = 256,
-                 opt_level: int = 2):
+                 opt_level: int = 2, cache_dir: str = None,
+                 cache_max_mb: int = 512, incremental: bool = True,
+                 weight_streaming: Optional[bool] = None,
+                 memory: Optional[MemoryConfig] = None,
+                 hardware: Optional[HardwareConfig] = None):
         self.pe_rows = pe_rows
         self.pe_cols = pe_cols
         self.weight_buf_kb = weight_buf_kb
         self.act_buf_kb = act_buf_kb
         self.opt_level = opt_level
+        self.cache_dir = cache_dir
+        self.weight_streaming = weight_streaming
+        self.memory = memory
+        self.hardware = hardware
+        
+        # On-disk caches (parsed IR and compiled models), off by default
+        self.compile_cache = None
+        if cache_dir is not None:
+            self.compile_cache = CompileCache(os.path.join(cache_dir, 'compiled'),
+                                              max_bytes=cache_max_mb * 1024 * 1024)
         
         self.optimizer = GraphOptimizer(
             opt_level=opt_level,
             pe_rows=pe_rows,
             pe_cols=pe_cols,
             weight_buf_kb=weight_buf_kb,
-            act_buf_kb=act_buf_kb
+            act_buf_kb=act_buf_kb,
+            hardware=hardware
         )
         
-        self.quantizer = Quantizer()
+        self.quantizer = Quantizer(
+            cache_dir=os.path.join(cache_dir, 'calibration') if cache_dir is not None else None
+        )
         
         self.codegen = CodeGenerator(
             pe_rows=pe_rows,
             pe_cols=pe_cols,
             weight_buf_kb=weight_buf_kb,
-            act_buf_kb=act_buf_kb
+            act_buf_kb=act_buf_kb,
+            incremental=incremental,
+            weight_streaming=weight_streaming,
+            memory=memory,
+            hardware=hardware
         )
     
     def compile(self, model_path: str, output_path: str = None,
@@ -79,6 +121,11 @@ class NPUCompiler:
         Returns:
             CompiledModel object
         """
+        with profile_stage('compile', model=os.path.basename(model_path)):
+            return self._compile_file(model_path, output_path, quantize, verbose)
+    
+    def _compile_file(self, model_path: str, output_path: Optional[str],
+                      quantize: bool, verbose: bool):
         if verbose:
             print(f"Compiling: {model_path}")
         
@@ -86,18 +133,23 @@ class NPUCompiler:
         if verbose:
             print("\n1. Parsing model...")
         
-        if model_path.endswith('.onnx'):
-            parser = ONNXParser()
-        elif model_path.endswith('.tflite'):
-            parser = TFLiteParser()
-        else:
+        if not model_path.endswith(('.onnx', '.tflite')):
             raise ValueError(f"Unsupported model format: {model_path}")
         
-        graph = parser.parse(model_path)
+        ir_cache_dir = None
+        if self.cache_dir is not None:
+            ir_cache_dir = os.path.join(self.cache_dir, 'ir')
+        graph = parse_model(model_path, cache_dir=ir_cache_dir)
         
         if verbose:
             print(f"   Parsed {len(graph.nodes)} nodes")
         
+        key, compiled = self._cache_lookup(graph, quantize, verbose)
+        if compiled is not None:
+            if output_path:
+                compiled.save(output_path)
+            return compiled
+        
         # Step 2: Optimize
         if verbose:
             print("\n2. Optimizing graph...")
@@ -114,11 +166,13 @@ class NPUCompiler:
         if verbose:
             print("\n4. Generating code...")
         
-        compiled = self.codegen.generate(graph, verbose=verbose)
+        compiled = self._generate(graph, verbose)
+        self._cache_store(key, compiled)
         
         # Step 5: Save output
         if output_path:
-            compiled.save(output_path)
+            with profile_stage('save'):
+                compiled.save(output_path)
             if verbose:
                 print(f"\nSaved to: {output_path}")
         
@@ -137,6 +191,14 @@ class NPUCompiler:
         Returns:
             CompiledModel object
         """
+        with profile_stage('compile', graph):
+            return self._compile_ir(graph, quantize, verbose)
+    
+    def _compile_ir(self, graph: IRGraph, quantize: bool, verbose: bool):
+        key, compiled = self._cache_lookup(graph, quantize, verbose)
+        if compiled is not None:
+            return compiled
+        
         # Optimize
         graph = self.optimizer.optimize(graph, verbose=verbose)
         
@@ -145,7 +207,56 @@ class NPUCompiler:
             graph = self.quantizer.quantize(graph)
         
         # Generate code
-        return self.codegen.generate(graph, verbose=verbose)
+        compiled = self._generate(graph, verbose)
+        self._cache_store(key, compiled)
+        return compiled
+    
+    def _generate(self, graph: IRGraph, verbose: bool):
+        """Generate code, keeping the activation peak of a memory-aware node order"""
+        memory_ordered = any(p.name == MemoryOrderingPass.name for p in self.optimizer.passes)
+        return self.codegen.generate(graph, verbose=verbose,
+                                     analyses=self.optimizer.analyses,
+                                     memory_ordered=memory_ordered)
+    
+    def _cache_config(self, quantize: bool) -> dict:
+        """Everything besides the graph that affects compiler output"""
+        return {
+            'compiler_version': __version__,
+            'pe_rows': self.pe_rows,
+            'pe_cols': self.pe_cols,
+            'weight_buf_kb': self.weight_buf_kb,
+            'act_buf_kb': self.act_buf_kb,
+            'opt_level': self.opt_level,
+            'weight_streaming': self.weight_streaming,
+            'memory': repr(self.memory),
+            'hardware': repr(self.hardware),
+            'quantize': quantize,
+            'quant_config': repr(self.quantizer.config),
+            'scale_map': sorted(self.quantizer.scale_map.items()),
+            'zero_point_map': sorted(self.quantizer.zero_point_map.items()),
+        }
+    
+    def _cache_lookup(self, graph: IRGraph, quantize: bool, verbose: bool):
+        """Return (key, cached CompiledModel or None)"""
+        if self.compile_cache is None:
+            return None, None
+        
+        with profile_stage('compile_cache_lookup', graph):
+            key = self.compile_cache.make_key(graph, self._cache_config(quantize))
+            compiled = self.compile_cache.get(key)
+        if compiled is not None and verbose:
+            print(f"   Compile cache hit ({key[:12]})")
+        return key, compiled
+    
+    def _cache_store(self, key: str, compiled):
+        if key is not None:
+            self.compile_cache.put(key, compiled)
+    
+    def get_cache_stats(self) -> dict:
+        """Get compile cache statistics"""
+        if self.compile_cache is None:
+            return {}
+        return self.compile_cache.get_stats()
 
 
 def compile_model(model_path: str, output_path: str = None, **kwargs):
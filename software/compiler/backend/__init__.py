@@ -4,13 +4,19 @@ Code generation for NPU
 """
 
 from .code_generator import CodeGenerator
+from .cost_model import CostModel, HardwareConfig, NodeCost, load_calibration
 from .instruction_emitter import InstructionEmitter
-from .memory_allocator import MemoryAllocator
+from .memory_allocator import MemoryAllocator, MemoryConfig
 from .scheduler import Scheduler
 
 __all__ = [
     'CodeGenerator',
+    'CostModel',
+    'HardwareConfig',
     'InstructionEmitter',
     'MemoryAllocator',
+    'MemoryConfig',
+    'NodeCost',
     'Scheduler',
+    'load_calibration',
 ]
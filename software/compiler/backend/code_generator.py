@@ -4,14 +4,21 @@ Generate NPU binary from optimized IR
 """
 
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+import hashlib
+import json
 import struct
 import numpy as np
 
 from ..frontend.ir_builder import IRGraph, IRNode, IRTensor, IROpType
+from ..frontend.ir_cache import encode_value
+from ..frontend.weight_store import array_digest
+from ..optimizer.analysis import AnalysisManager, TopoOrderAnalysis
+from ..profiler import profile_stage
 
-from .instruction_emitter import InstructionEmitter
-from .memory_allocator import MemoryAllocator
+from .cost_model import HardwareConfig
+from .instruction_emitter import InstructionEmitter, NPUInstruction, NPUOpCode
+from .memory_allocator import MemoryAllocator, MemoryConfig, WeightTile
 from .scheduler import Scheduler, Schedule
 
 
@@ -102,56 +109,165 @@ class CompiledModel:
             f.write("#endif // NPU_MODEL_H\n")
 
 
+@dataclass
+class NodeArtifact:
+    """
+    Position-independent code generation output for one IR node
+    
+    Weight addresses in the instructions are left at zero and listed in
+    relocations; they are patched when the artifact is linked.
+    """
+    key: str
+    instructions: List[NPUInstruction]
+    relocations: List[Tuple[int, str]]  # (instruction index, weight tensor)
+    weights: Dict[str, bytes] = field(default_factory=dict)  # packed constants
+    cycles: int = 0
+
+
+def _pack_tensor(tensor: IRTensor) -> bytes:
+    """Packed (int8) bytes of a constant tensor"""
+    if tensor.is_quantized:
+        return tensor.data.tobytes()
+    # Quantize on the fly
+    return tensor.quantize().data.tobytes()
+
+
 class CodeGenerator:
     """
     Main code generator
     Converts optimized IR to NPU binary
+    
+    With incremental=True, each node is compiled to a cached NodeArtifact
+    keyed by its op, attrs, operand metadata and weight digests; later calls
+    only regenerate nodes whose key changed and re-link the rest.
+    
+    weight_streaming (None = auto) keeps weights in a DRAM image and pages
+    them through the weight buffer with double-buffered DMA; auto enables
+    it only when the weights don't fit on-chip. Activations that don't fit
+    are spilled to DRAM, or recomputed when recompute=True and cheap.
+    With aliasing=True, views, in-place ops and concat inputs share storage.
+    memory describes buffer banks and burst size for placement; hardware
+    holds the cost model parameters (e.g. from load_calibration).
     """
     
     def __init__(self, pe_rows: int = 16, pe_cols: int = 16,
-                 weight_buf_kb: int = 256, act_buf_kb: int = 256):
+                 weight_buf_kb: int = 256, act_buf_kb: int = 256,
+                 incremental: bool = False, weight_streaming: Optional[bool] = None,
+                 recompute: bool = True, aliasing: bool = True,
+                 memory: Optional[MemoryConfig] = None,
+                 hardware: Optional[HardwareConfig] = None):
         self.pe_rows = pe_rows
         self.pe_cols = pe_cols
+        self.weight_buf_kb = weight_buf_kb
+        self.act_buf_kb = act_buf_kb
+        self.incremental = incremental
+        self.weight_streaming = weight_streaming
+        self.recompute = recompute
+        self.aliasing = aliasing
+        self.memory = memory
         
         self.emitter = InstructionEmitter()
-        self.allocator = MemoryAllocator(weight_buf_kb, act_buf_kb)
-        self.scheduler = Scheduler(pe_rows, pe_cols)
+        self.allocator = MemoryAllocator(weight_buf_kb, act_buf_kb,
+                                         weight_streaming=weight_streaming,
+                                         recompute=recompute, aliasing=aliasing,
+                                         memory=memory)
+        self.scheduler = Scheduler(pe_rows, pe_cols, hardware=hardware)
+        
+        # Incremental state
+        self.artifacts: Dict[str, NodeArtifact] = {}
+        self.artifact_hits = 0
+        self.artifact_misses = 0
+    
+    def _reset(self):
+        """Fresh emitter/allocator so repeated generate() calls don't accumulate"""
+        self.emitter = InstructionEmitter()
+        self.allocator = MemoryAllocator(self.weight_buf_kb, self.act_buf_kb,
+                                         weight_streaming=self.weight_streaming,
+                                         recompute=self.recompute,
+                                         aliasing=self.aliasing,
+                                         memory=self.memory)
     
-    def generate(self, graph: IRGraph, verbose: bool = False) -> CompiledModel:
+    def generate(self, graph: IRGraph, verbose: bool = False,
+                 analyses: Optional[AnalysisManager] = None,
+                 memory_ordered: bool = False) -> CompiledModel:
         """
         Generate NPU binary from IR graph
         
         Args:
             graph: Optimized IR graph
             verbose: Print progress
-            
+            analyses: Analysis cache shared with the optimizer
+            memory_ordered: graph.nodes were ordered for activation peak
+                (MemoryOrderingPass); node order planning may not raise it
+        
         Returns:
             Compiled model
         """
+        with profile_stage('codegen', graph):
+            return self._generate(graph, verbose, analyses, memory_ordered)
+    
+    def _generate(self, graph: IRGraph, verbose: bool,
+                  analyses: Optional[AnalysisManager],
+                  memory_ordered: bool) -> CompiledModel:
         if verbose:
             print("Code Generation:")
         
-        # Step 1: Memory allocation
+        self._reset()
+        if analyses is None:
+            analyses = AnalysisManager()
+        
+        # Per-node artifacts (incremental mode)
+        artifacts = None
+        if self.incremental:
+            if verbose:
+                print("  Building node artifacts...")
+            with profile_stage('build_artifacts', graph, category='codegen'):
+                artifacts = self._build_artifacts(graph)
+            if verbose:
+                print(f"    {self.artifact_misses} rebuilt, {self.artifact_hits} reused")
+        
+        # Step 1: Order nodes so independent units overlap; memory is
+        # planned and instructions are emitted in this order
+        node_cycles = None
+        if artifacts is not None:
+            node_cycles = {name: a.cycles for name, a in artifacts.items()}
+        with profile_stage('plan_order', graph, category='codegen'):
+            order = self.scheduler.plan_order(graph, node_cycles, analyses,
+                                              memory_limit=self.act_buf_kb * 1024,
+                                              keep_peak=memory_ordered)
+            if order is not analyses.get(TopoOrderAnalysis, graph):
+                graph.reorder_nodes(order)
+        
+        # Step 2: Memory allocation
         if verbose:
             print("  Allocating memory...")
-        self.allocator.allocate(graph)
+        with profile_stage('allocate', graph, category='codegen'):
+            self.allocator.allocate(graph, analyses)
+        self.scheduler.cost_model.set_bank_conflicts(self.allocator.bank_conflicts,
+                                                     self.allocator.memory.bank_width)
         
-        # Step 2: Schedule operations
+        # Step 3: Schedule operations
         if verbose:
             print("  Scheduling operations...")
-        schedule = self.scheduler.schedule(graph)
+        order = analyses.get(TopoOrderAnalysis, graph)
+        with profile_stage('schedule', graph, category='codegen'):
+            weight_tiles = self.allocator.plan_weight_stream(graph, order)
+            schedule = self.scheduler.schedule(graph, node_cycles, analyses, weight_tiles,
+                                               self.allocator.get_spill_events())
         
-        # Step 3: Emit instructions
+        # Step 4: Emit instructions
         if verbose:
             print("  Emitting instructions...")
-        self._emit_instructions(graph, schedule)
+        with profile_stage('emit', graph, category='codegen'):
+            self._emit_instructions(graph, order, weight_tiles, artifacts)
         
-        # Step 4: Pack weights
+        # Step 5: Pack weights
         if verbose:
             print("  Packing weights...")
-        weights_data, bias_data = self._pack_weights(graph)
+        with profile_stage('pack_weights', graph, category='codegen'):
+            weights_data, bias_data = self._pack_weights(graph, artifacts)
         
-        # Step 5: Create compiled model
+        # Step 6: Create compiled model
         instructions = self.emitter.get_binary()
         
         # Calculate input/output sizes
@@ -186,7 +302,9 @@ class CodeGenerator:
         
         return model
     
-    def _emit_instructions(self, graph: IRGraph, schedule: Schedule):
+    def _emit_instructions(self, graph: IRGraph, ordered_nodes: List[IRNode],
+                           weight_tiles: Dict[str, List[WeightTile]],
+                           artifacts: Optional[Dict[str, NodeArtifact]] = None):
         """Emit instructions for scheduled operations"""
         # Set memory map in emitter
         self.emitter.set_memory_map(
@@ -194,25 +312,57 @@ class CodeGenerator:
             self.allocator.activation_offsets
         )
         
-        # Get nodes in scheduled order
-        ordered_nodes = schedule.get_node_order()
+        # Streamed weight tiles alternate buffer halves in emission order
+        self.emitter.set_weight_stream(weight_tiles)
         
-        # Emit prologue
+        # Emit prologue (first weight tile loads in the background)
         self.emitter.emit_sync()
+        self.emitter.emit_weight_prefetch()
         
-        # Emit instructions for each node
-        for node in ordered_nodes:
-            self.emitter.emit_node(graph, node)
+        # Emit instructions for each node, addressing the segment of each
+        # operand that is resident there (spilled tensors may be refilled
+        # at another offset)
+        for position, node in enumerate(ordered_nodes):
+            # Refill spilled activations (or recompute them) before use
+            for event in self.allocator.spills_before.get(node.name, ()):
+                if event.kind == 'recompute':
+                    producer = graph.get_node(event.producer)
+                    self.emitter.set_memory_map(
+                        self.allocator.weight_offsets,
+                        self.allocator.operand_offsets(producer, position))
+                    self.emitter.emit_node(graph, producer)
+                else:
+                    self.emitter.emit_spill_load(event)
+            
+            self.emitter.set_memory_map(self.allocator.weight_offsets,
+                                        self.allocator.operand_offsets(node, position))
+            if node.name in weight_tiles:
+                # Tile loads depend on neighbouring nodes; not relocatable
+                self.emitter.emit_node(graph, node)
+            elif artifacts is not None:
+                self._link_artifact(artifacts[node.name])
+            else:
+                self.emitter.emit_node(graph, node)
+            
+            for event in self.allocator.spills_after.get(node.name, ()):
+                self.emitter.emit_spill_store(event)
         
         # Emit epilogue
         self.emitter.emit_sync()
         self.emitter.emit_halt()
     
-    def _pack_weights(self, graph: IRGraph) -> Tuple[bytes, bytes]:
+    def _pack_weights(self, graph: IRGraph,
+                      artifacts: Optional[Dict[str, NodeArtifact]] = None
+                      ) -> Tuple[bytes, bytes]:
         """Pack weights into binary format"""
         weights_data = bytearray()
         bias_data = bytearray()
         
+        packed: Dict[str, bytes] = {}
+        if artifacts is not None:
+            for artifact in artifacts.values():
+                packed.update(artifact.weights)
+        
         # Sort by offset for sequential packing
         sorted_weights = sorted(
             self.allocator.weight_offsets.items(),
@@ -227,21 +377,112 @@ class CodeGenerator:
                     weights_data.append(0)
                 
                 # Add weight data
-                if tensor.is_quantized:
-                    weights_data.extend(tensor.data.tobytes())
-                else:
-                    # Quantize on the fly
-                    quantized = tensor.quantize()
-                    weights_data.extend(quantized.data.tobytes())
+                data = packed.get(tensor_name)
+                if data is None:
+                    data = _pack_tensor(tensor)
+                weights_data.extend(data)
         
         return bytes(weights_data), bytes(bias_data)
     
+    # -------------------------------------------------------------------------
+    # Incremental code generation
+    # -------------------------------------------------------------------------
+    
+    def _node_key(self, graph: IRGraph, node: IRNode,
+                  digests: Dict[str, str]) -> str:
+        """Content key of everything a node's artifact depends on"""
+        operands = []
+        for name in list(node.inputs) + list(node.outputs):
+            tensor = graph.get_tensor(name)
+            if tensor is None:
+                operands.append([name, None])
+                continue
+            digest = None
+            if tensor.data is not None:
+                digest = digests.get(name)
+                if digest is None:
+                    digest = digests[name] = array_digest(tensor.data)
+            operands.append([name, list(tensor.shape), tensor.dtype.name,
+                             tensor.layout.name, float(tensor.scale),
+                             int(tensor.zero_point), bool(tensor.is_quantized),
+                             digest])
+        
+        text = json.dumps([node.op_type.name, encode_value(dict(node.attrs)),
+                           encode_value(node.tile_config), operands],
+                          sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _compile_node(self, graph: IRGraph, node: IRNode, key: str) -> NodeArtifact:
+        """Generate the artifact for a single node"""
+        # Scratch emitter with an empty memory map: weight addresses are 0
+        emitter = InstructionEmitter()
+        emitter.emit_node(graph, node)
+        
+        weights = {}
+        for name in node.inputs:
+            tensor = graph.get_tensor(name)
+            if tensor is not None and tensor.data is not None:
+                weights[name] = _pack_tensor(tensor)
+        
+        return NodeArtifact(
+            key=key,
+            instructions=emitter.instructions,
+            relocations=emitter.relocations,
+            weights=weights,
+            cycles=self.scheduler.cost_model.estimate_node_cycles(graph, node)
+        )
+    
+    def _build_artifacts(self, graph: IRGraph) -> Dict[str, NodeArtifact]:
+        """Get artifacts for all nodes, regenerating only changed ones"""
+        self.artifact_hits = 0
+        self.artifact_misses = 0
+        
+        digests: Dict[str, str] = {}
+        artifacts: Dict[str, NodeArtifact] = {}
+        for node in graph.nodes:
+            key = self._node_key(graph, node, digests)
+            artifact = self.artifacts.get(key)
+            if artifact is None:
+                artifact = self._compile_node(graph, node, key)
+                self.artifact_misses += 1
+            else:
+                self.artifact_hits += 1
+            artifacts[node.name] = artifact
+        
+        # Keep only what the latest graph uses
+        self.artifacts = {a.key: a for a in artifacts.values()}
+        return artifacts
+    
+    def _link_artifact(self, artifact: NodeArtifact):
+        """Append artifact instructions, patching weight addresses"""
+        base = len(self.emitter.instructions)
+        self.emitter.instructions.extend(artifact.instructions)
+        
+        # Loop targets are instruction indices within the artifact
+        for index, inst in enumerate(artifact.instructions):
+            if inst.opcode == NPUOpCode.LOOP_END:
+                self.emitter.instructions[base + index] = replace(
+                    inst, operands=inst.operands + base)
+        
+        for index, weight_name in artifact.relocations:
+            offset = self.allocator.weight_offsets.get(weight_name, 0)
+            inst = artifact.instructions[index]
+            self.emitter.instructions[base + index] = replace(
+                inst, operands=inst.operands | (offset & 0xFFFFFF))
+            self.emitter.relocations.append((base + index, weight_name))
+    
     def get_stats(self) -> Dict:
         """Get code generation statistics"""
-        return {
+        stats = {
             'num_instructions': self.emitter.get_instruction_count(),
             'memory_usage': self.allocator.get_memory_usage(),
+            'activation_stats': self.allocator.get_activation_stats(),
+            'weight_streaming': self.allocator.streaming_weights,
         }
+        if self.incremental:
+            stats['artifacts_reused'] = self.artifact_hits
+            stats['artifacts_rebuilt'] = self.artifact_misses
+        return stats
 
 
 def compile_graph(graph: IRGraph, 
@@ -255,7 +496,7 @@ def compile_graph(graph: IRGraph,
         pe_rows: PE array rows
         pe_cols: PE array columns
         verbose: Print progress
-        
+    
     Returns:
         Compiled model
     """
@@ -0,0 +1,434 @@
+"""
+EdgeNPU Compiler - Cost Model
+Analytical roofline latency model shared by the scheduler and the benchmarks
+
+An op is bound by whichever of its PE-array / vector-unit time, off-chip
+weight transfer and on-chip activation traffic is longest; tile switches
+and pipeline fill/drain are paid on top.
+"""
+
+import json
+import math
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+import numpy as np
+
+from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+
+
+@dataclass
+class HardwareConfig:
+    """NPU parameters the cost model depends on"""
+    pe_rows: int = 16
+    pe_cols: int = 16
+    clock_mhz: int = 500
+    dma_bandwidth_gbps: float = 12.8   # External memory bandwidth
+    dma_setup_cycles: float = 50       # Per transfer (descriptor fetch, first beat)
+    sram_bytes_per_cycle: int = 16     # Activation buffer port (128-bit)
+    vector_lanes: int = 16             # Elements per cycle of activation/pooling units
+    activation_latency: float = 4      # Activation/pooling pipeline depth
+    tile_switch_cycles: float = 10     # Weight reload per PE array tile
+    acc_depth: int = 1024              # Partial sums held per PE column
+    
+    @property
+    def macs_per_cycle(self) -> int:
+        return self.pe_rows * self.pe_cols
+    
+    @property
+    def dma_bytes_per_cycle(self) -> float:
+        return self.dma_bandwidth_gbps * 1e9 / 8 / (self.clock_mhz * 1e6)
+    
+    @property
+    def drain_cycles(self) -> int:
+        """Systolic array fill and accumulator drain"""
+        return self.pe_rows + self.pe_cols
+
+
+@dataclass
+class NodeCost:
+    """Latency breakdown of one op (cycles)"""
+    compute_cycles: int = 0    # PE array or vector unit busy time
+    dma_cycles: int = 0        # Off-chip weight transfer
+    sram_cycles: int = 0       # On-chip activation reads and writes
+    overhead_cycles: int = 0   # Tile switches, pipeline fill and drain
+    macs: int = 0
+    
+    @property
+    def memory_cycles(self) -> int:
+        return max(self.dma_cycles, self.sram_cycles)
+    
+    @property
+    def stage_cycles(self) -> int:
+        """Time on the op's unit once its weights are on-chip"""
+        return max(self.compute_cycles, self.sram_cycles) + self.overhead_cycles
+    
+    @property
+    def total_cycles(self) -> int:
+        """Latency of the op run on its own, weight load included"""
+        return max(self.compute_cycles, self.dma_cycles, self.sram_cycles) + self.overhead_cycles
+    
+    @property
+    def bound(self) -> str:
+        """'compute', 'dma' or 'sram', whichever dominates"""
+        if self.compute_cycles >= max(self.dma_cycles, self.sram_cycles):
+            return 'compute'
+        return 'dma' if self.dma_cycles >= self.sram_cycles else 'sram'
+
+
+# Vector unit passes per element
+VECTOR_PASSES = {
+    IROpType.RELU: 1,
+    IROpType.RELU6: 1,
+    IROpType.LEAKY_RELU: 1,
+    IROpType.SIGMOID: 2,
+    IROpType.TANH: 2,
+    IROpType.SWISH: 3,
+    IROpType.GELU: 4,
+    IROpType.ADD: 1,
+    IROpType.SUB: 1,
+    IROpType.MUL: 1,
+    IROpType.DIV: 4,
+    IROpType.BATCH_NORM: 2,    # scale, shift
+    IROpType.LAYER_NORM: 3,    # mean, variance, normalize
+    IROpType.SOFTMAX: 3,       # max, exp-sum, normalize
+}
+
+# Ops that move data without computing (RESHAPE and CONCAT are zero-copy
+# through MemoryAllocator.plan_aliases)
+COPY_OPS = (IROpType.TRANSPOSE, IROpType.PAD, IROpType.SPLIT)
+
+
+# Calibration file format (written by benchmark/calibrate_cost_model.py)
+CALIBRATION_FORMAT = 'edgenpu-cost-calibration'
+CALIBRATION_VERSION = 1
+
+
+def _ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+def _tile_passes(n: int, tile, fold, lanes: int):
+    """PE array passes to cover n channels in tiles (the last one partial)"""
+    full = n // tile
+    rest = n - full * tile
+    return full * _ceil_div(tile * fold, lanes) + _ceil_div(rest * fold, lanes)
+
+
+class CostModel:
+    """Cost model for estimating operation latency"""
+    
+    def __init__(self, pe_rows: int = 16, pe_cols: int = 16,
+                 clock_mhz: int = 500, hardware: Optional[HardwareConfig] = None):
+        self.hw = hardware or HardwareConfig(pe_rows=pe_rows, pe_cols=pe_cols,
+                                             clock_mhz=clock_mhz)
+        self.pe_rows = self.hw.pe_rows
+        self.pe_cols = self.hw.pe_cols
+        self.clock_mhz = self.hw.clock_mhz
+        
+        # Activation bytes per node serialized by SRAM bank conflicts
+        # (MemoryAllocator.get_bank_conflicts), one extra cycle per word
+        self.bank_conflicts: Dict[str, int] = {}
+        self.bank_width = 16
+    
+    # -------------------------------------------------------------------------
+    # Per-op costs
+    # -------------------------------------------------------------------------
+    
+    def _sram_cycles(self, nbytes: int) -> int:
+        return _ceil_div(nbytes, self.hw.sram_bytes_per_cycle)
+    
+    def conv_cost(self, in_ch: int, out_ch: int, out_h: int, out_w: int,
+                  kernel_h: int, kernel_w: int, groups: int = 1,
+                  input_bytes: int = 0, output_bytes: int = 0,
+                  weight_bytes: int = 0, batch: int = 1) -> NodeCost:
+        """
+        Convolution on the weight-stationary PE array
+        
+        Input channels map to rows and output channels to columns; a
+        depthwise conv maps its kernel taps to rows instead.
+        """
+        hw = self.hw
+        pixels = batch * out_h * out_w
+        if groups > 1 and in_ch // groups == 1:
+            oc_tiles = _ceil_div(out_ch, hw.pe_cols)
+            ic_tiles = _ceil_div(kernel_h * kernel_w, hw.pe_rows)
+            compute = oc_tiles * ic_tiles * pixels
+            macs = out_ch * pixels * kernel_h * kernel_w
+        else:
+            in_g, out_g = in_ch // groups, out_ch // groups
+            oc_tiles = groups * _ceil_div(out_g, hw.pe_cols)
+            ic_tiles = _ceil_div(in_g, hw.pe_rows)
+            compute = oc_tiles * ic_tiles * pixels * kernel_h * kernel_w
+            macs = out_ch * in_g * pixels * kernel_h * kernel_w
+        
+        return NodeCost(
+            compute_cycles=compute,
+            dma_cycles=self.estimate_dma_cycles(weight_bytes) if weight_bytes else 0,
+            sram_cycles=self._sram_cycles(input_bytes + output_bytes),
+            overhead_cycles=round(oc_tiles * ic_tiles * hw.tile_switch_cycles) + hw.drain_cycles,
+            macs=macs
+        )
+    
+    def fc_cost(self, in_features: int, out_features: int, batch: int = 1,
+                weight_bytes: int = 0, io_bytes: int = 0) -> NodeCost:
+        """Fully connected / matmul: one pass per (row tile, column tile) per row"""
+        hw = self.hw
+        tiles = _ceil_div(out_features, hw.pe_cols) * _ceil_div(in_features, hw.pe_rows)
+        return NodeCost(
+            compute_cycles=batch * tiles,
+            dma_cycles=self.estimate_dma_cycles(weight_bytes) if weight_bytes else 0,
+            sram_cycles=self._sram_cycles(io_bytes),
+            overhead_cycles=round(tiles * hw.tile_switch_cycles) + hw.drain_cycles,
+            macs=batch * in_features * out_features
+        )
+    
+    def vector_cost(self, elements: int, passes: int = 1, io_bytes: int = 0) -> NodeCost:
+        """Element-wise work on the activation unit"""
+        return NodeCost(
+            compute_cycles=_ceil_div(elements * passes, self.hw.vector_lanes),
+            sram_cycles=self._sram_cycles(io_bytes),
+            overhead_cycles=round(self.hw.activation_latency)
+        )
+    
+    def pool_cost(self, channels: int, out_h: int, out_w: int,
+                  kernel_h: int, kernel_w: int, io_bytes: int = 0) -> NodeCost:
+        """Window reduction on the pooling unit"""
+        window_elements = channels * out_h * out_w * kernel_h * kernel_w
+        return NodeCost(
+            compute_cycles=_ceil_div(window_elements, self.hw.vector_lanes),
+            sram_cycles=self._sram_cycles(io_bytes),
+            overhead_cycles=round(self.hw.activation_latency)
+        )
+    
+    def conv_tile_costs(self, in_ch: int, out_ch: int, out_h: int, out_w: int,
+                        kernel_h: int, kernel_w: int, stride: int,
+                        tile_oc, tile_ic, tile_oh, tile_ow, fold, spatial_outer,
+                        batch: int = 1) -> Dict[str, np.ndarray]:
+        """
+        Cycles of a tiled convolution, vectorized over candidate tilings
+        
+        Tile arguments are equal-length arrays (or scalars). fold packs that
+        many kernel taps into the PE rows next to the input channels (im2col
+        style; each input pixel is then gathered fold times). With output
+        channel tiles outermost, weights stay in the array across spatial
+        tiles when one load covers the whole reduction; with spatial tiles
+        outermost, each input window is read once for all output tiles.
+        """
+        hw = self.hw
+        tile_oc, tile_ic, tile_oh, tile_ow, fold = (
+            np.asarray(v, dtype=np.int64) for v in (tile_oc, tile_ic, tile_oh, tile_ow, fold))
+        spatial_outer = np.asarray(spatial_outer, dtype=bool)
+        taps = kernel_h * kernel_w
+        
+        tap_groups = _ceil_div(taps, fold)
+        oc_passes = _tile_passes(out_ch, tile_oc, 1, hw.pe_cols)
+        ic_passes = _tile_passes(in_ch, tile_ic, fold, hw.pe_rows) * tap_groups
+        compute = batch * oc_passes * ic_passes * out_h * out_w
+        
+        n_oc = _ceil_div(out_ch, tile_oc)
+        n_groups = _ceil_div(in_ch, tile_ic) * tap_groups
+        n_spatial = _ceil_div(out_h, tile_oh) * _ceil_div(out_w, tile_ow)
+        stays = np.where(spatial_outer, n_oc * n_groups == 1, n_groups == 1)
+        reloads = n_oc * n_groups * np.where(stays, 1, n_spatial)
+        
+        window = ((tile_oh - 1) * stride + kernel_h) * ((tile_ow - 1) * stride + kernel_w)
+        input_reads = n_spatial * window * in_ch * fold * np.where(spatial_outer, 1, n_oc)
+        sram = _ceil_div(batch * (input_reads + out_ch * out_h * out_w), hw.sram_bytes_per_cycle)
+        
+        overhead = np.round(reloads * hw.tile_switch_cycles).astype(np.int64)
+        overhead += n_oc * n_spatial * hw.drain_cycles
+        return {
+            'compute': compute,
+            'sram': sram,
+            'overhead': overhead,
+            'cycles': np.maximum(compute, sram) + overhead,
+        }
+    
+    def fc_tile_costs(self, in_features: int, out_features: int, batch: int,
+                      tile_out, tile_in) -> Dict[str, np.ndarray]:
+        """Cycles of a tiled fully connected layer, vectorized like conv_tile_costs"""
+        hw = self.hw
+        tile_out, tile_in = (np.asarray(v, dtype=np.int64) for v in (tile_out, tile_in))
+        
+        compute = batch * (_tile_passes(out_features, tile_out, 1, hw.pe_cols) *
+                           _tile_passes(in_features, tile_in, 1, hw.pe_rows))
+        n_out = _ceil_div(out_features, tile_out)
+        reloads = n_out * _ceil_div(in_features, tile_in)
+        sram = _ceil_div(batch * (in_features * n_out + out_features), hw.sram_bytes_per_cycle)
+        
+        overhead = np.round(reloads * hw.tile_switch_cycles).astype(np.int64)
+        overhead += n_out * hw.drain_cycles
+        return {
+            'compute': compute,
+            'sram': sram,
+            'overhead': overhead,
+            'cycles': np.maximum(compute, sram) + overhead,
+        }
+    
+    def _tiled_cost(self, costs: Dict[str, np.ndarray], weight_bytes: int,
+                    macs: int) -> NodeCost:
+        return NodeCost(
+            compute_cycles=int(costs['compute']),
+            dma_cycles=self.estimate_dma_cycles(weight_bytes) if weight_bytes else 0,
+            sram_cycles=int(costs['sram']),
+            overhead_cycles=int(costs['overhead']),
+            macs=macs
+        )
+    
+    def node_cost(self, graph: IRGraph, node: IRNode) -> NodeCost:
+        """Latency breakdown of a graph node"""
+        inputs = [graph.get_tensor(name) for name in node.inputs]
+        outputs = [graph.get_tensor(name) for name in node.outputs]
+        activations = [t for t in inputs if t is not None and t.data is None]
+        output = outputs[0] if outputs and outputs[0] is not None else None
+        io_bytes = sum(t.nbytes for t in activations) + sum(t.nbytes for t in outputs if t)
+        weight = inputs[1] if len(inputs) > 1 and inputs[1] is not None else None
+        weight_bytes = sum(t.nbytes for t in inputs[1:] if t is not None and t.data is not None)
+        
+        op = node.op_type
+        if op in (IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D) and weight and output:
+            out_ch, in_per_group, kh, kw = weight.shape
+            batch, _, out_h, out_w = output.shape
+            if op == IROpType.DEPTHWISE_CONV2D:
+                groups = out_ch
+            else:
+                groups = max(node.get_attr('groups', 1), 1)
+            tiling = node.tile_config
+            if groups == 1 and tiling and 'fold' in tiling:
+                costs = self.conv_tile_costs(
+                    in_per_group, out_ch, out_h, out_w, kh, kw,
+                    node.get_attr('stride', (1, 1))[0],
+                    tiling['tile_oc'], tiling['tile_ic'], tiling['tile_oh'],
+                    tiling['tile_ow'], tiling['fold'],
+                    tiling['loop_order'] == 'spatial', batch)
+                return self._tiled_cost(costs, weight_bytes,
+                                        out_ch * in_per_group * batch * out_h * out_w * kh * kw)
+            return self.conv_cost(in_per_group * groups, out_ch, out_h, out_w, kh, kw,
+                                  groups=groups, input_bytes=activations[0].nbytes if activations else 0,
+                                  output_bytes=output.nbytes, weight_bytes=weight_bytes,
+                                  batch=batch)
+        
+        if op in (IROpType.FULLY_CONNECTED, IROpType.MATMUL) and weight and output:
+            if op == IROpType.FULLY_CONNECTED:
+                out_f, in_f = weight.shape[:2]
+            else:
+                in_f, out_f = weight.shape[-2], weight.shape[-1]
+            batch = max(output.size // max(out_f, 1), 1)
+            tiling = node.tile_config
+            if op == IROpType.FULLY_CONNECTED and tiling and 'tile_out' in tiling:
+                costs = self.fc_tile_costs(in_f, out_f, batch,
+                                           tiling['tile_out'], tiling['tile_in'])
+                return self._tiled_cost(costs, weight_bytes, batch * in_f * out_f)
+            return self.fc_cost(in_f, out_f, batch, weight_bytes=weight_bytes,
+                                io_bytes=io_bytes)
+        
+        if op in (IROpType.MAX_POOL2D, IROpType.AVG_POOL2D) and output:
+            kernel = node.get_attr('kernel_size', (2, 2))
+            _, channels, out_h, out_w = output.shape
+            return self.pool_cost(channels, out_h, out_w, kernel[0], kernel[1], io_bytes)
+        
+        if op == IROpType.GLOBAL_AVG_POOL and activations:
+            return self.vector_cost(activations[0].size, 1, io_bytes)
+        
+        if op in VECTOR_PASSES and output:
+            return self.vector_cost(output.size, VECTOR_PASSES[op], io_bytes)
+        
+        if op in COPY_OPS:
+            return NodeCost(sram_cycles=self._sram_cycles(io_bytes))
+        
+        return NodeCost()
+    
+    # -------------------------------------------------------------------------
+    # Cycle estimates
+    # -------------------------------------------------------------------------
+    
+    def estimate_conv_cycles(self, out_ch: int, in_ch: int,
+                             out_h: int, out_w: int,
+                             kernel_h: int, kernel_w: int) -> int:
+        """Estimate convolution cycles"""
+        return self.conv_cost(in_ch, out_ch, out_h, out_w, kernel_h, kernel_w).stage_cycles
+    
+    def estimate_fc_cycles(self, in_features: int, out_features: int) -> int:
+        """Estimate FC cycles"""
+        return self.fc_cost(in_features, out_features).stage_cycles
+    
+    def estimate_pool_cycles(self, h: int, w: int,
+                             kernel_h: int, kernel_w: int) -> int:
+        """Estimate pooling cycles (one channel)"""
+        return self.pool_cost(1, h // kernel_h, w // kernel_w, kernel_h, kernel_w).stage_cycles
+    
+    def estimate_activation_cycles(self, size: int) -> int:
+        """Estimate activation cycles"""
+        return self.vector_cost(size).stage_cycles
+    
+    def estimate_dma_cycles(self, bytes: int) -> int:
+        """Estimate DMA transfer cycles"""
+        return round(self.hw.dma_setup_cycles) + math.ceil(bytes / self.hw.dma_bytes_per_cycle)
+    
+    def estimate_node_cycles(self, graph: IRGraph, node: IRNode) -> int:
+        """Estimate cycles for a node on its unit (weight loads are scheduled separately)"""
+        return self.node_cost(graph, node).stage_cycles
+    
+    # -------------------------------------------------------------------------
+    # Bank conflicts
+    # -------------------------------------------------------------------------
+    
+    def set_bank_conflicts(self, conflicts: Dict[str, int], bank_width: int = 16):
+        """Set per-node bank conflict estimates from the memory planner"""
+        self.bank_conflicts = dict(conflicts)
+        self.bank_width = bank_width
+    
+    def estimate_bank_conflict_cycles(self, node_name: str) -> int:
+        """Estimate stall cycles from operands sharing an SRAM bank"""
+        conflict = self.bank_conflicts.get(node_name, 0)
+        return (conflict + self.bank_width - 1) // self.bank_width
+
+
+def save_calibration(hardware: HardwareConfig, path: str,
+                     fit: Optional[Dict] = None,
+                     samples: Optional[List[Dict]] = None):
+    """
+    Write fitted hardware parameters to a versioned calibration file
+    
+    Args:
+        hardware: Calibrated hardware configuration
+        path: Output JSON path
+        fit: Fit statistics (sample count, errors)
+        samples: Measurements the fit used, so it can be redone offline
+    """
+    data = {
+        'format': CALIBRATION_FORMAT,
+        'version': CALIBRATION_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'hardware': asdict(hardware),
+        'fit': fit or {},
+        'samples': samples or [],
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def read_calibration(path: str) -> Dict:
+    """Read and validate a calibration file"""
+    with open(path) as f:
+        data = json.load(f)
+    
+    if data.get('format') != CALIBRATION_FORMAT:
+        raise ValueError(f"Not a cost model calibration file: {path}")
+    if data.get('version') != CALIBRATION_VERSION:
+        raise ValueError(f"Unsupported calibration version {data.get('version')} "
+                         f"(expected {CALIBRATION_VERSION}): {path}")
+    return data
+
+
+def load_calibration(path: str) -> HardwareConfig:
+    """
+    Hardware configuration from a calibration file
+    
+    Pass the result as NPUCompiler(hardware=...) so schedules and
+    estimated cycles use the calibrated parameters.
+    """
+    params = read_calibration(path)['hardware']
+    names = {f.name for f in fields(HardwareConfig)}
+    return HardwareConfig(**{k: v for k, v in params.items() if k in names})
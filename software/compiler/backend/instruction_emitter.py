@@ -9,6 +9,7 @@ from enum import IntEnum
 import struct
 
 from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+from .memory_allocator import SpillEvent, WeightTile, dma_chunks
 
 
 class NPUOpCode(IntEnum):
@@ -104,16 +105,31 @@ class InstructionEmitter:
         self.instructions: List[NPUInstruction] = []
         self.labels: Dict[str, int] = {}
         
+        # Weight address fixups: (instruction index, weight tensor)
+        self.relocations: List[Tuple[int, str]] = []
+        
         # Memory allocation info (set by MemoryAllocator)
         self.weight_offsets: Dict[str, int] = {}
         self.activation_offsets: Dict[str, int] = {}
     
+        # Weight streaming: node name -> tiles, and the whole stream in order
+        self.weight_tiles: Dict[str, List[WeightTile]] = {}
+        self.weight_stream: List[WeightTile] = []
+        self._next_tile = 0  # first stream tile not yet issued
+    
     def set_memory_map(self, weight_offsets: Dict[str, int], 
                        activation_offsets: Dict[str, int]):
         """Set memory allocation info"""
         self.weight_offsets = weight_offsets
         self.activation_offsets = activation_offsets
     
+    def set_weight_stream(self, weight_tiles: Dict[str, List[WeightTile]]):
+        """Set weight streaming plan (from MemoryAllocator.plan_weight_stream)"""
+        self.weight_tiles = weight_tiles
+        self.weight_stream = sorted((t for tiles in weight_tiles.values() for t in tiles),
+                                    key=lambda t: t.index)
+        self._next_tile = 0
+    
     def emit(self, inst: NPUInstruction):
         """Emit single instruction"""
         self.instructions.append(inst)
@@ -134,10 +150,11 @@ class InstructionEmitter:
         """Emit WAIT_DMA"""
         self.emit(NPUInstruction(NPUOpCode.WAIT_DMA))
     
-    def emit_dma_load_weight(self, src_addr: int, dst_addr: int, length: int):
+    def emit_dma_load_weight(self, src_addr: int, dst_addr: int, length: int,
+                             flags: int = 0):
         """Emit DMA load for weights"""
         operands = (src_addr & 0xFFFFFF) | ((dst_addr & 0xFFFF) << 24) | ((length & 0xFF) << 40)
-        self.emit(NPUInstruction(NPUOpCode.DMA_LOAD_W, operands=operands))
+        self.emit(NPUInstruction(NPUOpCode.DMA_LOAD_W, flags=flags, operands=operands))
     
     def emit_dma_load_activation(self, src_addr: int, dst_addr: int, length: int):
         """Emit DMA load for activations"""
@@ -158,25 +175,30 @@ class InstructionEmitter:
         operands = (addr & 0xFFFFFF) | ((count & 0xFFFF) << 24)
         self.emit(NPUInstruction(NPUOpCode.LOAD_WEIGHT, operands=operands))
     
-    def emit_compute(self, flags: int = 0):
-        """Emit compute instruction"""
-        self.emit(NPUInstruction(NPUOpCode.COMPUTE, flags=flags))
+    def emit_compute(self, flags: int = 0, tile_oh: int = 0, tile_ow: int = 0):
+        """Emit compute instruction (output tile of 0 = whole plane)"""
+        operands = (tile_oh & 0xFFF) | ((tile_ow & 0xFFF) << 12)
+        self.emit(NPUInstruction(NPUOpCode.COMPUTE, flags=flags, operands=operands))
     
     def emit_drain(self, addr: int):
         """Emit drain results"""
         self.emit(NPUInstruction(NPUOpCode.DRAIN, operands=addr))
     
     def emit_conv(self, kernel_h: int, kernel_w: int, stride_h: int, stride_w: int,
-                  pad_h: int, pad_w: int, flags: int = 0):
-        """Emit convolution config"""
+                  pad_h: int, pad_w: int, flags: int = 0,
+                  tile_ic: int = 0, fold: int = 0):
+        """Emit convolution config (tile_ic / fold of 0 = controller default)"""
         operands = (kernel_h & 0xF) | ((kernel_w & 0xF) << 4)
         operands |= ((stride_h & 0xF) << 8) | ((stride_w & 0xF) << 12)
         operands |= ((pad_h & 0xF) << 16) | ((pad_w & 0xF) << 20)
+        operands |= ((tile_ic & 0xFFF) << 24) | ((fold & 0x3F) << 36)
         self.emit(NPUInstruction(NPUOpCode.CONV, flags=flags, operands=operands))
     
-    def emit_fc(self, in_features: int, out_features: int, flags: int = 0):
-        """Emit fully connected config"""
+    def emit_fc(self, in_features: int, out_features: int, flags: int = 0,
+                tile_in: int = 0):
+        """Emit fully connected config (tile_in of 0 = controller default)"""
         operands = (in_features & 0xFFFF) | ((out_features & 0xFFFF) << 16)
+        operands |= (tile_in & 0xFFF) << 32
         self.emit(NPUInstruction(NPUOpCode.FC, flags=flags, operands=operands))
     
     def emit_relu(self):
@@ -223,6 +245,87 @@ class InstructionEmitter:
         """Emit loop end"""
         self.emit(NPUInstruction(NPUOpCode.LOOP_END, operands=target))
     
+    def emit_weight_prefetch(self):
+        """Issue the next pending weight tile load without waiting for it"""
+        if self._next_tile >= len(self.weight_stream):
+            return
+        tile = self.weight_stream[self._next_tile]
+        self._next_tile += 1
+        for offset, length in dma_chunks(tile.size):
+            # dst and length in 16-byte units
+            self.emit_dma_load_weight(tile.src_offset + offset, (tile.dst_offset + offset) // 16,
+                                      -(-length // 16), flags=NPUFlags.ASYNC)
+    
+    def _wait_weight_tile(self, tile: WeightTile):
+        """Wait for a tile's load, then prefetch the next one into the other half"""
+        while self._next_tile <= tile.index:
+            self.emit_weight_prefetch()
+        self.emit_wait_dma()
+        self.emit_weight_prefetch()
+    
+    def _begin_weight_tile(self, tile: WeightTile):
+        """Wait for a tile and load all of its channels into the PE array"""
+        self._wait_weight_tile(tile)
+        self.emit_load_weight(tile.dst_offset, tile.channels)
+    
+    def _emit_conv_blocks(self, config: Dict, addr: int, channels: int,
+                          channel_bytes: int, out_h: int, out_w: int, flags: int):
+        """
+        Run a buffered weight tile as tile_oc-channel blocks over
+        tile_oh x tile_ow output tiles, in the searched loop order
+        """
+        tile_oc = max(1, min(config['tile_oc'], channels))
+        tile_oh = min(config['tile_oh'], out_h)
+        tile_ow = min(config['tile_ow'], out_w)
+        n_spatial = -(-out_h // tile_oh) * -(-out_w // tile_ow)
+        if tile_oh == out_h and tile_ow == out_w:
+            tile_oh = tile_ow = 0  # whole plane
+        
+        def open_loop() -> Optional[int]:
+            if n_spatial == 1:
+                return None
+            self.emit_loop_start(n_spatial)
+            return len(self.instructions)
+        
+        def close_loop(start: Optional[int]):
+            if start is not None:
+                self.emit_loop_end(start)
+        
+        blocks = [(start, min(tile_oc, channels - start))
+                  for start in range(0, channels, tile_oc)]
+        if config.get('loop_order') == 'spatial':
+            # Input window stays put while the weight blocks cycle
+            loop = open_loop()
+            for start, count in blocks:
+                self.emit_load_weight(addr + start * channel_bytes, count)
+                self.emit_clear_acc()
+                self.emit_compute(flags, tile_oh, tile_ow)
+            close_loop(loop)
+        else:
+            # Weight block stays put while the output tiles cycle
+            for start, count in blocks:
+                self.emit_load_weight(addr + start * channel_bytes, count)
+                loop = open_loop()
+                self.emit_clear_acc()
+                self.emit_compute(flags, tile_oh, tile_ow)
+                close_loop(loop)
+    
+    def emit_spill_store(self, event: SpillEvent):
+        """Write an evicted activation to the spill area and wait for it"""
+        for offset, length in dma_chunks(event.size):
+            # dst and length in 16-byte units
+            self.emit_dma_store(event.act_offset + offset, (event.dram_offset + offset) // 16,
+                                -(-length // 16))
+        self.emit_wait_dma()
+    
+    def emit_spill_load(self, event: SpillEvent):
+        """Bring a spilled activation back before its next use"""
+        for offset, length in dma_chunks(event.size):
+            # dst and length in 16-byte units
+            self.emit_dma_load_activation(event.dram_offset + offset,
+                                          (event.act_offset + offset) // 16, -(-length // 16))
+        self.emit_wait_dma()
+    
     def emit_node(self, graph: IRGraph, node: IRNode):
         """Emit instructions for IR node"""
         if node.op_type == IROpType.CONV2D:
@@ -256,21 +359,64 @@ class InstructionEmitter:
         padding = node.get_attr('padding', (0, 0))
         activation = node.get_attr('activation')
         
+        # Configure and execute conv
+        flags = 0
+        if activation == 'relu':
+            flags |= NPUFlags.RELU
+        
+        # Searched tiling: tile_ic / fold go to the controller's K loop
+        config = node.tile_config if node.tile_config and 'fold' in node.tile_config else None
+        tile_ic = config['tile_ic'] if config else 0
+        fold = config['fold'] if config else 0
+        weight_tensor = graph.get_tensor(node.inputs[1])
+        output_tensor = graph.get_tensor(node.outputs[0])
+        if config and (weight_tensor is None or output_tensor is None):
+            config = None
+        
+        # Streamed weights: one pass per output-channel tile
+        tiles = self.weight_tiles.get(node.name)
+        if tiles:
+            for tile in tiles:
+                if config:
+                    self._wait_weight_tile(tile)
+                    self.emit_conv(kernel_size[0], kernel_size[1],
+                                   stride[0], stride[1],
+                                   padding[0], padding[1], flags, tile_ic, fold)
+                    self._emit_conv_blocks(config, tile.dst_offset, tile.channels,
+                                           tile.size // max(tile.channels, 1),
+                                           output_tensor.shape[2], output_tensor.shape[3],
+                                           flags)
+                    self.emit_sync()
+                    continue
+                self._begin_weight_tile(tile)
+                self.emit_clear_acc()
+                self.emit_conv(kernel_size[0], kernel_size[1],
+                               stride[0], stride[1],
+                               padding[0], padding[1], flags)
+                self.emit_compute(flags)
+                self.emit_sync()
+            return
+        
         # Get memory offsets
         weight_name = node.inputs[1]
         weight_offset = self.weight_offsets.get(weight_name, 0)
         
         # Load weights
-        weight_tensor = graph.get_tensor(weight_name)
         if weight_tensor:
             weight_size = weight_tensor.nbytes
             self.emit_dma_load_weight(weight_offset, 0, weight_size // 16)
+            self.relocations.append((len(self.instructions) - 1, weight_name))
             self.emit_wait_dma()
         
-        # Configure and execute conv
-        flags = 0
-        if activation == 'relu':
-            flags |= NPUFlags.RELU
+        if config:
+            out_ch = weight_tensor.shape[0]
+            self.emit_conv(kernel_size[0], kernel_size[1],
+                           stride[0], stride[1],
+                           padding[0], padding[1], flags, tile_ic, fold)
+            self._emit_conv_blocks(config, 0, out_ch, weight_tensor.nbytes // out_ch,
+                                   output_tensor.shape[2], output_tensor.shape[3], flags)
+            self.emit_sync()
+            return
         
         self.emit_clear_acc()
         self.emit_conv(kernel_size[0], kernel_size[1], 
@@ -290,6 +436,14 @@ class InstructionEmitter:
         operands |= ((stride[0] & 0xF) << 8) | ((stride[1] & 0xF) << 12)
         operands |= ((padding[0] & 0xF) << 16) | ((padding[1] & 0xF) << 20)
         
+        tiles = self.weight_tiles.get(node.name)
+        if tiles:
+            for tile in tiles:
+                self._begin_weight_tile(tile)
+                self.emit(NPUInstruction(NPUOpCode.DWCONV, operands=operands))
+                self.emit_sync()
+            return
+        
         self.emit(NPUInstruction(NPUOpCode.DWCONV, operands=operands))
         self.emit_sync()
     
@@ -306,8 +460,34 @@ class InstructionEmitter:
         activation = node.get_attr('activation')
         flags = NPUFlags.RELU if activation == 'relu' else 0
         
+        # Searched tiling: tile_out-row blocks, tile_in handled by the controller
+        config = node.tile_config if node.tile_config and 'tile_out' in node.tile_config else None
+        tile_in = config['tile_in'] if config else 0
+        
+        tiles = self.weight_tiles.get(node.name)
+        if tiles:
+            for tile in tiles:
+                if config:
+                    self._wait_weight_tile(tile)
+                    row_bytes = tile.size // max(tile.channels, 1)
+                    step = max(1, min(config['tile_out'], tile.channels))
+                    for start in range(0, tile.channels, step):
+                        count = min(step, tile.channels - start)
+                        self.emit_load_weight(tile.dst_offset + start * row_bytes, count)
+                        self.emit_clear_acc()
+                        self.emit_fc(in_features, count, flags, tile_in)
+                        self.emit_compute(flags)
+                    self.emit_sync()
+                    continue
+                self._begin_weight_tile(tile)
+                self.emit_clear_acc()
+                self.emit_fc(in_features, tile.channels, flags)
+                self.emit_compute(flags)
+                self.emit_sync()
+            return
+        
         self.emit_clear_acc()
-        self.emit_fc(in_features, out_features, flags)
+        self.emit_fc(in_features, out_features, flags, tile_in)
         self.emit_compute(flags)
         self.emit_sync()
     
@@ -3,11 +3,13 @@ EdgeNPU Compiler - Memory Allocator
 Allocate buffers for weights and activations
 """
 
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Any, Callable, Dict, List, Tuple, Optional, Set, Union
 from dataclasses import dataclass, field
 from enum import Enum, auto
+import numpy as np
 
 from ..frontend.ir_builder import IRGraph, IRNode, IRTensor, IROpType
+from ..optimizer.analysis import AnalysisManager, LivenessAnalysis, TopoOrderAnalysis
 
 
 class MemoryRegion(Enum):
@@ -15,6 +17,8 @@ class MemoryRegion(Enum):
     WEIGHT_BUFFER = auto()
     ACTIVATION_BUFFER = auto()
     INSTRUCTION_BUFFER = auto()
+    WEIGHT_DRAM = auto()       # off-chip weight image (weight streaming)
+    SPILL_DRAM = auto()        # off-chip activation spill area
 
 
 @dataclass
@@ -66,6 +70,30 @@ class MemoryPool:
         
         return block
     
+    def place(self, name: str, offset: int, size: int, tensor_name: str) -> MemoryBlock:
+        """Record a block at a planned offset"""
+        if offset % self.alignment:
+            raise ValueError(f"Unaligned offset {offset} for {tensor_name} in {self.region.name}")
+        
+        if offset + size > self.total_size:
+            raise MemoryError(f"Out of memory in {self.region.name}: "
+                            f"need {size} bytes at offset {offset}, "
+                            f"total {self.total_size}")
+        
+        block = MemoryBlock(
+            name=name,
+            region=self.region,
+            offset=offset,
+            size=size,
+            tensor_name=tensor_name
+        )
+        
+        self.blocks.append(block)
+        self.free_offset = max(self.free_offset, block.end)
+        self.peak_usage = max(self.peak_usage, block.end)
+        
+        return block
+    
     def free(self, block: MemoryBlock):
         """Free a memory block (for reuse)"""
         if block in self.blocks:
@@ -81,103 +109,885 @@ class MemoryPool:
         return self.free_offset, self.peak_usage
 
 
+@dataclass
+class MemoryConfig:
+    """
+    On-chip buffer geometry
+    
+    Defaults match npu_pkg.sv: 128-bit AXI data path, unbanked buffers.
+    With num_banks > 1 each buffer is split into that many contiguous banks;
+    two operands of one op in the same bank are serialized by the SRAM.
+    """
+    num_banks: int = 1
+    bank_width: int = 16      # bytes per SRAM word (AXI_DATA_WIDTH / 8)
+    burst_bytes: int = 16     # DMA burst granularity, allocations are padded to it
+    
+    def __post_init__(self):
+        for name in ('num_banks', 'bank_width', 'burst_bytes'):
+            value = getattr(self, name)
+            if value < 1 or value & (value - 1):
+                raise ValueError(f"MemoryConfig.{name} must be a power of two, got {value}")
+    
+    @property
+    def alignment(self) -> int:
+        """Offset alignment: whole SRAM words and bursts"""
+        return max(self.bank_width, self.burst_bytes)
+    
+    def pad(self, size: int) -> int:
+        """Round size up to a whole number of bursts"""
+        return (size + self.burst_bytes - 1) & ~(self.burst_bytes - 1)
+    
+    def bank_size(self, total_size: int) -> int:
+        """Bytes per bank of a buffer (0 if unbanked)"""
+        if self.num_banks == 1:
+            return 0
+        return total_size // self.num_banks
+
+
+def bank_mask(offset: int, size: int, bank_size: int) -> int:
+    """Bitmask of the banks [offset, offset + size) touches"""
+    first = offset // bank_size
+    last = (offset + max(size, 1) - 1) // bank_size
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def dma_chunks(size: int) -> List[Tuple[int, int]]:
+    """(offset, length) of the DMA descriptors moving size bytes"""
+    return [(offset, min(DMA_MAX_BYTES, size - offset))
+            for offset in range(0, size, DMA_MAX_BYTES)]
+
+
+@dataclass
+class TensorLifetime:
+    """Size and live range (inclusive node positions) of a tensor"""
+    name: str
+    size: int
+    start: int
+    end: int
+    
+    def overlaps(self, other: 'TensorLifetime') -> bool:
+        return self.start <= other.end and other.start <= self.end
+
+
+# Orders in which plan_offsets places tensors: largest first by default;
+# the others pack some lifetime patterns the size order fragments
+PLACEMENT_ORDERS = {
+    'size': lambda t: (-t.size, t.start),
+    'start': lambda t: (t.start, -t.size),
+    'lifetime': lambda t: (t.start - t.end, -t.size, t.start),
+}
+
+# Seeded random placement orders tried when only fragmentation overflows
+REPLAN_ATTEMPTS = 32
+
+
+def plan_offsets(lifetimes: List[TensorLifetime], alignment: int = 16,
+                 bank_size: int = 0, conflicts: Optional[Dict[str, Set[str]]] = None,
+                 capacity: Optional[int] = None,
+                 order: Union[str, Callable[[TensorLifetime], Any]] = 'size'
+                 ) -> Tuple[Dict[str, int], int]:
+    """
+    Assign offsets so tensors that are live at the same time never overlap
+    
+    Greedy: tensors are placed in the given order (a PLACEMENT_ORDERS name
+    or a sort key; largest first by default), each into the smallest gap
+    between already placed, lifetime-overlapping tensors that fits it
+    (best fit), or above all of them if no gap does.
+    
+    With bank_size and conflicts (tensor -> tensors accessed together with
+    it), a tensor with placed partners instead takes the offset sharing
+    the fewest banks with them, as long as it stays within capacity.
+    
+    Returns:
+        (tensor name -> offset, peak bytes)
+    """
+    offsets: Dict[str, int] = {}
+    live_at: Dict[int, List[TensorLifetime]] = {}  # position -> placed tensors
+    peak = 0
+    
+    key = PLACEMENT_ORDERS[order] if isinstance(order, str) else order
+    for lt in sorted(lifetimes, key=key):
+        # Placed tensors sharing any position with this one
+        seen: Set[str] = set()
+        neighbours = []
+        for pos in range(lt.start, lt.end + 1):
+            for other in live_at.get(pos, ()):
+                if other.name not in seen:
+                    seen.add(other.name)
+                    neighbours.append(other)
+        neighbours.sort(key=lambda o: offsets[o.name])
+        
+        partners = []
+        if bank_size and conflicts and lt.name in conflicts:
+            partners = [o for o in neighbours if o.name in conflicts[lt.name]]
+        if partners:
+            best_offset = _bank_aware_offset(lt, neighbours, partners, offsets, alignment,
+                                             bank_size, peak, capacity)
+        else:
+            best_offset = _best_fit_offset(lt, neighbours, offsets, alignment)
+        
+        offsets[lt.name] = best_offset
+        peak = max(peak, best_offset + lt.size)
+        for pos in range(lt.start, lt.end + 1):
+            live_at.setdefault(pos, []).append(lt)
+    
+    return offsets, peak
+
+
+def _best_fit_offset(lt: TensorLifetime, neighbours: List[TensorLifetime],
+                     offsets: Dict[str, int], alignment: int) -> int:
+    """Smallest gap below, between or above the neighbours that fits lt"""
+    best_offset = None
+    best_gap = None
+    cursor = 0
+    for other in neighbours:
+        gap = offsets[other.name] - cursor
+        if gap >= lt.size and (best_gap is None or gap < best_gap):
+            best_offset, best_gap = cursor, gap
+        end = offsets[other.name] + other.size
+        cursor = max(cursor, (end + alignment - 1) & ~(alignment - 1))
+    return best_offset if best_offset is not None else cursor
+
+
+def _bank_aware_offset(lt: TensorLifetime, neighbours: List[TensorLifetime],
+                       partners: List[TensorLifetime], offsets: Dict[str, int],
+                       alignment: int, bank_size: int, peak: int,
+                       capacity: Optional[int]) -> int:
+    """Offset for lt that shares the fewest banks with its placed partners"""
+    limit = capacity if capacity is not None else peak + bank_size + lt.size
+    masks = [bank_mask(offsets[o.name], o.size, bank_size) for o in partners]
+    
+    # Gaps between neighbours (stop None = above all of them)
+    gaps = []
+    cursor = 0
+    for other in neighbours:
+        if offsets[other.name] - cursor >= lt.size:
+            gaps.append((cursor, offsets[other.name]))
+        end = offsets[other.name] + other.size
+        cursor = max(cursor, (end + alignment - 1) & ~(alignment - 1))
+    gaps.append((cursor, None))
+    
+    best_offset = None
+    best_key = None
+    for start, stop in gaps:
+        # Gap start, then every bank boundary the tensor still fits after
+        top = stop if stop is not None else max(limit, start + lt.size)
+        candidates = [start]
+        boundary = (start // bank_size + 1) * bank_size
+        while boundary + lt.size <= top:
+            candidates.append(boundary)
+            boundary += bank_size
+        
+        for offset in candidates:
+            end = offset + lt.size
+            mask = bank_mask(offset, lt.size, bank_size)
+            shared = sum(bin(mask & m).count('1') for m in masks)
+            key = (end > limit, shared, max(end, peak) - peak,
+                   stop - start if stop is not None else float('inf'), offset)
+            if best_key is None or key < best_key:
+                best_offset, best_key = offset, key
+    
+    return best_offset
+
+
+# Ops whose weights (inputs[1]) are loaded into the weight buffer
+STREAMED_OPS = (IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D, IROpType.FULLY_CONNECTED)
+
+# DMA_LOAD_W source addresses are 24 bits
+WEIGHT_DRAM_SIZE = 1 << 24
+
+# DMA destinations are 16 bits of 16-byte units: spill stores address the
+# spill area and refills the activation buffer within this range
+SPILL_DRAM_SIZE = 0x10000 * 16
+
+# DMA lengths are 8 bits of 16-byte units; longer transfers take several descriptors
+DMA_MAX_BYTES = 0xFF * 16
+
+# Cheap single-input ops recomputed from a resident input instead of
+# spilling their output
+RECOMPUTE_OPS = (IROpType.RELU, IROpType.RELU6, IROpType.SIGMOID, IROpType.TANH,
+                 IROpType.MAX_POOL2D, IROpType.AVG_POOL2D)
+
+# Ops whose output is byte-identical to their input (reshape, flatten,
+# squeeze, contiguous all lower to RESHAPE)
+VIEW_OPS = (IROpType.RESHAPE,)
+
+# Element-wise ops that may overwrite an input that dies at them
+IN_PLACE_OPS = (IROpType.RELU, IROpType.RELU6, IROpType.SIGMOID, IROpType.TANH,
+                IROpType.LEAKY_RELU, IROpType.SWISH, IROpType.GELU,
+                IROpType.ADD, IROpType.SUB, IROpType.MUL, IROpType.DIV)
+
+
+@dataclass
+class WeightTile:
+    """One buffered load of a weight tensor (DMA descriptors of up to DMA_MAX_BYTES)"""
+    index: int           # position in the whole weight stream
+    node_name: str
+    tensor_name: str
+    src_offset: int      # offset in the DRAM weight image
+    size: int
+    channels: int        # output channels covered by this tile
+    slot: int            # ping-pong buffer half (0 or 1)
+    dst_offset: int      # offset in the weight buffer
+
+
+@dataclass
+class SpillEvent:
+    """Activation store/load (or recompute) inserted around a node"""
+    kind: str            # 'store' (after node), 'load' or 'recompute' (before node)
+    tensor_name: str
+    node_name: str
+    act_offset: int      # activation buffer offset
+    size: int
+    dram_offset: int = 0             # spill area offset (store/load)
+    producer: Optional[str] = None   # node to re-run (recompute)
+
+
 class MemoryAllocator:
     """
     Memory allocator for NPU
     Manages weight and activation buffers
+    
+    Offsets are aligned to SRAM words and bursts of the given MemoryConfig
+    and sizes padded to whole bursts; on banked buffers, activations read
+    or written by the same op are kept in different banks where possible.
     """
     
     def __init__(self, weight_buf_kb: int = 256, act_buf_kb: int = 256,
-                 inst_buf_entries: int = 1024):
+                 inst_buf_entries: int = 1024, weight_streaming: Optional[bool] = None,
+                 recompute: bool = True, aliasing: bool = True,
+                 memory: Optional[MemoryConfig] = None):
+        self.memory = memory or MemoryConfig()
         self.weight_pool = MemoryPool(
             region=MemoryRegion.WEIGHT_BUFFER,
-            total_size=weight_buf_kb * 1024
+            total_size=weight_buf_kb * 1024,
+            alignment=self.memory.alignment
         )
         self.activation_pool = MemoryPool(
             region=MemoryRegion.ACTIVATION_BUFFER,
-            total_size=act_buf_kb * 1024
+            total_size=act_buf_kb * 1024,
+            alignment=self.memory.alignment
         )
         self.inst_buf_size = inst_buf_entries * 8  # 64-bit instructions
         
+        # Weight streaming: weights stay in a DRAM image and are paged
+        # through two halves of the weight buffer. None = only when the
+        # weights don't fit on-chip.
+        self.weight_streaming = weight_streaming
+        self.streaming_weights = False
+        self.weight_image = MemoryPool(
+            region=MemoryRegion.WEIGHT_DRAM,
+            total_size=WEIGHT_DRAM_SIZE,
+            alignment=self.memory.alignment
+        )
+        
         # Allocation maps
         self.weight_offsets: Dict[str, int] = {}
         self.activation_offsets: Dict[str, int] = {}
+        # tensor -> (first, last position, offset) per resident segment;
+        # a spilled tensor may be refilled at a different offset
+        self.activation_segments: Dict[str, List[Tuple[int, int, int]]] = {}
         
         # Liveness analysis
         self.tensor_liveness: Dict[str, Tuple[int, int]] = {}  # tensor -> (first_use, last_use)
+        self.activation_bytes = 0  # sum of activation sizes (no reuse)
+        
+        # Spill/fill when the live set exceeds the activation buffer
+        self.recompute = recompute
+        self.spill_pool = MemoryPool(
+            region=MemoryRegion.SPILL_DRAM,
+            total_size=SPILL_DRAM_SIZE,
+            alignment=self.memory.alignment
+        )
+        self.spills_before: Dict[str, List[SpillEvent]] = {}  # node -> loads/recomputes
+        self.spills_after: Dict[str, List[SpillEvent]] = {}   # node -> stores
+        
+        # Aliasing: views, in-place ops and concat inputs share storage
+        self.aliasing = aliasing
+        self.aliases: Dict[str, Tuple[str, int]] = {}  # tensor -> (storage root, offset)
+        self.alias_counts = {'views': 0, 'in_place': 0, 'concat_slices': 0}
+        self.storage_bytes = 0  # sum of storage sizes after aliasing
+        self._tensor_uses: Dict[str, List[int]] = {}
+        self._shared: Set[str] = set()  # roots aliased by another tensor
+        
+        # Node -> activation bytes serialized by bank conflicts
+        self.bank_conflicts: Dict[str, int] = {}
+        
+        # Shared analysis cache (topological order, liveness)
+        self.analyses = AnalysisManager()
     
     def analyze_liveness(self, graph: IRGraph):
         """Analyze tensor liveness for memory reuse"""
-        sorted_nodes = graph.topological_sort()
+        sorted_nodes = self.analyses.get(TopoOrderAnalysis, graph)
         
         for i, node in enumerate(sorted_nodes):
             node.schedule_order = i
-            
-            # Mark input tensors as live
-            for inp in node.inputs:
-                if inp not in self.tensor_liveness:
-                    self.tensor_liveness[inp] = (i, i)
-                else:
-                    first, last = self.tensor_liveness[inp]
-                    self.tensor_liveness[inp] = (first, i)
-            
-            # Mark output tensors
-            for out in node.outputs:
-                if out not in self.tensor_liveness:
-                    self.tensor_liveness[out] = (i, i)
+        
+        self.tensor_liveness.update(self.analyses.get(LivenessAnalysis, graph))
     
-    def allocate_weights(self, graph: IRGraph):
-        """Allocate memory for all weights"""
+    def _weight_tensors(self, graph: IRGraph) -> List[Tuple[str, IRTensor]]:
+        """Constants that reach the NPU"""
+        outputs = set(graph.outputs)
+        weights = []
         for name, tensor in graph.tensors.items():
             if tensor.data is not None:  # It's a weight/constant
-                size = tensor.nbytes
-                block = self.weight_pool.allocate(
-                    name=f"weight_{name}",
-                    size=size,
-                    tensor_name=name
-                )
-                self.weight_offsets[name] = block.offset
+                # Orphaned constants (no reader) never reach the NPU
+                if not graph.get_consumers(name) and name not in outputs:
+                    continue
+                weights.append((name, tensor))
+        return weights
+    
+    def allocate_weights(self, graph: IRGraph):
+        """Allocate memory for all weights"""
+        weights = self._weight_tensors(graph)
+        
+        streaming = self.weight_streaming
+        if streaming is None:
+            align = self.weight_pool.alignment
+            resident = sum((self.memory.pad(t.nbytes) + align - 1) & ~(align - 1)
+                           for _, t in weights)
+            streaming = resident > self.weight_pool.total_size
+        self.streaming_weights = streaming
+        
+        # Streamed weights are laid out in the DRAM image; the weight buffer
+        # only holds the two ping-pong halves
+        pool = self.weight_image if streaming else self.weight_pool
+        for name, tensor in weights:
+            size = self.memory.pad(tensor.nbytes)
+            block = pool.allocate(
+                name=f"weight_{name}",
+                size=size,
+                tensor_name=name
+            )
+            self.weight_offsets[name] = block.offset
+        
+        if streaming:
+            half = self.weight_slot_size
+            for slot in range(2):
+                self.weight_pool.place(f"weight_slot{slot}", slot * half, half,
+                                       tensor_name=f"<slot{slot}>")
+    
+    @property
+    def weight_slot_size(self) -> int:
+        """Size of one ping-pong half of the weight buffer"""
+        align = self.weight_pool.alignment
+        return (self.weight_pool.total_size // 2) & ~(align - 1)
+    
+    def plan_weight_stream(self, graph: IRGraph,
+                           nodes: List[IRNode]) -> Dict[str, List[WeightTile]]:
+        """
+        Split weight loads into DMA tiles, in execution order
+        
+        Streamed weights: each tile is a run of output channels that fits
+        one half of the weight buffer; consecutive tiles alternate between
+        the halves so tile N+1 can load while tile N is being computed.
+        Resident weights: one tile per op, loaded into the tensor's own
+        buffer offset, so the next op's load overlaps this op's compute.
+        
+        Returns:
+            node name -> tiles
+        """
+        tiles: Dict[str, List[WeightTile]] = {}
+        half = self.weight_slot_size
+        index = 0
+        for node in nodes:
+            if node.op_type not in STREAMED_OPS or len(node.inputs) < 2:
+                continue
+            weight_name = node.inputs[1]
+            tensor = graph.get_tensor(weight_name)
+            if tensor is None or tensor.data is None or weight_name not in self.weight_offsets:
+                continue
+            
+            out_ch = tensor.shape[0] if tensor.shape else 1
+            if not self.streaming_weights:
+                offset = self.weight_offsets[weight_name]
+                tiles[node.name] = [WeightTile(
+                    index=index,
+                    node_name=node.name,
+                    tensor_name=weight_name,
+                    src_offset=offset,
+                    size=tensor.nbytes,
+                    channels=out_ch,
+                    slot=index % 2,
+                    dst_offset=offset
+                )]
+                index += 1
+                continue
+            
+            channel_bytes = tensor.nbytes // max(out_ch, 1)
+            if channel_bytes > half:
+                raise MemoryError(f"Out of memory in {self.weight_pool.region.name}: "
+                                f"one output channel of {weight_name} needs "
+                                f"{channel_bytes} bytes, weight buffer half is {half}")
+            per_tile = max(1, half // max(channel_bytes, 1))
+            
+            node_tiles = []
+            for start in range(0, out_ch, per_tile):
+                channels = min(per_tile, out_ch - start)
+                slot = index % 2
+                node_tiles.append(WeightTile(
+                    index=index,
+                    node_name=node.name,
+                    tensor_name=weight_name,
+                    src_offset=self.weight_offsets[weight_name] + start * channel_bytes,
+                    size=channels * channel_bytes,
+                    channels=channels,
+                    slot=slot,
+                    dst_offset=slot * half
+                ))
+                index += 1
+            tiles[node.name] = node_tiles
+        
+        return tiles
+    
+    def activation_uses(self, graph: IRGraph) -> Dict[str, List[int]]:
+        """Positions (topological order) at which each activation must be resident"""
+        sorted_nodes = self.analyses.get(TopoOrderAnalysis, graph)
+        last = max(len(sorted_nodes) - 1, 0)
+        inputs = set(graph.inputs)
+        outputs = set(graph.outputs)
+        
+        uses: Dict[str, Set[int]] = {}
+        for i, node in enumerate(sorted_nodes):
+            for name in list(node.inputs) + list(node.outputs):
+                tensor = graph.get_tensor(name)
+                if tensor is not None and tensor.data is None:
+                    uses.setdefault(name, set()).add(i)
+        
+        # Graph inputs are loaded before the first node, outputs are
+        # read back after the last one
+        for name in uses:
+            if name in inputs:
+                uses[name].add(0)
+            if name in outputs:
+                uses[name].add(last)
+        
+        return {name: sorted(pos) for name, pos in uses.items()}
+    
+    def plan_aliases(self, graph: IRGraph, sorted_nodes: List[IRNode],
+                     uses: Dict[str, List[int]]) -> Dict[str, Tuple[str, int]]:
+        """
+        Group activations that can share storage
+        
+        A view shares its input's bytes; an in-place op writes over an input
+        whose storage dies at it; the inputs of a concat along its outermost
+        non-unit axis are produced straight into slices of the output.
+        
+        Returns:
+            tensor -> (storage root, byte offset inside the root)
+        """
+        aliases = {name: (name, 0) for name in uses}
+        if not self.aliasing:
+            return aliases
+        
+        sizes = {name: graph.get_tensor(name).nbytes for name in uses}
+        members = {name: [name] for name in uses}
+        last = {name: pos[-1] for name, pos in uses.items()}
+        pinned = set(graph.outputs) & set(uses)  # roots holding a graph output
+        
+        def merge(root: str, into: str, shift: int):
+            for name in members.pop(root):
+                aliases[name] = (into, aliases[name][1] + shift)
+                members[into].append(name)
+            last[into] = max(last[into], last.pop(root))
+            if root in pinned:
+                pinned.add(into)
+        
+        for i, node in enumerate(sorted_nodes):
+            if len(node.outputs) != 1 or node.outputs[0] not in uses:
+                continue
+            out = node.outputs[0]
+            
+            if node.op_type in VIEW_OPS:
+                src = node.inputs[0] if node.inputs else None
+                if src in uses and sizes[src] == sizes[out]:
+                    root, offset = aliases[src]
+                    merge(out, root, offset)
+                    self.alias_counts['views'] += 1
+            
+            elif node.op_type in IN_PLACE_OPS:
+                for src in dict.fromkeys(node.inputs):
+                    if src not in uses or sizes[src] != sizes[out]:
+                        continue
+                    root, offset = aliases[src]
+                    if last[root] == i and root not in pinned:
+                        merge(out, root, offset)
+                        self.alias_counts['in_place'] += 1
+                        break
+            
+            elif node.op_type == IROpType.CONCAT:
+                # Slices are contiguous only if every dim before axis is 1
+                shape = graph.get_tensor(out).shape
+                axis = node.get_attr('axis', 1) % max(len(shape), 1)
+                outer = 1
+                for dim in shape[:axis]:
+                    outer *= dim
+                inputs = list(node.inputs)
+                if (outer != 1 or len(set(inputs)) != len(inputs)
+                        or any(inp not in uses for inp in inputs)
+                        or sum(sizes[inp] for inp in inputs) != sizes[out]):
+                    continue
+                
+                offset = 0
+                for inp in inputs:
+                    root, rel = aliases[inp]
+                    # The input's whole group must fit inside its slice
+                    if root != out and all(
+                            rel <= aliases[m][1] and
+                            aliases[m][1] + sizes[m] <= rel + sizes[inp]
+                            for m in members[root]):
+                        merge(root, out, offset - rel)
+                        self.alias_counts['concat_slices'] += 1
+                    offset += sizes[inp]
+        
+        return aliases
+    
+    def activation_lifetimes(self, graph: IRGraph) -> List[TensorLifetime]:
+        """Live ranges of activation tensors in topological order"""
+        return [TensorLifetime(name, graph.get_tensor(name).nbytes, pos[0], pos[-1])
+                for name, pos in self.activation_uses(graph).items()]
+    
+    @staticmethod
+    def _segments(uses: Dict[str, List[int]], sizes: Dict[str, int],
+                  evicted: Dict[str, Set[Tuple[int, int]]]) -> Dict[str, List[TensorLifetime]]:
+        """Split lifetimes at evicted gaps between consecutive uses"""
+        segments: Dict[str, List[TensorLifetime]] = {}
+        for name, pos in uses.items():
+            gaps = evicted.get(name, ())
+            runs = [[pos[0], pos[0]]]
+            for a, b in zip(pos, pos[1:]):
+                if (a, b) in gaps:
+                    runs.append([b, b])
+                else:
+                    runs[-1][1] = b
+            segments[name] = [
+                TensorLifetime(name if j == 0 else f"{name}#{j}", sizes[name], start, end)
+                for j, (start, end) in enumerate(runs)
+            ]
+        return segments
+    
+    @staticmethod
+    def _segment_conflicts(partners: Dict[str, Set[str]],
+                           segments: Dict[str, List[TensorLifetime]]) -> Dict[str, Set[str]]:
+        """Expand root partners to the lifetime segments of both sides"""
+        conflicts: Dict[str, Set[str]] = {}
+        for root, others in partners.items():
+            names = {seg.name for other in others for seg in segments[other]}
+            for seg in segments[root]:
+                conflicts[seg.name] = names
+        return conflicts
+    
+    def _choose_spill(self, graph: IRGraph, sorted_nodes: List[IRNode],
+                      uses: Dict[str, List[int]], sizes: Dict[str, int],
+                      evicted: Dict[str, Set[Tuple[int, int]]],
+                      segments: Dict[str, List[TensorLifetime]], position: int
+                      ) -> Optional[Tuple[str, Tuple[int, int], Optional[IRNode]]]:
+        """
+        Pick a tensor live across (but not used at) position to evict
+        
+        Recomputable tensors come first (no DMA at all), then the longest
+        gap (frees the most positions per spilled byte), then the largest.
+        Returns (tensor, gap, producer to recompute or None).
+        """
+        best = None
+        best_key = None
+        for name, pos in uses.items():
+            for a, b in zip(pos, pos[1:]):
+                if not a < position < b:
+                    continue
+                if (a, b) in evicted.get(name, ()):
+                    break
+                
+                producer = self._recompute_producer(graph, sorted_nodes, name,
+                                                    uses, segments, b)
+                key = (producer is not None, b - a, sizes[name])
+                if best_key is None or key > best_key:
+                    best, best_key = (name, (a, b), producer), key
+                break
+        return best
+    
+    def _recompute_producer(self, graph: IRGraph, sorted_nodes: List[IRNode],
+                            name: str, uses: Dict[str, List[int]],
+                            segments: Dict[str, List[TensorLifetime]],
+                            position: int) -> Optional[IRNode]:
+        """Producer of name (a storage root) if it can cheaply be re-run at position"""
+        if not self.recompute or name in graph.inputs or name in self._shared:
+            return None
+        producers = graph.get_producers(name)
+        if len(producers) != 1 or producers[0].op_type not in RECOMPUTE_OPS:
+            return None
+        producer = producers[0]
+        
+        # Its activation input must still hold its value there: resident,
+        # and not yet overwritten by an in-place alias
+        act_inputs = [inp for inp in producer.inputs if inp in self.aliases]
+        if len(act_inputs) != 1 or self._tensor_uses[act_inputs[0]][-1] < position:
+            return None
+        root = self.aliases[act_inputs[0]][0]
+        return producer if any(seg.start <= position <= seg.end
+                               for seg in segments[root]) else None
     
     def allocate_activations(self, graph: IRGraph):
-        """Allocate memory for activations with reuse"""
+        """
+        Allocate memory for activations with reuse
+        
+        If the planned footprint exceeds the activation buffer, tensors live
+        across a peak are evicted between two uses: recomputed from a
+        resident input when their producer is cheap, otherwise stored to the
+        spill area (again only after an aliased op rewrote them) and loaded
+        back before the next use, possibly at another offset (see
+        activation_offset_at). Planning and eviction work on storage
+        roots, so aliased tensors move together. When the live set fits but
+        the placement is fragmented, other placement orders are tried first.
+        """
         self.analyze_liveness(graph)
         
-        sorted_nodes = graph.topological_sort()
-        active_tensors: Dict[str, MemoryBlock] = {}
+        sorted_nodes = self.analyses.get(TopoOrderAnalysis, graph)
+        tensor_uses = self.activation_uses(graph)
+        self.aliases = self.plan_aliases(graph, sorted_nodes, tensor_uses)
+        self._tensor_uses = tensor_uses
+        self._shared = {root for name, (root, _) in self.aliases.items() if name != root}
         
-        for i, node in enumerate(sorted_nodes):
-            # Free tensors that are no longer needed
-            tensors_to_free = []
-            for tensor_name, block in active_tensors.items():
-                if tensor_name in self.tensor_liveness:
-                    _, last_use = self.tensor_liveness[tensor_name]
-                    if last_use < i:
-                        tensors_to_free.append(tensor_name)
+        # Storage root -> union of its tensors' uses, bytes spanned
+        root_uses: Dict[str, Set[int]] = {}
+        sizes: Dict[str, int] = {}
+        for name, (root, offset) in self.aliases.items():
+            root_uses.setdefault(root, set()).update(tensor_uses[name])
+            sizes[root] = max(sizes.get(root, 0), offset + graph.get_tensor(name).nbytes)
+        sizes = {root: self.memory.pad(size) for root, size in sizes.items()}
+        uses = {root: sorted(pos) for root, pos in root_uses.items()}
+        capacity = self.activation_pool.total_size
+        
+        # Storage roots read or written by the same op (banked buffers only)
+        bank_size = self.memory.bank_size(capacity)
+        partners: Dict[str, Set[str]] = {}
+        if bank_size:
+            for node in sorted_nodes:
+                roots = {self.aliases[t][0] for t in list(node.inputs) + list(node.outputs)
+                         if t in self.aliases}
+                for root in roots:
+                    partners.setdefault(root, set()).update(roots - {root})
+        
+        evicted: Dict[str, Set[Tuple[int, int]]] = {}
+        recomputed: Dict[Tuple[str, int], IRNode] = {}  # (tensor, reload position) -> producer
+        while True:
+            segments = self._segments(uses, sizes, evicted)
+            lifetimes = [seg for segs in segments.values() for seg in segs]
+            conflicts = self._segment_conflicts(partners, segments) if bank_size else None
+            offsets, peak = plan_offsets(lifetimes, self.activation_pool.alignment,
+                                         bank_size, conflicts, capacity)
+            if peak <= capacity:
+                break
+            
+            # Live bytes per position
+            live = [0] * (len(sorted_nodes) + 1)
+            for seg in lifetimes:
+                live[seg.start] += seg.size
+                live[seg.end + 1] -= seg.size
+            for i in range(1, len(live)):
+                live[i] += live[i - 1]
+            most = max(live[:len(sorted_nodes)], default=0)
             
-            for tensor_name in tensors_to_free:
-                block = active_tensors.pop(tensor_name)
-                self.activation_pool.free(block)
+            if most <= capacity:
+                # The live set fits everywhere; only the placement is fragmented
+                offsets, peak = self._replan(lifetimes, bank_size, conflicts, capacity,
+                                             offsets, peak)
+                if peak <= capacity:
+                    break
             
-            # Allocate output tensors
+            # Evict around the fullest position that is over capacity in the
+            # live set, then in the plan, then anywhere (fragmentation can be
+            # caused by tensors placed elsewhere)
+            overflow = set()
+            for seg in lifetimes:
+                if offsets[seg.name] + seg.size > capacity:
+                    overflow.update(range(seg.start, seg.end + 1))
+            positions = sorted(range(len(sorted_nodes)),
+                               key=lambda i: (live[i] > capacity, i in overflow, live[i]),
+                               reverse=True)
+            choice = None
+            for position in positions:
+                choice = self._choose_spill(graph, sorted_nodes, uses, sizes,
+                                            evicted, segments, position)
+                if choice is not None:
+                    break
+            if choice is None:
+                position = max(range(len(sorted_nodes)), key=lambda i: live[i])
+                node = sorted_nodes[position]
+                if most > capacity:
+                    raise MemoryError(f"Out of memory in {self.activation_pool.region.name}: "
+                                    f"{live[position]} bytes must be resident at {node.name}, "
+                                    f"total {capacity}")
+                raise MemoryError(f"Out of memory in {self.activation_pool.region.name}: "
+                                f"at most {most} bytes are live (at {node.name}) but "
+                                f"fragmentation needs {peak}, total {capacity}")
+            
+            name, gap, producer = choice
+            evicted.setdefault(name, set()).add(gap)
+            if producer is not None:
+                recomputed[(name, gap[1])] = producer
+                # Keep the producer's input resident where it is re-run
+                inp = next(i for i in producer.inputs if i in self.aliases)
+                root = self.aliases[inp][0]
+                uses[root] = sorted(set(uses[root]) | {gap[1]})
+        
+        for lt in lifetimes:
+            self.activation_pool.place(
+                name=f"act_{lt.name}",
+                offset=offsets[lt.name],
+                size=lt.size,
+                tensor_name=lt.name
+            )
+        # Tensors are placed where they are first used (graph inputs are
+        # loaded there); graph outputs are read back where the last segment is
+        outputs = set(graph.outputs)
+        for name, (root, offset) in self.aliases.items():
+            self.activation_segments[name] = [(seg.start, seg.end, offsets[seg.name] + offset)
+                                              for seg in segments[root]]
+            position = tensor_uses[name][-1 if name in outputs else 0]
+            self.activation_offsets[name] = self.activation_offset_at(name, position)
+        
+        # Positions at which each storage root's bytes change (views leave them as is)
+        writes: Dict[str, Set[int]] = {}
+        for i, node in enumerate(sorted_nodes):
+            if node.op_type in VIEW_OPS:
+                continue
             for out in node.outputs:
-                tensor = graph.get_tensor(out)
-                if tensor and tensor.data is None:  # Activation tensor
-                    size = tensor.nbytes
-                    
-                    # Try to reuse freed memory
-                    block = self.activation_pool.allocate(
-                        name=f"act_{out}",
-                        size=size,
-                        tensor_name=out
-                    )
-                    
-                    active_tensors[out] = block
-                    self.activation_offsets[out] = block.offset
-    
-    def allocate(self, graph: IRGraph):
+                if out in self.aliases:
+                    writes.setdefault(self.aliases[out][0], set()).add(i)
+        
+        self._plan_spill_events(sorted_nodes, segments, offsets, recomputed, writes)
+        self.activation_bytes = sum(graph.get_tensor(name).nbytes for name in tensor_uses)
+        self.storage_bytes = sum(sizes.values())
+    
+    def _replan(self, lifetimes: List[TensorLifetime], bank_size: int,
+                conflicts: Optional[Dict[str, Set[str]]], capacity: int,
+                offsets: Dict[str, int], peak: int) -> Tuple[Dict[str, int], int]:
+        """Best of the other placement orders, then of seeded random orders, until one fits"""
+        rng = np.random.default_rng(0)
+        orders = [order for order in PLACEMENT_ORDERS if order != 'size']
+        for attempt in range(len(orders) + REPLAN_ATTEMPTS):
+            if peak <= capacity:
+                break
+            if attempt < len(orders):
+                order = orders[attempt]
+            else:
+                rank = dict(zip((lt.name for lt in lifetimes), rng.permutation(len(lifetimes))))
+                order = lambda t: rank[t.name]
+            trial, trial_peak = plan_offsets(lifetimes, self.activation_pool.alignment,
+                                             bank_size, conflicts, capacity, order)
+            if trial_peak < peak:
+                offsets, peak = trial, trial_peak
+        return offsets, peak
+    
+    def _plan_spill_events(self, sorted_nodes: List[IRNode],
+                           segments: Dict[str, List[TensorLifetime]],
+                           offsets: Dict[str, int],
+                           recomputed: Dict[Tuple[str, int], IRNode],
+                           writes: Dict[str, Set[int]]):
+        """Turn evicted segments into store/load/recompute events"""
+        for name, segs in segments.items():
+            dram_offset = None
+            stored_at = None  # position of the last store
+            for prev, seg in zip(segs, segs[1:]):
+                node = sorted_nodes[seg.start]
+                producer = recomputed.get((name, seg.start))
+                if producer is not None:
+                    event = SpillEvent('recompute', name, node.name, offsets[seg.name],
+                                       seg.size, producer=producer.name)
+                    self.spills_before.setdefault(node.name, []).append(event)
+                    continue
+                
+                # Store at the first eviction and again whenever an aliased
+                # (e.g. in-place) op has rewritten the root since; reload at
+                # every refill
+                if stored_at is None or any(stored_at < w <= prev.end
+                                            for w in writes.get(name, ())):
+                    if dram_offset is None:
+                        dram_offset = self.spill_pool.allocate(
+                            f"spill_{name}", seg.size, name).offset
+                    store_node = sorted_nodes[prev.end]
+                    self.spills_after.setdefault(store_node.name, []).append(
+                        SpillEvent('store', name, store_node.name, offsets[prev.name],
+                                   seg.size, dram_offset=dram_offset))
+                    stored_at = prev.end
+                if offsets[seg.name] + seg.size > SPILL_DRAM_SIZE:
+                    raise MemoryError(f"Out of memory in {self.activation_pool.region.name}: "
+                                      f"refill of {name} at offset {offsets[seg.name]} is "
+                                      f"beyond the {SPILL_DRAM_SIZE} bytes DMA can address")
+                self.spills_before.setdefault(node.name, []).append(
+                    SpillEvent('load', name, node.name, offsets[seg.name],
+                               seg.size, dram_offset=dram_offset))
+        
+        # Refill inputs before recomputing from them, recomputes in program order
+        position = {node.name: i for i, node in enumerate(sorted_nodes)}
+        for events in self.spills_before.values():
+            events.sort(key=lambda e: (e.kind == 'recompute', position.get(e.producer, -1)))
+    
+    def get_bank_conflicts(self, graph: IRGraph) -> Dict[str, int]:
+        """
+        Estimate bank conflicts per node
+        
+        For every two operands of a node (different storage) that share a
+        bank, the smaller of their footprints in the shared banks is counted
+        as bytes the SRAM must serialize.
+        
+        Returns:
+            node name -> conflicting bytes (nodes without conflicts omitted)
+        """
+        bank_size = self.memory.bank_size(self.activation_pool.total_size)
+        if not bank_size:
+            return {}
+        
+        def footprint(offset: int, size: int, mask: int) -> int:
+            total = 0
+            for bank in range(self.memory.num_banks):
+                if mask >> bank & 1:
+                    lo = max(offset, bank * bank_size)
+                    hi = min(offset + size, (bank + 1) * bank_size)
+                    total += max(hi - lo, 0)
+            return total
+        
+        conflicts: Dict[str, int] = {}
+        sorted_nodes = self.analyses.get(TopoOrderAnalysis, graph)
+        for position, node in enumerate(sorted_nodes):
+            operands = []
+            roots = set()
+            for name in dict.fromkeys(list(node.inputs) + list(node.outputs)):
+                if name not in self.activation_offsets:
+                    continue
+                root = self.aliases.get(name, (name, 0))[0]
+                if root in roots:
+                    continue
+                roots.add(root)
+                offset = self.activation_offset_at(name, position)
+                size = graph.get_tensor(name).nbytes
+                operands.append((offset, size, bank_mask(offset, size, bank_size)))
+            
+            total = 0
+            for i, (off_a, size_a, mask_a) in enumerate(operands):
+                for off_b, size_b, mask_b in operands[i + 1:]:
+                    shared = mask_a & mask_b
+                    if shared:
+                        total += min(footprint(off_a, size_a, shared),
+                                     footprint(off_b, size_b, shared))
+            if total:
+                conflicts[node.name] = total
+        return conflicts
+    
+    def get_spill_events(self) -> List[SpillEvent]:
+        """All spill events"""
+        events = [e for evs in self.spills_before.values() for e in evs]
+        events += [e for evs in self.spills_after.values() for e in evs]
+        return events
+    
+    def allocate(self, graph: IRGraph, analyses: Optional[AnalysisManager] = None):
         """Allocate all memory"""
+        if analyses is not None:
+            self.analyses = analyses
         self.allocate_weights(graph)
         self.allocate_activations(graph)
+        self.bank_conflicts = self.get_bank_conflicts(graph)
     
     def get_weight_offset(self, tensor_name: str) -> int:
         """Get weight buffer offset for tensor"""
@@ -187,17 +997,55 @@ class MemoryAllocator:
         """Get activation buffer offset for tensor"""
         return self.activation_offsets.get(tensor_name, 0)
     
+    def activation_offset_at(self, tensor_name: str, position: int) -> int:
+        """Activation buffer offset of a tensor while resident at a node position"""
+        for start, end, offset in self.activation_segments.get(tensor_name, ()):
+            if start <= position <= end:
+                return offset
+        return self.get_activation_offset(tensor_name)
+    
+    def operand_offsets(self, node: IRNode, position: int) -> Dict[str, int]:
+        """Activation offsets of a node's operands when it runs at position"""
+        return {name: self.activation_offset_at(name, position)
+                for name in list(node.inputs) + list(node.outputs)
+                if name in self.activation_segments}
+    
     def get_memory_usage(self) -> Dict[str, Tuple[int, int]]:
         """Get memory usage for each region"""
-        return {
+        usage = {
             'weights': self.weight_pool.get_usage(),
             'activations': self.activation_pool.get_usage(),
         }
+        if self.streaming_weights:
+            usage['weight_image'] = self.weight_image.get_usage()
+        return usage
+    
+    def get_activation_stats(self) -> Dict[str, float]:
+        """Get planned activation peak versus sum of activation sizes"""
+        peak = self.activation_pool.peak_usage
+        events = self.get_spill_events()
+        return {
+            'peak_bytes': peak,
+            'total_bytes': self.activation_bytes,
+            'num_tensors': len(self.activation_offsets),
+            'reuse_factor': self.activation_bytes / peak if peak > 0 else 1.0,
+            'spilled_tensors': len({e.tensor_name for e in events if e.kind == 'store'}),
+            'spill_dma_bytes': sum(e.size for e in events if e.kind != 'recompute'),
+            'recomputes': sum(1 for e in events if e.kind == 'recompute'),
+            'aliased_bytes': self.activation_bytes - self.storage_bytes,
+            'bank_conflict_bytes': sum(self.bank_conflicts.values()),
+            **self.alias_counts,
+        }
     
     def print_allocation(self):
         """Print memory allocation info"""
         print("\nMemory Allocation:")
         
+        if self.streaming_weights:
+            print("\n  Weight Image (DRAM, streamed):")
+            for block in self.weight_image.blocks:
+                print(f"    {block.tensor_name}: offset={block.offset}, size={block.size}")
+        
         print("\n  Weight Buffer:")
         for block in self.weight_pool.blocks:
             print(f"    {block.tensor_name}: offset={block.offset}, size={block.size}")
@@ -209,12 +1057,24 @@ class MemoryAllocator:
         usage = self.get_memory_usage()
         print(f"\n  Weight usage: {usage['weights'][1]} / {self.weight_pool.total_size} bytes")
         print(f"  Activation usage: {usage['activations'][1]} / {self.activation_pool.total_size} bytes")
+        
+        stats = self.get_activation_stats()
+        print(f"  Activation peak: {stats['peak_bytes']} bytes "
+              f"(sum of tensors {stats['total_bytes']} bytes, "
+              f"{stats['reuse_factor']:.2f}x reuse)")
+        if stats['aliased_bytes']:
+            print(f"  Aliasing: {stats['views']} views, {stats['in_place']} in-place, "
+                  f"{stats['concat_slices']} concat slices "
+                  f"({stats['aliased_bytes']} bytes shared)")
     
     def get_allocation_map(self) -> Dict:
         """Get complete allocation map"""
         return {
             'weight_offsets': self.weight_offsets,
             'activation_offsets': self.activation_offsets,
+            'activation_segments': self.activation_segments,
             'weight_usage': self.weight_pool.get_usage(),
+            'weight_streaming': self.streaming_weights,
             'activation_usage': self.activation_pool.get_usage(),
+            'activation_stats': self.get_activation_stats(),
         }
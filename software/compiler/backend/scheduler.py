@@ -8,6 +8,10 @@ from dataclasses import dataclass, field
 from enum import Enum, auto
 
 from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+from ..optimizer.analysis import AnalysisManager, TopoOrderAnalysis
+from ..optimizer.memory_order import activation_peak
+from .cost_model import CostModel, HardwareConfig
+from .memory_allocator import SpillEvent, WeightTile, dma_chunks
 
 
 class ResourceType(Enum):
@@ -37,113 +41,46 @@ class Schedule:
     slots: List[ScheduleSlot] = field(default_factory=list)
     total_cycles: int = 0
     
+    # Streamed weight loads: (tile, start_cycle, end_cycle) on the DMA engine
+    dma_transfers: List[Tuple[WeightTile, int, int]] = field(default_factory=list)
+    dma_stall_cycles: int = 0  # compute cycles spent waiting for weight tiles
+    spill_cycles: int = 0      # DMA cycles of activation stores/loads
+    bank_stall_cycles: int = 0  # cycles lost to SRAM bank conflicts
+    
     def add_slot(self, slot: ScheduleSlot):
         self.slots.append(slot)
         self.total_cycles = max(self.total_cycles, slot.end_cycle)
     
+    def get_overlap(self) -> float:
+        """Busy cycles summed over all units per elapsed cycle (1.0 = serial)"""
+        busy = sum(s.duration for s in self.slots if s.resources)
+        busy += sum(end - start for _, start, end in self.dma_transfers)
+        return busy / self.total_cycles if self.total_cycles > 0 else 0.0
+    
     def get_node_order(self) -> List[IRNode]:
         """Get nodes in scheduled order"""
         sorted_slots = sorted(self.slots, key=lambda s: s.start_cycle)
         return [s.node for s in sorted_slots]
 
 
-class CostModel:
-    """Cost model for estimating operation latency"""
-    
-    def __init__(self, pe_rows: int = 16, pe_cols: int = 16, 
-                 clock_mhz: int = 500):
-        self.pe_rows = pe_rows
-        self.pe_cols = pe_cols
-        self.clock_mhz = clock_mhz
-        
-        # Latency estimates (in cycles)
-        self.dma_latency_per_byte = 0.1
-        self.pe_compute_latency = 1
-        self.activation_latency = 4
-        self.pooling_latency = 8
-    
-    def estimate_conv_cycles(self, out_ch: int, in_ch: int, 
-                             out_h: int, out_w: int,
-                             kernel_h: int, kernel_w: int) -> int:
-        """Estimate convolution cycles"""
-        # MACs = out_ch * in_ch * out_h * out_w * kernel_h * kernel_w
-        macs = out_ch * in_ch * out_h * out_w * kernel_h * kernel_w
-        
-        # PE array can do pe_rows * pe_cols MACs per cycle
-        macs_per_cycle = self.pe_rows * self.pe_cols
-        
-        # Account for tiling overhead
-        oc_tiles = (out_ch + self.pe_cols - 1) // self.pe_cols
-        ic_tiles = (in_ch + self.pe_rows - 1) // self.pe_rows
-        
-        compute_cycles = (macs + macs_per_cycle - 1) // macs_per_cycle
-        overhead = oc_tiles * ic_tiles * 10  # Tile switching overhead
-        
-        return compute_cycles + overhead
-    
-    def estimate_fc_cycles(self, in_features: int, out_features: int) -> int:
-        """Estimate FC cycles"""
-        macs = in_features * out_features
-        macs_per_cycle = self.pe_rows * self.pe_cols
-        return (macs + macs_per_cycle - 1) // macs_per_cycle + 10
-    
-    def estimate_pool_cycles(self, h: int, w: int, 
-                             kernel_h: int, kernel_w: int) -> int:
-        """Estimate pooling cycles"""
-        out_h = h // kernel_h
-        out_w = w // kernel_w
-        return out_h * out_w * self.pooling_latency
-    
-    def estimate_activation_cycles(self, size: int) -> int:
-        """Estimate activation cycles"""
-        return (size + 15) // 16 * self.activation_latency
-    
-    def estimate_dma_cycles(self, bytes: int) -> int:
-        """Estimate DMA transfer cycles"""
-        return int(bytes * self.dma_latency_per_byte) + 50  # Base latency
-    
-    def estimate_node_cycles(self, graph: IRGraph, node: IRNode) -> int:
-        """Estimate cycles for a node"""
-        if node.op_type == IROpType.CONV2D:
-            weight = graph.get_tensor(node.inputs[1])
-            output = graph.get_tensor(node.outputs[0])
-            if weight and output:
-                out_ch, in_ch, kh, kw = weight.shape
-                _, _, out_h, out_w = output.shape
-                return self.estimate_conv_cycles(out_ch, in_ch, out_h, out_w, kh, kw)
-        
-        elif node.op_type == IROpType.FULLY_CONNECTED:
-            weight = graph.get_tensor(node.inputs[1])
-            if weight:
-                out_f, in_f = weight.shape[:2]
-                return self.estimate_fc_cycles(in_f, out_f)
-        
-        elif node.op_type in [IROpType.MAX_POOL2D, IROpType.AVG_POOL2D]:
-            input_tensor = graph.get_tensor(node.inputs[0])
-            kernel = node.get_attr('kernel_size', (2, 2))
-            if input_tensor:
-                _, _, h, w = input_tensor.shape
-                return self.estimate_pool_cycles(h, w, kernel[0], kernel[1])
-        
-        elif node.op_type in [IROpType.RELU, IROpType.RELU6, IROpType.SIGMOID]:
-            input_tensor = graph.get_tensor(node.inputs[0])
-            if input_tensor:
-                return self.estimate_activation_cycles(input_tensor.size)
-        
-        # Default estimate
-        return 100
-
-
 class Scheduler:
     """
     Operation scheduler for NPU
     Schedules operations to maximize throughput
+    
+    Each layer is a chain of stages: weight load on the DMA engine
+    (overlapping the previous layer's compute), compute on its unit, the
+    fused post-op draining through the activation unit, and spill stores
+    back on the DMA engine. plan_order() picks the node order by list
+    scheduling with critical-path priorities; schedule() times a fixed order.
     """
     
-    def __init__(self, pe_rows: int = 16, pe_cols: int = 16):
-        self.pe_rows = pe_rows
-        self.pe_cols = pe_cols
-        self.cost_model = CostModel(pe_rows, pe_cols)
+    def __init__(self, pe_rows: int = 16, pe_cols: int = 16, reorder: bool = True,
+                 hardware: Optional[HardwareConfig] = None):
+        self.cost_model = CostModel(pe_rows, pe_cols, hardware=hardware)
+        self.pe_rows = self.cost_model.pe_rows
+        self.pe_cols = self.cost_model.pe_cols
+        self.reorder = reorder
         
         # Resource availability (cycle when resource becomes free)
         self.resource_free: Dict[ResourceType, int] = {
@@ -152,6 +89,7 @@ class Scheduler:
             ResourceType.ACTIVATION_UNIT: 0,
             ResourceType.POOLING_UNIT: 0,
         }
+        self._dma_issue = 0
     
     def get_required_resources(self, node: IRNode) -> List[ResourceType]:
         """Get resources required by node"""
@@ -160,19 +98,129 @@ class Scheduler:
             return [ResourceType.PE_ARRAY]
         
         elif node.op_type in [IROpType.RELU, IROpType.RELU6, IROpType.SIGMOID,
-                              IROpType.TANH, IROpType.SOFTMAX]:
+                              IROpType.TANH, IROpType.SOFTMAX, IROpType.LEAKY_RELU,
+                              IROpType.SWISH, IROpType.GELU, IROpType.ADD, IROpType.SUB,
+                              IROpType.MUL, IROpType.DIV, IROpType.BATCH_NORM,
+                              IROpType.LAYER_NORM]:
             return [ResourceType.ACTIVATION_UNIT]
         
         elif node.op_type in [IROpType.MAX_POOL2D, IROpType.AVG_POOL2D,
                               IROpType.GLOBAL_AVG_POOL]:
             return [ResourceType.POOLING_UNIT]
         
+        # Shape ops are views or aliased copies (MemoryAllocator.plan_aliases)
         return []
     
-    def schedule(self, graph: IRGraph) -> Schedule:
+    def _node_duration(self, graph: IRGraph, node: IRNode,
+                       node_cycles: Optional[Dict[str, int]]) -> int:
+        """Compute stage cycles of a node"""
+        if node_cycles is not None and node.name in node_cycles:
+            return node_cycles[node.name]
+        return self.cost_model.estimate_node_cycles(graph, node)
+    
+    def _post_op_cycles(self, node: IRNode) -> int:
+        """Drain of a fused activation through the activation unit"""
+        if node.get_attr('activation') and ResourceType.PE_ARRAY in self.get_required_resources(node):
+            return round(self.cost_model.hw.activation_latency)
+        return 0
+    
+    def plan_order(self, graph: IRGraph,
+                   node_cycles: Optional[Dict[str, int]] = None,
+                   analyses: Optional[AnalysisManager] = None,
+                   memory_limit: Optional[int] = None,
+                   keep_peak: bool = False) -> List[IRNode]:
+        """
+        Node order from resource-constrained list scheduling
+        
+        Repeatedly starts the ready node that can begin earliest on its
+        unit, preferring the longest remaining critical path, so
+        independent branches fill idle units. The base topological order
+        is kept when reordering is off, or when the new order's activation
+        peak exceeds memory_limit and is worse than the base order's. With
+        keep_peak (the base order comes from memory-aware ordering) it is
+        kept whenever the new order's peak is worse.
+        
+        Args:
+            graph: IR graph
+            node_cycles: Precomputed per-node cycle estimates (by node name)
+            analyses: Shared analysis cache
+            memory_limit: Activation buffer bytes
+            keep_peak: Never raise the base order's activation peak
+        """
+        if analyses is not None:
+            base = analyses.get(TopoOrderAnalysis, graph)
+        else:
+            base = graph.topological_sort()
+        if not self.reorder:
+            return base
+        
+        index = {node.name: i for i, node in enumerate(base)}
+        duration = {node.name: self._node_duration(graph, node, node_cycles)
+                    + self._post_op_cycles(node) for node in base}
+        preds: Dict[str, Set[str]] = {}
+        succs: Dict[str, List[IRNode]] = {node.name: [] for node in base}
+        for node in base:
+            preds[node.name] = {p.name for inp in node.inputs
+                                for p in graph.get_producers(inp) if p.name in index}
+            for pred in preds[node.name]:
+                succs[pred].append(node)
+        
+        # Longest path to a sink, including the node itself
+        priority: Dict[str, int] = {}
+        for node in reversed(base):
+            priority[node.name] = duration[node.name] + max(
+                (priority[s.name] for s in succs[node.name]), default=0)
+        
+        unit_free = {r: 0 for r in ResourceType}
+        finish: Dict[str, int] = {}
+        waiting = {name: len(p) for name, p in preds.items()}
+        ready = [node for node in base if waiting[node.name] == 0]
+        
+        def start_time(node: IRNode) -> int:
+            start = max((finish[p] for p in preds[node.name]), default=0)
+            for r in self.get_required_resources(node):
+                start = max(start, unit_free[r])
+            return start
+        
+        order = []
+        while ready:
+            best = min(ready, key=lambda n: (start_time(n), -priority[n.name], index[n.name]))
+            ready.remove(best)
+            order.append(best)
+            
+            end = start_time(best) + duration[best.name]
+            finish[best.name] = end
+            for r in self.get_required_resources(best):
+                unit_free[r] = end
+            for succ in succs[best.name]:
+                waiting[succ.name] -= 1
+                if waiting[succ.name] == 0:
+                    ready.append(succ)
+        
+        if order == base:
+            return base
+        if memory_limit is not None or keep_peak:
+            peak = activation_peak(graph, order)
+            over = keep_peak or (memory_limit is not None and peak > memory_limit)
+            if over and peak > activation_peak(graph, base):
+                return base
+        return order
+    
+    def schedule(self, graph: IRGraph,
+                 node_cycles: Optional[Dict[str, int]] = None,
+                 analyses: Optional[AnalysisManager] = None,
+                 weight_tiles: Optional[Dict[str, List[WeightTile]]] = None,
+                 spill_events: Optional[List[SpillEvent]] = None) -> Schedule:
         """
         Schedule graph operations
         Uses list scheduling with resource constraints
+        
+        Args:
+            graph: IR graph
+            node_cycles: Precomputed per-node cycle estimates (by node name)
+            analyses: Shared analysis cache
+            weight_tiles: Streamed weight tiles per node (weight streaming)
+            spill_events: Activation spill/fill/recompute events
         """
         schedule = Schedule()
         
@@ -180,8 +228,23 @@ class Scheduler:
         for r in self.resource_free:
             self.resource_free[r] = 0
         
+        # Earliest cycle the next weight tile load can be issued: tile N+1
+        # is prefetched once tile N has arrived and its compute starts
+        self._dma_issue = 0
+        
+        spills_before: Dict[str, List[SpillEvent]] = {}
+        spills_after: Dict[str, List[SpillEvent]] = {}
+        for event in spill_events or ():
+            target = spills_after if event.kind == 'store' else spills_before
+            target.setdefault(event.node_name, []).append(event)
+        barrier = 0  # synchronous spill transfers block everything after them
+        issue = 0    # instructions issue in program order: no node starts before its predecessor
+        
         # Get topologically sorted nodes
-        sorted_nodes = graph.topological_sort()
+        if analyses is not None:
+            sorted_nodes = analyses.get(TopoOrderAnalysis, graph)
+        else:
+            sorted_nodes = graph.topological_sort()
         
         # Track when each tensor is ready
         tensor_ready: Dict[str, int] = {}
@@ -198,7 +261,7 @@ class Scheduler:
         # Schedule each node
         for node in sorted_nodes:
             # Find earliest start time based on data dependencies
-            earliest_start = 0
+            earliest_start = max(barrier, issue)
             for inp in node.inputs:
                 if inp in tensor_ready:
                     earliest_start = max(earliest_start, tensor_ready[inp])
@@ -209,32 +272,106 @@ class Scheduler:
                 earliest_start = max(earliest_start, self.resource_free[r])
             
             # Estimate duration
-            duration = self.cost_model.estimate_node_cycles(graph, node)
+            duration = self._node_duration(graph, node, node_cycles)
+            stall = self.cost_model.estimate_bank_conflict_cycles(node.name)
+            duration += stall
+            schedule.bank_stall_cycles += stall
+            
+            # Refills load on the DMA engine first; recomputes run inline
+            for event in spills_before.get(node.name, ()):
+                if event.kind == 'recompute':
+                    producer = graph.get_node(event.producer)
+                    duration += self.cost_model.estimate_node_cycles(graph, producer)
+                else:
+                    earliest_start = self._schedule_spill(schedule, event, earliest_start)
             
             # Create schedule slot
+            tiles = weight_tiles.get(node.name) if weight_tiles else None
+            if tiles:
+                start, end = self._schedule_tiles(schedule, tiles, earliest_start, duration)
+            else:
+                start, end = earliest_start, earliest_start + duration
             slot = ScheduleSlot(
                 node=node,
-                start_cycle=earliest_start,
-                end_cycle=earliest_start + duration,
+                start_cycle=start,
+                end_cycle=end,
                 resources=resources
             )
             schedule.add_slot(slot)
+            issue = slot.start_cycle
             
             # Update resource availability
             for r in resources:
                 self.resource_free[r] = slot.end_cycle
             
+            # Fused post-op drains through the activation unit
+            ready = slot.end_cycle
+            post = self._post_op_cycles(node)
+            if post:
+                act = ResourceType.ACTIVATION_UNIT
+                ready = max(ready, self.resource_free[act]) + post
+                self.resource_free[act] = ready
+                schedule.total_cycles = max(schedule.total_cycles, ready)
+            
             # Update tensor ready times
             for out in node.outputs:
-                tensor_ready[out] = slot.end_cycle
+                tensor_ready[out] = ready
+            
+            for event in spills_after.get(node.name, ()):
+                barrier = self._schedule_spill(schedule, event, ready)
         
         return schedule
     
+    def _schedule_tiles(self, schedule: Schedule, tiles: List[WeightTile],
+                        earliest_start: int, duration: int) -> Tuple[int, int]:
+        """
+        Overlap weight tile loads on the DMA engine with compute
+        
+        The node's compute is split evenly over its tiles; each tile starts
+        once its load has finished. Returns the node's (start, end) cycles.
+        """
+        dma = ResourceType.DMA_ENGINE
+        per_tile = duration // len(tiles)
+        cursor = earliest_start
+        start = None
+        
+        for i, tile in enumerate(tiles):
+            dma_start = max(self.resource_free[dma], self._dma_issue)
+            dma_end = dma_start + self._dma_cycles(tile.size)
+            self.resource_free[dma] = dma_end
+            schedule.dma_transfers.append((tile, dma_start, dma_end))
+            
+            tile_start = max(cursor, dma_end)
+            schedule.dma_stall_cycles += tile_start - cursor
+            if start is None:
+                start = tile_start
+            self._dma_issue = tile_start
+            
+            # Last tile takes the rounding remainder
+            cursor = tile_start + (duration - per_tile * (len(tiles) - 1)
+                                   if i == len(tiles) - 1 else per_tile)
+        
+        return start, cursor
+    
+    def _dma_cycles(self, size: int) -> int:
+        """Cycles of a transfer issued as one descriptor per DMA chunk"""
+        return sum(self.cost_model.estimate_dma_cycles(length) for _, length in dma_chunks(size))
+    
+    def _schedule_spill(self, schedule: Schedule, event: SpillEvent, ready: int) -> int:
+        """Put a spill store/load on the DMA engine, return its end cycle"""
+        dma = ResourceType.DMA_ENGINE
+        start = max(self.resource_free[dma], ready)
+        cycles = self._dma_cycles(event.size)
+        self.resource_free[dma] = start + cycles
+        schedule.spill_cycles += cycles
+        return start + cycles
+    
     def print_schedule(self, schedule: Schedule):
         """Print schedule information"""
         print("\nExecution Schedule:")
         print(f"  Total cycles: {schedule.total_cycles}")
-        print(f"  Estimated time @ 500MHz: {schedule.total_cycles / 500e6 * 1000:.3f} ms")
+        clock_mhz = self.cost_model.clock_mhz
+        print(f"  Estimated time @ {clock_mhz}MHz: {schedule.total_cycles / (clock_mhz * 1e3):.3f} ms")
         print("\n  Operations:")
         
         for slot in sorted(schedule.slots, key=lambda s: s.start_cycle):
@@ -249,9 +386,16 @@ class Scheduler:
         pe_busy = sum(s.duration for s in schedule.slots 
                       if ResourceType.PE_ARRAY in s.resources)
         
+        dma_busy = sum(end - start for _, start, end in schedule.dma_transfers)
+        
         return {
             'total_cycles': schedule.total_cycles,
             'num_operations': len(schedule.slots),
             'pe_utilization': pe_busy / schedule.total_cycles if schedule.total_cycles > 0 else 0,
-            'estimated_time_ms': schedule.total_cycles / 500e6 * 1000,
+            'dma_utilization': dma_busy / schedule.total_cycles if schedule.total_cycles > 0 else 0,
+            'dma_stall_cycles': schedule.dma_stall_cycles,
+            'spill_cycles': schedule.spill_cycles,
+            'overlap': schedule.get_overlap(),
+            'bank_stall_cycles': schedule.bank_stall_cycles,
+            'estimated_time_ms': schedule.total_cycles / (self.cost_model.clock_mhz * 1e3),
         }
@@ -0,0 +1,255 @@
+"""
+EdgeNPU Compiler - Compile Cache
+Content-addressed on-disk cache of compiled models
+
+Entries are keyed by a structural hash of the input IR graph (ops, attrs,
+shapes, quantization params, weight digests), the hardware/compiler
+configuration and a digest of the compiler's own sources, so identical
+compiles skip optimization, quantization and code generation entirely
+and any change to the compiler invalidates old entries. The cache is bounded in size and evicts least
+recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+import numpy as np
+
+from .frontend.ir_builder import IRGraph
+from .frontend.ir_cache import default_cache_dir, encode_value
+from .frontend.weight_store import array_digest
+from .backend.code_generator import CompiledModel
+
+
+_ENTRY_MAGIC = b'NPUC'
+_ENTRY_VERSION = 1
+_ENTRY_SUFFIX = '.npuc'
+
+_source_digest: Optional[str] = None
+
+
+# =============================================================================
+# Structural hashing
+# =============================================================================
+
+def graph_digest(graph: IRGraph) -> str:
+    """
+    Structural hash of an IR graph
+    
+    Covers node order, ops, connectivity, attributes, tensor metadata and
+    constant contents, i.e. everything the backend output depends on.
+    """
+    h = hashlib.sha256()
+    
+    def feed(obj: Any):
+        h.update(json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+        h.update(b'\n')
+    
+    feed([graph.name, list(graph.inputs), list(graph.outputs)])
+    
+    for node in graph.nodes:
+        feed([node.name, node.op_type.name, list(node.inputs), list(node.outputs),
+              encode_value(dict(node.attrs))])
+    
+    for name in sorted(graph.tensors):
+        t = graph.tensors[name]
+        digest = array_digest(t.data) if t.data is not None else None
+        feed([name, list(t.shape), t.dtype.name, t.layout.name,
+              float(t.scale), int(t.zero_point), bool(t.is_quantized), digest])
+    
+    return h.hexdigest()
+
+
+def source_digest() -> str:
+    """Hash of the compiler package's Python sources (computed once per process)"""
+    global _source_digest
+    if _source_digest is None:
+        root = Path(__file__).resolve().parent
+        h = hashlib.sha256()
+        for path in sorted(root.rglob('*.py')):
+            h.update(path.relative_to(root).as_posix().encode('utf-8'))
+            h.update(b'\0')
+            h.update(path.read_bytes())
+            h.update(b'\0')
+        _source_digest = h.hexdigest()
+    return _source_digest
+
+
+# =============================================================================
+# Entry serialization
+# =============================================================================
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _serialize(model: CompiledModel) -> bytes:
+    meta = {}
+    blobs = []
+    for f in fields(model):
+        value = getattr(model, f.name)
+        if isinstance(value, (bytes, bytearray)):
+            meta[f.name] = {'blob': len(value)}
+            blobs.append(bytes(value))
+        else:
+            meta[f.name] = value
+    
+    meta_bytes = json.dumps(meta, default=_json_default).encode('utf-8')
+    header = _ENTRY_MAGIC + struct.pack('<II', _ENTRY_VERSION, len(meta_bytes))
+    return header + meta_bytes + b''.join(blobs)
+
+
+def _deserialize(data: bytes) -> CompiledModel:
+    if data[:4] != _ENTRY_MAGIC:
+        raise ValueError("not a compile cache entry")
+    version, meta_len = struct.unpack_from('<II', data, 4)
+    if version != _ENTRY_VERSION:
+        raise ValueError(f"entry version {version}, expected {_ENTRY_VERSION}")
+    
+    pos = 12
+    meta = json.loads(data[pos:pos + meta_len].decode('utf-8'))
+    pos += meta_len
+    
+    kwargs = {}
+    for f in fields(CompiledModel):
+        value = meta[f.name]
+        if isinstance(value, dict) and 'blob' in value:
+            size = value['blob']
+            value = data[pos:pos + size]
+            if len(value) != size:
+                raise ValueError("truncated compile cache entry")
+            pos += size
+        kwargs[f.name] = value
+    return CompiledModel(**kwargs)
+
+
+# =============================================================================
+# Cache
+# =============================================================================
+
+class CompileCache:
+    """
+    Size-bounded LRU cache of CompiledModel objects
+    
+    Recency is tracked with file mtimes, so it persists across processes.
+    """
+    
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir() / 'compiled'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def make_key(self, graph: IRGraph, config: Dict[str, Any]) -> str:
+        """Cache key for (graph structure, compiler configuration, compiler sources)"""
+        h = hashlib.sha256()
+        h.update(source_digest().encode('utf-8'))
+        h.update(graph_digest(graph).encode('utf-8'))
+        h.update(json.dumps(config, sort_keys=True, default=repr).encode('utf-8'))
+        return h.hexdigest()
+    
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_ENTRY_SUFFIX}"
+    
+    def get(self, key: str) -> Optional[CompiledModel]:
+        """Look up compiled model, or None on miss"""
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                model = _deserialize(f.read())
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: discarding compile cache entry {path.name}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        
+        # Mark as most recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        self.hits += 1
+        return model
+    
+    def put(self, key: str, model: CompiledModel):
+        """Store compiled model and evict old entries (failures only warn)"""
+        data = _serialize(model)
+        if len(data) > self.max_bytes:
+            return
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path_for(key))
+        except OSError as e:
+            print(f"Warning: could not write compile cache entry: {e}")
+            return
+        
+        self.evict()
+    
+    def _entries(self):
+        """List (mtime, size, path) of entries, oldest first"""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        entries.sort()
+        return entries
+    
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    
+    def evict(self):
+        """Evict least recently used entries until under max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+    
+    def clear(self):
+        """Remove all entries"""
+        for _, _, path in self._entries():
+            self._remove(path)
+    
+    def size_bytes(self) -> int:
+        """Total size of cached entries"""
+        return sum(size for _, size, _ in self._entries())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries()),
+            'size_bytes': self.size_bytes(),
+        }
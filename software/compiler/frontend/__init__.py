@@ -6,6 +6,9 @@ Model parsing and IR generation
 from .model_parser import ModelParser, ONNXParser, TFLiteParser, create_parser, parse_model
 from .ir_builder import IRBuilder, IRGraph, IRNode, IRTensor, IROpType, DataType, DataLayout
 from .pytorch_parser import PyTorchParser, parse_pytorch_model, parse_pytorch_module
+from .compact_ir import TensorTable, CompactTensor, CompactNode, OpAttrs, compact_graph
+from .weight_store import WeightStore, get_weight_store
+from .ir_cache import IRCache, save_ir, load_ir
 
 __all__ = [
     # Parsers
@@ -28,4 +31,20 @@ __all__ = [
     'IROpType',
     'DataType',
     'DataLayout',
+    
+    # Compact IR
+    'TensorTable',
+    'CompactTensor',
+    'CompactNode',
+    'OpAttrs',
+    'compact_graph',
+    
+    # Weight storage
+    'WeightStore',
+    'get_weight_store',
+    
+    # IR serialization / cache
+    'IRCache',
+    'save_ir',
+    'load_ir',
 ]
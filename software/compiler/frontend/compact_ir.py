@@ -0,0 +1,352 @@
+"""
+EdgeNPU Compiler - Compact IR
+Memory-lean IR records for very large graphs
+
+Compact mode replaces the per-instance dicts of IRTensor/IRNode with:
+- CompactTensor / CompactNode: __slots__ records exposing the same
+  attributes and methods as IRTensor / IRNode; fields are plain slots, so
+  attribute access costs no more than on the dataclasses
+- OpAttrs subclasses: typed, slotted per-op attribute structs that behave
+  like the attrs dict (get/[]/in/items), with an overflow dict for keys
+  that have no dedicated slot; nodes create them on first use
+- TensorTable: struct-of-arrays snapshot of tensor metadata for bulk
+  (vectorized) queries
+"""
+
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from .ir_builder import IRGraph, IRTensor, IROpType, DataType, DataLayout
+
+
+# =============================================================================
+# Tensor metadata table
+# =============================================================================
+
+class TensorTable:
+    """
+    Struct-of-arrays tensor metadata
+    
+    Snapshots are built from the tensor records (from_tensors), so a table
+    never holds rows of tensors removed from the graph since.
+    """
+    
+    MAX_DIMS = 6
+    
+    def __init__(self, capacity: int = 256):
+        capacity = max(capacity, 1)
+        self.count = 0
+        self.shapes = np.zeros((capacity, self.MAX_DIMS), dtype=np.int64)
+        self.ndims = np.zeros(capacity, dtype=np.int8)
+        self.dtypes = np.zeros(capacity, dtype=np.uint8)
+        self.layouts = np.zeros(capacity, dtype=np.uint8)
+        self.scales = np.ones(capacity, dtype=np.float64)
+        self.zero_points = np.zeros(capacity, dtype=np.int32)
+        self.quantized = np.zeros(capacity, dtype=np.bool_)
+    
+    @classmethod
+    def from_tensors(cls, tensors: Iterable) -> 'TensorTable':
+        """Table with one row per tensor, in iteration order"""
+        tensors = list(tensors)
+        table = cls(capacity=len(tensors))
+        for t in tensors:
+            table.append(tuple(t.shape), t.dtype, t.layout,
+                         t.scale, t.zero_point, t.is_quantized)
+        return table
+    
+    @property
+    def capacity(self) -> int:
+        return len(self.ndims)
+    
+    def _grow(self):
+        """Double the capacity of every column"""
+        new_cap = self.capacity * 2
+        for attr in ('shapes', 'ndims', 'dtypes', 'layouts',
+                     'scales', 'zero_points', 'quantized'):
+            old = getattr(self, attr)
+            new = np.ones if attr == 'scales' else np.zeros
+            grown = new((new_cap,) + old.shape[1:], dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, attr, grown)
+    
+    def append(self, shape: Tuple[int, ...],
+               dtype: DataType = DataType.FLOAT32,
+               layout: DataLayout = DataLayout.NCHW,
+               scale: float = 1.0, zero_point: int = 0,
+               is_quantized: bool = False) -> int:
+        """Append a row and return its index"""
+        if self.count == self.capacity:
+            self._grow()
+        
+        idx = self.count
+        self.count += 1
+        self.set_shape(idx, shape)
+        self.dtypes[idx] = dtype.value
+        self.layouts[idx] = layout.value
+        self.scales[idx] = scale
+        self.zero_points[idx] = zero_point
+        self.quantized[idx] = is_quantized
+        return idx
+    
+    def get_shape(self, idx: int) -> Tuple[int, ...]:
+        return tuple(self.shapes[idx, :self.ndims[idx]].tolist())
+    
+    def set_shape(self, idx: int, shape: Tuple[int, ...]):
+        if len(shape) > self.MAX_DIMS:
+            raise ValueError(f"Tensor rank {len(shape)} exceeds compact IR "
+                             f"limit of {self.MAX_DIMS}")
+        self.ndims[idx] = len(shape)
+        self.shapes[idx, :len(shape)] = shape
+        self.shapes[idx, len(shape):] = 0
+    
+    def element_counts(self) -> np.ndarray:
+        """Number of elements for every row (vectorized)"""
+        n = self.count
+        dims = np.where(np.arange(self.MAX_DIMS) < self.ndims[:n, None],
+                        self.shapes[:n], 1)
+        return np.prod(dims, axis=1)
+    
+    def nbytes(self) -> np.ndarray:
+        """Size in bytes for every row (vectorized)"""
+        sizes = np.full(256, 4, dtype=np.int64)
+        for dt, nb in _DTYPE_SIZES.items():
+            sizes[dt.value] = nb
+        return self.element_counts() * sizes[self.dtypes[:self.count]]
+
+
+_DTYPE_SIZES = {
+    DataType.FLOAT32: 4,
+    DataType.FLOAT16: 2,
+    DataType.INT32: 4,
+    DataType.INT16: 2,
+    DataType.INT8: 1,
+    DataType.UINT8: 1,
+}
+
+_DTYPE_BY_VALUE = {dt.value: dt for dt in DataType}
+_LAYOUT_BY_VALUE = {lt.value: lt for lt in DataLayout}
+
+
+# =============================================================================
+# Compact records
+# =============================================================================
+
+class CompactTensor:
+    """Slotted tensor record"""
+    
+    __slots__ = ('name', 'shape', 'dtype', 'layout', 'data',
+                 'scale', 'zero_point', 'is_quantized')
+    
+    def __init__(self, name: str, shape: Tuple[int, ...],
+                 dtype: DataType = DataType.FLOAT32,
+                 layout: DataLayout = DataLayout.NCHW,
+                 data: Optional[np.ndarray] = None,
+                 scale: float = 1.0, zero_point: int = 0,
+                 is_quantized: bool = False):
+        if data is not None and not isinstance(shape, tuple):
+            shape = tuple(data.shape)
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.layout = layout
+        self.data = data
+        self.scale = scale
+        self.zero_point = zero_point
+        self.is_quantized = is_quantized
+    
+    # Element count and quantize() (which returns a CompactTensor) are shared
+    size = IRTensor.size
+    quantize = IRTensor.quantize
+    
+    @property
+    def nbytes(self) -> int:
+        """Size in bytes"""
+        return self.size * _DTYPE_SIZES.get(self.dtype, 4)
+    
+    def __repr__(self):
+        return (f"CompactTensor(name={self.name!r}, shape={self.shape}, "
+                f"dtype={self.dtype.name})")
+
+
+_UNSET = object()
+
+
+class OpAttrs(MutableMapping):
+    """
+    Typed attribute struct with dict semantics
+    
+    Subclasses list their dedicated keys in FIELDS; any other key is kept in
+    a lazily created overflow dict. Unset fields behave like missing keys.
+    """
+    
+    __slots__ = ('_extra',)
+    FIELDS: Tuple[str, ...] = ()
+    _field_set: frozenset = frozenset()
+    
+    def __init__(self, attrs: Optional[Dict[str, Any]] = None, **kwargs):
+        self._extra = None
+        for key in self.FIELDS:
+            setattr(self, key, _UNSET)
+        if attrs:
+            self.update(attrs)
+        if kwargs:
+            self.update(kwargs)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._field_set:
+            value = getattr(self, key)
+            return default if value is _UNSET else value
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any):
+        if key in self._field_set:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key: str):
+        if key in self._field_set:
+            if getattr(self, key) is _UNSET:
+                raise KeyError(key)
+            setattr(self, key, _UNSET)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if getattr(self, key) is not _UNSET:
+                yield key
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        count = sum(1 for key in self.FIELDS if getattr(self, key) is not _UNSET)
+        return count + (len(self._extra) if self._extra else 0)
+    
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def _attrs_struct(name: str, fields: Tuple[str, ...]) -> type:
+    """Create a slotted OpAttrs subclass with the given fields"""
+    return type(name, (OpAttrs,), {
+        '__slots__': fields,
+        'FIELDS': fields,
+        '_field_set': frozenset(fields),
+    })
+
+
+_LAYOUT_FIELDS = ('input_layout', 'weight_layout', 'output_layout',
+                  'weight_scales', 'weight_zero_points')
+
+ConvAttrs = _attrs_struct('ConvAttrs', (
+    'kernel_size', 'stride', 'padding', 'groups', 'activation') + _LAYOUT_FIELDS)
+FCAttrs = _attrs_struct('FCAttrs', ('activation',) + _LAYOUT_FIELDS)
+PoolAttrs = _attrs_struct('PoolAttrs', ('kernel_size', 'stride'))
+AxisAttrs = _attrs_struct('AxisAttrs', ('axis',))
+ReshapeAttrs = _attrs_struct('ReshapeAttrs', ('shape',))
+BatchNormAttrs = _attrs_struct('BatchNormAttrs', ('epsilon',))
+
+# Op type -> attribute struct
+OP_ATTRS = {
+    IROpType.CONV2D: ConvAttrs,
+    IROpType.DEPTHWISE_CONV2D: ConvAttrs,
+    IROpType.FULLY_CONNECTED: FCAttrs,
+    IROpType.MAX_POOL2D: PoolAttrs,
+    IROpType.AVG_POOL2D: PoolAttrs,
+    IROpType.SOFTMAX: AxisAttrs,
+    IROpType.CONCAT: AxisAttrs,
+    IROpType.RESHAPE: ReshapeAttrs,
+    IROpType.BATCH_NORM: BatchNormAttrs,
+}
+
+
+def make_attrs(op_type: IROpType, attrs: Optional[Dict[str, Any]] = None) -> OpAttrs:
+    """Build the typed attribute struct for an op"""
+    return OP_ATTRS.get(op_type, OpAttrs)(attrs)
+
+
+class CompactNode:
+    """Slotted IR node with typed attributes"""
+    
+    __slots__ = ('name', 'op_type', 'inputs', 'outputs', '_attrs',
+                 'schedule_order', 'tile_config')
+    
+    def __init__(self, name: str, op_type: IROpType,
+                 inputs: Optional[List[str]] = None,
+                 outputs: Optional[List[str]] = None,
+                 attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.op_type = op_type
+        self.inputs = list(inputs) if inputs else []
+        self.outputs = list(outputs) if outputs else []
+        self._attrs = None
+        if isinstance(attrs, OpAttrs) or attrs:
+            self.attrs = attrs
+        self.schedule_order = -1
+        self.tile_config = None
+    
+    @property
+    def attrs(self) -> OpAttrs:
+        # Most nodes of large graphs (activations, eltwise) have no attributes
+        if self._attrs is None:
+            self._attrs = make_attrs(self.op_type)
+        return self._attrs
+    
+    @attrs.setter
+    def attrs(self, value: Dict[str, Any]):
+        self._attrs = value if isinstance(value, OpAttrs) else make_attrs(self.op_type, value)
+    
+    def __repr__(self):
+        return f"CompactNode({self.name}, {self.op_type.name}, in={self.inputs}, out={self.outputs})"
+    
+    def get_attr(self, key: str, default: Any = None) -> Any:
+        if self._attrs is None:
+            return default
+        return self._attrs.get(key, default)
+    
+    def set_attr(self, key: str, value: Any):
+        self.attrs[key] = value
+
+
+# =============================================================================
+# Conversion
+# =============================================================================
+
+def compact_graph(graph: IRGraph) -> IRGraph:
+    """
+    Convert a graph to compact records in place
+    
+    Tensor data arrays are shared, not copied.
+    """
+    tensors = {}
+    for name, t in graph.tensors.items():
+        tensors[name] = CompactTensor(
+            t.name, t.shape, t.dtype, t.layout, t.data,
+            t.scale, t.zero_point, t.is_quantized
+        )
+    
+    nodes = []
+    for n in graph.nodes:
+        node = CompactNode(n.name, n.op_type, n.inputs, n.outputs, dict(n.attrs))
+        node.schedule_order = n.schedule_order
+        node.tile_config = n.tile_config
+        nodes.append(node)
+    
+    graph.tensors = tensors
+    graph.nodes = nodes
+    graph.reindex()
+    return graph
@@ -129,7 +129,7 @@ class IRTensor:
         else:
             return self
             
-        return IRTensor(
+        return type(self)(
             name=self.name,
             shape=self.shape,
             dtype=target_dtype,
@@ -166,27 +166,162 @@ class IRNode:
 
 @dataclass
 class IRGraph:
-    """IR graph representing the neural network"""
+    """
+    IR graph representing the neural network
+
+    Producer/consumer and name lookups are served from indexes that are kept
+    up to date by the mutation API (add_node, remove_node, remove_nodes,
+    rewire_node). Code that edits node.inputs/outputs or graph.nodes in place
+    must call reindex() afterwards.
+    """
     name: str = "model"
     nodes: List[IRNode] = field(default_factory=list)
     tensors: Dict[str, IRTensor] = field(default_factory=dict)
     inputs: List[str] = field(default_factory=list)
     outputs: List[str] = field(default_factory=list)
     
+    # Structural version, bumped on every node mutation
+    version: int = field(default=0, init=False, compare=False)
+    
+    # Indexes (maintained by the mutation API)
+    _node_index: Dict[str, IRNode] = field(default_factory=dict, init=False,
+                                           repr=False, compare=False)
+    _producers: Dict[str, List[IRNode]] = field(default_factory=dict, init=False,
+                                                repr=False, compare=False)
+    _consumers: Dict[str, List[IRNode]] = field(default_factory=dict, init=False,
+                                                repr=False, compare=False)
+    _topo_cache: Optional[List[IRNode]] = field(default=None, init=False,
+                                                repr=False, compare=False)
+    _topo_version: int = field(default=-1, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.reindex()
+    
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+    
+    def _index_node(self, node: IRNode):
+        self._node_index[node.name] = node
+        for out in dict.fromkeys(node.outputs):
+            self._producers.setdefault(out, []).append(node)
+        for inp in dict.fromkeys(node.inputs):
+            self._consumers.setdefault(inp, []).append(node)
+    
+    def _unindex_node(self, node: IRNode):
+        if self._node_index.get(node.name) is node:
+            del self._node_index[node.name]
+        for out in dict.fromkeys(node.outputs):
+            self._unlink(self._producers, out, node)
+        for inp in dict.fromkeys(node.inputs):
+            self._unlink(self._consumers, inp, node)
+    
+    @staticmethod
+    def _unlink(index: Dict[str, List[IRNode]], tensor_name: str, node: IRNode):
+        entries = index.get(tensor_name)
+        if not entries:
+            return
+        for i, n in enumerate(entries):
+            if n is node:
+                del entries[i]
+                break
+        if not entries:
+            del index[tensor_name]
+    
+    def _touch(self):
+        self.version += 1
+    
+    def reindex(self):
+        """Rebuild all indexes from graph.nodes (after in-place edits)"""
+        self._node_index = {}
+        self._producers = {}
+        self._consumers = {}
+        for node in self.nodes:
+            self._index_node(node)
+        self._touch()
+    
+    # ------------------------------------------------------------------
+    # Mutation API
+    # ------------------------------------------------------------------
+    
     def add_node(self, node: IRNode):
         """Add node to graph"""
         self.nodes.append(node)
+        self._index_node(node)
+        self._touch()
+    
+    def remove_node(self, node: IRNode):
+        """Remove a single node from graph"""
+        self.nodes.remove(node)
+        self._unindex_node(node)
+        self._touch()
+    
+    def remove_nodes(self, nodes: List[IRNode]):
+        """Remove several nodes with a single pass over graph.nodes"""
+        doomed = {id(n) for n in nodes}
+        if not doomed:
+            return
+        kept = []
+        for node in self.nodes:
+            if id(node) in doomed:
+                self._unindex_node(node)
+            else:
+                kept.append(node)
+        self.nodes = kept
+        self._touch()
+    
+    def rewire_node(self, node: IRNode,
+                    inputs: Optional[List[str]] = None,
+                    outputs: Optional[List[str]] = None):
+        """Replace a node's input and/or output tensor lists"""
+        self._unindex_node(node)
+        if inputs is not None:
+            node.inputs = list(inputs)
+        if outputs is not None:
+            node.outputs = list(outputs)
+        self._index_node(node)
+        self._touch()
+    
+    def reorder_nodes(self, order: List[IRNode]):
+        """Replace node order (must be a permutation of graph.nodes)"""
+        if len(order) != len(self.nodes) or {id(n) for n in order} != {id(n) for n in self.nodes}:
+            raise ValueError("reorder_nodes: order is not a permutation of graph nodes")
+        self.nodes = list(order)
+        self._touch()
         
     def add_tensor(self, tensor: IRTensor):
         """Add tensor to graph"""
         self.tensors[tensor.name] = tensor
+    
+    def rename_tensor(self, old_name: str, new_name: str):
+        """Rename a tensor and update all references to it"""
+        if old_name == new_name:
+            return
+        tensor = self.tensors.pop(old_name, None)
+        if tensor is not None:
+            tensor.name = new_name
+            self.tensors[new_name] = tensor
+        
+        affected = {id(n): n for n in self._producers.get(old_name, [])}
+        affected.update((id(n), n) for n in self._consumers.get(old_name, []))
+        for node in affected.values():
+            self.rewire_node(
+                node,
+                inputs=[new_name if t == old_name else t for t in node.inputs],
+                outputs=[new_name if t == old_name else t for t in node.outputs]
+            )
+        
+        self.inputs = [new_name if t == old_name else t for t in self.inputs]
+        self.outputs = [new_name if t == old_name else t for t in self.outputs]
+        self._touch()
+    
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
         
     def get_node(self, name: str) -> Optional[IRNode]:
         """Get node by name"""
-        for node in self.nodes:
-            if node.name == name:
-                return node
-        return None
+        return self._node_index.get(name)
     
     def get_tensor(self, name: str) -> Optional[IRTensor]:
         """Get tensor by name"""
@@ -202,33 +337,50 @@ class IRGraph:
     
     def get_producers(self, tensor_name: str) -> List[IRNode]:
         """Get nodes that produce this tensor"""
-        return [n for n in self.nodes if tensor_name in n.outputs]
+        return list(self._producers.get(tensor_name, ()))
     
     def get_consumers(self, tensor_name: str) -> List[IRNode]:
         """Get nodes that consume this tensor"""
-        return [n for n in self.nodes if tensor_name in n.inputs]
+        return list(self._consumers.get(tensor_name, ()))
+    
+    def _iter_input_producers(self, node: IRNode):
+        for inp in node.inputs:
+            for producer in self._producers.get(inp, ()):
+                yield producer
     
     def topological_sort(self) -> List[IRNode]:
-        """Return nodes in topological order"""
+        """
+        Return nodes in topological order
+        
+        Iterative DFS over graph.nodes, visiting input producers first.
+        The result is cached until the graph version changes.
+        """
+        if self._topo_cache is not None and self._topo_version == self.version:
+            return list(self._topo_cache)
+        
         visited = set()
         order = []
         
-        def visit(node: IRNode):
-            if node.name in visited:
-                return
-            visited.add(node.name)
-            
-            # Visit all input producers first
-            for inp in node.inputs:
-                for producer in self.get_producers(inp):
-                    visit(producer)
-            
-            order.append(node)
-        
-        for node in self.nodes:
-            visit(node)
+        for root in self.nodes:
+            if root.name in visited:
+                continue
+            visited.add(root.name)
+            stack = [(root, self._iter_input_producers(root))]
             
-        return order
+            while stack:
+                node, producers = stack[-1]
+                for producer in producers:
+                    if producer.name not in visited:
+                        visited.add(producer.name)
+                        stack.append((producer, self._iter_input_producers(producer)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+        
+        self._topo_cache = order
+        self._topo_version = self.version
+        return list(order)
     
     def validate(self) -> List[str]:
         """Validate graph structure, return list of errors"""
@@ -276,13 +428,28 @@ class IRGraph:
 
 
 class IRBuilder:
-    """Builder for constructing IR graphs"""
+    """
+    Builder for constructing IR graphs
     
-    def __init__(self, name: str = "model"):
+    With compact=True the builder emits slotted CompactTensor/CompactNode
+    records with typed attributes (see compact_ir), which cuts memory on
+    very large graphs.
+    """
+    
+    def __init__(self, name: str = "model", compact: bool = False):
         self.graph = IRGraph(name=name)
+        self.compact = compact
         self._tensor_counter = 0
         self._node_counter = 0
         
+        if compact:
+            from .compact_ir import CompactTensor, CompactNode
+            self._tensor_cls = CompactTensor
+            self._node_cls = CompactNode
+        else:
+            self._tensor_cls = IRTensor
+            self._node_cls = IRNode
+        
     def _gen_tensor_name(self, prefix: str = "t") -> str:
         name = f"{prefix}_{self._tensor_counter}"
         self._tensor_counter += 1
@@ -296,7 +463,7 @@ class IRBuilder:
     def add_input(self, name: str, shape: Tuple[int, ...], 
                   dtype: DataType = DataType.FLOAT32) -> str:
         """Add graph input"""
-        tensor = IRTensor(name=name, shape=shape, dtype=dtype)
+        tensor = self._tensor_cls(name=name, shape=shape, dtype=dtype)
         self.graph.add_tensor(tensor)
         self.graph.inputs.append(name)
         return name
@@ -307,7 +474,7 @@ class IRBuilder:
     
     def add_constant(self, name: str, data: np.ndarray) -> str:
         """Add constant tensor"""
-        tensor = IRTensor(
+        tensor = self._tensor_cls(
             name=name,
             shape=tuple(data.shape),
             dtype=DataType.FLOAT32,
@@ -316,6 +483,20 @@ class IRBuilder:
         self.graph.add_tensor(tensor)
         return name
     
+    def add_constants_from_file(self, path: str) -> List[str]:
+        """
+        Add constants from a .npy/.npz sidecar without reading them
+        
+        The arrays are memory-mapped views; bytes are paged in only when
+        a pass touches them.
+        """
+        from .weight_store import get_weight_store
+        
+        names = []
+        for name, data in get_weight_store().load(path).items():
+            names.append(self.add_constant(name, data))
+        return names
+    
     def conv2d(self, input_name: str, weight_name: str, 
                bias_name: Optional[str] = None,
                kernel_size: Tuple[int, int] = (3, 3),
@@ -344,12 +525,12 @@ class IRBuilder:
         else:
             output_shape = (1, 1, 1, 1)
         
-        output_tensor = IRTensor(name=output_name, shape=output_shape)
+        output_tensor = self._tensor_cls(name=output_name, shape=output_shape)
         self.graph.add_tensor(output_tensor)
         
         op_type = IROpType.DEPTHWISE_CONV2D if groups > 1 else IROpType.CONV2D
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=op_type,
             inputs=inputs,
@@ -388,10 +569,10 @@ class IRBuilder:
         else:
             output_shape = (1, 1)
         
-        output_tensor = IRTensor(name=output_name, shape=output_shape)
+        output_tensor = self._tensor_cls(name=output_name, shape=output_shape)
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=IROpType.FULLY_CONNECTED,
             inputs=inputs,
@@ -420,13 +601,13 @@ class IRBuilder:
         node_name = self._gen_node_name("softmax")
         
         input_tensor = self.graph.get_tensor(input_name)
-        output_tensor = IRTensor(
+        output_tensor = self._tensor_cls(
             name=output_name,
             shape=input_tensor.shape if input_tensor else (1,)
         )
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=IROpType.SOFTMAX,
             inputs=[input_name],
@@ -443,13 +624,13 @@ class IRBuilder:
         node_name = self._gen_node_name(op_type.name.lower())
         
         input_tensor = self.graph.get_tensor(input_name)
-        output_tensor = IRTensor(
+        output_tensor = self._tensor_cls(
             name=output_name,
             shape=input_tensor.shape if input_tensor else (1,)
         )
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=op_type,
             inputs=[input_name],
@@ -483,10 +664,10 @@ class IRBuilder:
         else:
             output_shape = (1, 1, 1, 1)
         
-        output_tensor = IRTensor(name=output_name, shape=output_shape)
+        output_tensor = self._tensor_cls(name=output_name, shape=output_shape)
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=IROpType.GLOBAL_AVG_POOL,
             inputs=[input_name],
@@ -512,10 +693,10 @@ class IRBuilder:
         else:
             output_shape = (1, 1, 1, 1)
         
-        output_tensor = IRTensor(name=output_name, shape=output_shape)
+        output_tensor = self._tensor_cls(name=output_name, shape=output_shape)
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=op_type,
             inputs=[input_name],
@@ -544,13 +725,13 @@ class IRBuilder:
         node_name = self._gen_node_name(op_type.name.lower())
         
         input_tensor = self.graph.get_tensor(input1_name)
-        output_tensor = IRTensor(
+        output_tensor = self._tensor_cls(
             name=output_name,
             shape=input_tensor.shape if input_tensor else (1,)
         )
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=op_type,
             inputs=[input1_name, input2_name],
@@ -565,10 +746,10 @@ class IRBuilder:
         output_name = self._gen_tensor_name("reshape_out")
         node_name = self._gen_node_name("reshape")
         
-        output_tensor = IRTensor(name=output_name, shape=new_shape)
+        output_tensor = self._tensor_cls(name=output_name, shape=new_shape)
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=IROpType.RESHAPE,
             inputs=[input_name],
@@ -586,13 +767,13 @@ class IRBuilder:
         node_name = self._gen_node_name("batch_norm")
         
         input_tensor = self.graph.get_tensor(input_name)
-        output_tensor = IRTensor(
+        output_tensor = self._tensor_cls(
             name=output_name,
             shape=input_tensor.shape if input_tensor else (1,)
         )
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=IROpType.BATCH_NORM,
             inputs=[input_name, gamma_name, beta_name, mean_name, var_name],
@@ -618,10 +799,10 @@ class IRBuilder:
         else:
             output_shape = (1,)
         
-        output_tensor = IRTensor(name=output_name, shape=output_shape)
+        output_tensor = self._tensor_cls(name=output_name, shape=output_shape)
         self.graph.add_tensor(output_tensor)
         
-        node = IRNode(
+        node = self._node_cls(
             name=node_name,
             op_type=IROpType.CONCAT,
             inputs=input_names,
@@ -0,0 +1,350 @@
+"""
+EdgeNPU Compiler - IR Cache
+Binary IR serialization (.npuir) and a parse cache keyed by source file
+
+File layout:
+    [0:64)          header (magic, version, meta offset/length, blob offset)
+    [64:blob)       UTF-8 JSON metadata: graph info, tensor table, node table
+    [blob:EOF)      weight blob, page aligned, each array 64-byte aligned
+
+Weights are loaded back as memory-mapped views of the blob, so reading a
+cached graph costs only the metadata parse.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+
+from .ir_builder import IRGraph, IRNode, IRTensor, IROpType, DataType, DataLayout
+from .weight_store import get_weight_store
+
+
+IR_MAGIC = b'NPUIR\x00\x00\x00'
+IR_FORMAT_VERSION = 1
+
+_HEADER_FMT = '<8sIIQQQ'   # magic, version, flags, meta_off, meta_len, blob_off
+_HEADER_SIZE = 64
+_PAGE_SIZE = 4096
+_ARRAY_ALIGN = 64
+
+
+def _align(value: int, alignment: int) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+# =============================================================================
+# Attribute encoding
+# =============================================================================
+
+def encode_value(value: Any) -> Any:
+    """Encode attribute value to JSON, keeping tuples and arrays distinct"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return {'t': [encode_value(v) for v in value]}
+    if isinstance(value, list):
+        return [encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {'d': {str(k): encode_value(v) for k, v in value.items()}}
+    if isinstance(value, np.ndarray):
+        return {'a': value.tolist(), 'dt': value.dtype.str}
+    if isinstance(value, Enum):
+        return {'e': f"{type(value).__name__}.{value.name}"}
+    raise TypeError(f"Cannot serialize attribute value of type {type(value).__name__}")
+
+
+_ENUMS = {cls.__name__: cls for cls in (IROpType, DataType, DataLayout)}
+
+
+def decode_value(value: Any) -> Any:
+    """Inverse of encode_value"""
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    if isinstance(value, dict):
+        if 't' in value:
+            return tuple(decode_value(v) for v in value['t'])
+        if 'd' in value:
+            return {k: decode_value(v) for k, v in value['d'].items()}
+        if 'a' in value:
+            return np.array(value['a'], dtype=np.dtype(value['dt']))
+        if 'e' in value:
+            cls_name, member = value['e'].split('.', 1)
+            return _ENUMS[cls_name][member]
+    return value
+
+
+# =============================================================================
+# Serialization
+# =============================================================================
+
+def save_ir(graph: IRGraph, path: Union[str, Path],
+            dependencies: Optional[List[Tuple[str, int, int]]] = None):
+    """
+    Serialize IR graph to a .npuir file (written atomically)
+    
+    Args:
+        graph: IR graph
+        path: Output path
+        dependencies: Optional (path, size, mtime_ns) entries that must be
+            unchanged for the file to be considered valid
+    """
+    path = Path(path)
+    
+    tensors = []
+    arrays = []
+    blob_size = 0
+    for t in graph.tensors.values():
+        data_ref = None
+        if t.data is not None:
+            arr = np.ascontiguousarray(t.data)
+            blob_size = _align(blob_size, _ARRAY_ALIGN)
+            data_ref = [blob_size, arr.dtype.str, list(arr.shape)]
+            arrays.append((blob_size, arr))
+            blob_size += arr.nbytes
+        tensors.append([
+            t.name, list(t.shape), t.dtype.name, t.layout.name,
+            float(t.scale), int(t.zero_point), bool(t.is_quantized), data_ref
+        ])
+    
+    nodes = []
+    for n in graph.nodes:
+        nodes.append([
+            n.name, n.op_type.name, list(n.inputs), list(n.outputs),
+            encode_value(dict(n.attrs)), n.schedule_order,
+            encode_value(n.tile_config)
+        ])
+    
+    meta = json.dumps({
+        'name': graph.name,
+        'inputs': list(graph.inputs),
+        'outputs': list(graph.outputs),
+        'tensors': tensors,
+        'nodes': nodes,
+        'dependencies': dependencies or [],
+    }, separators=(',', ':')).encode('utf-8')
+    
+    blob_offset = _align(_HEADER_SIZE + len(meta), _PAGE_SIZE)
+    header = struct.pack(_HEADER_FMT, IR_MAGIC, IR_FORMAT_VERSION, 0,
+                         _HEADER_SIZE, len(meta), blob_offset)
+    header += b'\x00' * (_HEADER_SIZE - len(header))
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(meta)
+            f.write(b'\x00' * (blob_offset - _HEADER_SIZE - len(meta)))
+            pos = 0
+            for offset, arr in arrays:
+                f.write(b'\x00' * (offset - pos))
+                f.write(memoryview(arr.reshape(-1)).cast('B'))
+                pos = offset + arr.nbytes
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_meta(path: Union[str, Path]) -> Tuple[Dict, int]:
+    """Read and validate header, return (metadata, blob_offset)"""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER_SIZE)
+        if len(header) < _HEADER_SIZE:
+            raise ValueError(f"{path}: truncated IR file")
+        magic, version, _, meta_off, meta_len, blob_offset = struct.unpack_from(
+            _HEADER_FMT, header)
+        if magic != IR_MAGIC:
+            raise ValueError(f"{path}: not an IR file")
+        if version != IR_FORMAT_VERSION:
+            raise ValueError(f"{path}: IR format version {version}, "
+                             f"expected {IR_FORMAT_VERSION}")
+        f.seek(meta_off)
+        meta = json.loads(f.read(meta_len).decode('utf-8'))
+    return meta, blob_offset
+
+
+def load_ir(path: Union[str, Path], compact: bool = False) -> IRGraph:
+    """
+    Load IR graph from a .npuir file
+    
+    Args:
+        path: Path to .npuir file
+        compact: Return compact (slotted, array-backed) IR records
+    
+    Returns:
+        IRGraph whose constant data are memory-mapped views of the file
+    """
+    meta, blob_offset = _read_meta(path)
+    store = get_weight_store()
+    
+    graph = IRGraph(name=meta['name'])
+    graph.inputs = list(meta['inputs'])
+    graph.outputs = list(meta['outputs'])
+    
+    for name, shape, dtype, layout, scale, zp, quantized, data_ref in meta['tensors']:
+        data = None
+        if data_ref is not None:
+            offset, arr_dtype, arr_shape = data_ref
+            data = store.array(path, blob_offset + offset,
+                               np.dtype(arr_dtype), tuple(arr_shape))
+        graph.add_tensor(IRTensor(
+            name=name,
+            shape=tuple(shape),
+            dtype=DataType[dtype],
+            layout=DataLayout[layout],
+            data=data,
+            scale=scale,
+            zero_point=zp,
+            is_quantized=quantized
+        ))
+    
+    for name, op_type, inputs, outputs, attrs, order, tile_config in meta['nodes']:
+        node = IRNode(
+            name=name,
+            op_type=IROpType[op_type],
+            inputs=inputs,
+            outputs=outputs,
+            attrs=decode_value(attrs)
+        )
+        node.schedule_order = order
+        node.tile_config = decode_value(tile_config)
+        graph.add_node(node)
+    
+    if compact:
+        from .compact_ir import compact_graph
+        compact_graph(graph)
+    
+    return graph
+
+
+# =============================================================================
+# Parse cache
+# =============================================================================
+
+def default_cache_dir() -> Path:
+    """Default on-disk cache location"""
+    env = os.environ.get('EDGENPU_CACHE_DIR')
+    if env:
+        return Path(env)
+    return Path.home() / '.cache' / 'edgenpu'
+
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of file contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class IRCache:
+    """
+    Cache of parsed IR graphs, keyed by source file contents and input shape
+    """
+    
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir() / 'ir'
+        self.hits = 0
+        self.misses = 0
+    
+    def _digest_index_path(self) -> Path:
+        return self.cache_dir / 'sources.json'
+    
+    def source_digest(self, model_path: Union[str, Path]) -> str:
+        """
+        Content hash of a source file
+        
+        Digests are remembered by (size, mtime) so unchanged files are not
+        rehashed on every compile.
+        """
+        real = os.path.realpath(str(model_path))
+        stamp = list(_file_stamp(real))
+        
+        index = {}
+        try:
+            with open(self._digest_index_path()) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        entry = index.get(real)
+        if entry and entry[:2] == stamp:
+            return entry[2]
+        
+        digest = file_digest(real)
+        index[real] = stamp + [digest]
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self.cache_dir), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp, self._digest_index_path())
+        except OSError:
+            pass
+        return digest
+    
+    def make_key(self, model_path: Union[str, Path],
+                 input_shape: Tuple[int, ...], extra: str = '') -> str:
+        """Cache key for (source contents, input shape, extra options)"""
+        text = "|".join([
+            f"v{IR_FORMAT_VERSION}",
+            self.source_digest(model_path),
+            ",".join(str(d) for d in input_shape),
+            extra,
+        ])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npuir"
+    
+    def load(self, key: str, compact: bool = False) -> Optional[IRGraph]:
+        """Load cached graph, or None on miss/stale entry"""
+        path = self.path_for(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        
+        try:
+            meta, _ = _read_meta(path)
+            for dep_path, size, mtime in meta.get('dependencies', []):
+                if list(_file_stamp(dep_path)) != [size, mtime]:
+                    raise ValueError(f"dependency changed: {dep_path}")
+            graph = load_ir(path, compact=compact)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: discarding IR cache entry {path.name}: {e}")
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return graph
+    
+    def store(self, key: str, graph: IRGraph):
+        """Store graph under key (failures only warn)"""
+        # External weight files (e.g. ONNX external data) must stay unchanged
+        deps = set()
+        for t in graph.tensors.values():
+            filename = getattr(t.data, 'filename', None)
+            if filename:
+                deps.add(filename)
+        dependencies = [[p, *_file_stamp(p)] for p in sorted(deps)]
+        
+        try:
+            save_ir(graph, self.path_for(key), dependencies)
+        except (OSError, TypeError) as e:
+            print(f"Warning: could not write IR cache entry: {e}")
@@ -4,6 +4,7 @@ Parse ONNX and TFLite models to IR
 """
 
 from abc import ABC, abstractmethod
+from pathlib import Path
 from typing import Dict, List, Optional, Any
 import numpy as np
 
@@ -11,6 +12,8 @@ from .ir_builder import (
     IRBuilder, IRGraph, IRNode, IRTensor, IROpType, 
     DataType, DataLayout
 )
+from .weight_store import get_weight_store
+from ..profiler import profile_stage
 
 
 class ModelParser(ABC):
@@ -57,7 +60,8 @@ class ONNXParser(ModelParser):
         'Pad': IROpType.PAD,
     }
     
-    def __init__(self):
+    def __init__(self, compact: bool = False):
+        self.compact = compact
         self.onnx = None
         self.numpy_helper = None
         self._load_onnx()
@@ -80,16 +84,24 @@ class ONNXParser(ModelParser):
         if self.onnx is None:
             raise ImportError("ONNX not installed. Run: pip install onnx")
         
-        model = self.onnx.load(model_path)
-        self.onnx.checker.check_model(model)
+        # Checking by path handles external data and >2GB models
+        self.onnx.checker.check_model(model_path)
+        model = self.onnx.load(model_path, load_external_data=False)
         graph = model.graph
         
-        builder = IRBuilder(name=graph.name or "onnx_model")
+        builder = IRBuilder(name=graph.name or "onnx_model", compact=self.compact)
+        base_dir = Path(model_path).parent
         
         # Extract initializers (weights)
         weights = {}
         for init in graph.initializer:
-            data = self.numpy_helper.to_array(init)
+            if init.data_location == self.onnx.TensorProto.EXTERNAL:
+                # Memory-mapped, paged in on first use
+                data = self._map_external(init, base_dir)
+            else:
+                data = self.numpy_helper.to_array(init)
+                # Drop the protobuf copy so weights are held only once
+                init.ClearField('raw_data')
             weights[init.name] = data
             builder.add_constant(init.name, data)
         
@@ -109,6 +121,23 @@ class ONNXParser(ModelParser):
         
         return builder.build()
     
+    def _map_external(self, init, base_dir: Path) -> np.ndarray:
+        """Map an initializer stored in an external data file"""
+        info = {entry.key: entry.value for entry in init.external_data}
+        
+        helper = self.onnx.helper
+        if hasattr(helper, 'tensor_dtype_to_np_dtype'):
+            dtype = helper.tensor_dtype_to_np_dtype(init.data_type)
+        else:
+            dtype = self.onnx.mapping.TENSOR_TYPE_TO_NP_TYPE[init.data_type]
+        
+        return get_weight_store().array(
+            base_dir / info['location'],
+            offset=int(info.get('offset', 0)),
+            dtype=dtype,
+            shape=tuple(init.dims)
+        )
+    
     def _parse_node(self, builder: IRBuilder, node, weights: Dict):
         """Parse single ONNX node"""
         op_type = node.op_type
@@ -182,9 +211,7 @@ class ONNXParser(ModelParser):
         )
         
         # Map output name
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_gemm(self, builder: IRBuilder, node, attrs: Dict):
         """Parse Gemm (FC) node"""
@@ -198,9 +225,7 @@ class ONNXParser(ModelParser):
             bias_name=bias_name
         )
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_activation(self, builder: IRBuilder, node, ir_op: IROpType):
         """Parse activation node"""
@@ -213,9 +238,7 @@ class ONNXParser(ModelParser):
         else:
             output = builder._add_activation(input_name, ir_op)
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_pool(self, builder: IRBuilder, node, ir_op: IROpType, attrs: Dict):
         """Parse pooling node"""
@@ -237,17 +260,13 @@ class ONNXParser(ModelParser):
                 stride=(strides[0], strides[1])
             )
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_global_pool(self, builder: IRBuilder, node):
         """Parse global average pool"""
         output = builder.global_avg_pool(node.input[0])
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_eltwise(self, builder: IRBuilder, node, ir_op: IROpType):
         """Parse element-wise op"""
@@ -258,9 +277,7 @@ class ONNXParser(ModelParser):
         else:
             output = builder._add_eltwise(node.input[0], node.input[1], ir_op)
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_batchnorm(self, builder: IRBuilder, node, attrs: Dict):
         """Parse batch normalization"""
@@ -275,9 +292,7 @@ class ONNXParser(ModelParser):
             epsilon=epsilon
         )
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_reshape(self, builder: IRBuilder, node):
         """Parse reshape"""
@@ -289,37 +304,31 @@ class ONNXParser(ModelParser):
         
         output = builder.reshape(node.input[0], new_shape)
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_concat(self, builder: IRBuilder, node, attrs: Dict):
         """Parse concat"""
         axis = attrs.get('axis', 1)
         output = builder.concat(list(node.input), axis=axis)
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_softmax(self, builder: IRBuilder, node, attrs: Dict):
         """Parse softmax"""
         axis = attrs.get('axis', -1)
         output = builder.softmax(node.input[0], axis=axis)
         
-        builder.graph.tensors[node.output[0]] = builder.graph.tensors.pop(output)
-        builder.graph.tensors[node.output[0]].name = node.output[0]
-        builder.graph.nodes[-1].outputs = [node.output[0]]
+        builder.graph.rename_tensor(output, node.output[0])
     
     def _parse_generic(self, builder: IRBuilder, node, ir_op: IROpType, attrs: Dict):
         """Generic node parsing"""
         output_name = node.output[0]
         
         # Create output tensor with unknown shape
-        output_tensor = IRTensor(name=output_name, shape=(1,))
+        output_tensor = builder._tensor_cls(name=output_name, shape=(1,))
         builder.graph.add_tensor(output_tensor)
         
-        ir_node = IRNode(
+        ir_node = builder._node_cls(
             name=f"{node.op_type}_{len(builder.graph.nodes)}",
             op_type=ir_op,
             inputs=list(node.input),
@@ -332,7 +341,8 @@ class ONNXParser(ModelParser):
 class TFLiteParser(ModelParser):
     """Parser for TensorFlow Lite models"""
     
-    def __init__(self):
+    def __init__(self, compact: bool = False):
+        self.compact = compact
         self.tflite = None
         self._load_tflite()
     
@@ -364,7 +374,7 @@ class TFLiteParser(ModelParser):
         interpreter = self.tflite.Interpreter(model_content=model_content)
         interpreter.allocate_tensors()
         
-        builder = IRBuilder(name="tflite_model")
+        builder = IRBuilder(name="tflite_model", compact=self.compact)
         
         # Get input/output details
         input_details = interpreter.get_input_details()
@@ -396,22 +406,24 @@ class TFLiteParser(ModelParser):
         return builder.build()
 
 
-def create_parser(model_path: str) -> ModelParser:
+def create_parser(model_path: str, compact: bool = False) -> ModelParser:
     """Factory function to create appropriate parser"""
     if model_path.endswith('.onnx'):
-        return ONNXParser()
+        return ONNXParser(compact=compact)
     elif model_path.endswith('.tflite'):
-        return TFLiteParser()
+        return TFLiteParser(compact=compact)
     elif model_path.endswith('.pt') or model_path.endswith('.pth'):
         from .pytorch_parser import PyTorchParser
-        return PyTorchParser()
+        return PyTorchParser(compact=compact)
     else:
         raise ValueError(f"Unsupported model format: {model_path}")
 
 
 def parse_model(model_path: str, 
                 input_shape: tuple = (1, 3, 224, 224),
-                model_class=None) -> IRGraph:
+                model_class=None,
+                compact: bool = False,
+                cache_dir: Optional[str] = None) -> IRGraph:
     """
     Universal model parser - automatically detects format
     
@@ -419,19 +431,46 @@ def parse_model(model_path: str,
         model_path: Path to model file (.onnx, .tflite, .pt, .pth)
         input_shape: Input tensor shape (for PyTorch tracing)
         model_class: Model class (for PyTorch state_dict loading)
+        compact: Build compact (slotted, array-backed) IR records
+        cache_dir: Directory of the parsed-IR cache (None = no caching)
         
     Returns:
         IRGraph representation
     """
+    with profile_stage('parse', category='frontend',
+                       model=Path(model_path).name) as stage:
+        graph = _parse_model_cached(model_path, input_shape, model_class,
+                                    compact, cache_dir)
+        stage.graph = graph
+    return graph
+
+
+def _parse_model_cached(model_path: str, input_shape: tuple, model_class,
+                        compact: bool, cache_dir: Optional[str]) -> IRGraph:
+    """Parse model, going through the IR cache when cache_dir is set"""
+    cache = None
+    if cache_dir is not None:
+        from .ir_cache import IRCache
+        cache = IRCache(cache_dir)
+        extra = model_class.__name__ if model_class is not None else ''
+        key = cache.make_key(model_path, input_shape, extra)
+        graph = cache.load(key, compact=compact)
+        if graph is not None:
+            return graph
+    
     if model_path.endswith('.onnx'):
-        parser = ONNXParser()
-        return parser.parse(model_path)
+        parser = ONNXParser(compact=compact)
+        graph = parser.parse(model_path)
     elif model_path.endswith('.tflite'):
-        parser = TFLiteParser()
-        return parser.parse(model_path)
+        parser = TFLiteParser(compact=compact)
+        graph = parser.parse(model_path)
     elif model_path.endswith('.pt') or model_path.endswith('.pth'):
         from .pytorch_parser import PyTorchParser
-        parser = PyTorchParser()
-        return parser.parse(model_path, input_shape, model_class)
+        parser = PyTorchParser(compact=compact)
+        graph = parser.parse(model_path, input_shape, model_class)
     else:
         raise ValueError(f"Unsupported model format: {model_path}")
+    
+    if cache is not None:
+        cache.store(key, graph)
+    return graph
@@ -102,7 +102,8 @@ class PyTorchParser:
         'aten::dropout_': None,
     }
     
-    def __init__(self):
+    def __init__(self, compact: bool = False):
+        self.compact = compact
         self.torch = None
         self._load_torch()
         self._weight_map: Dict[str, np.ndarray] = {}
@@ -183,7 +184,12 @@ class PyTorchParser:
     
     def _load_pth(self, path: str, model_class: Optional[Any] = None):
         """Load .pth file (state_dict or full model)"""
-        checkpoint = self.torch.load(path, map_location='cpu')
+        try:
+            # Memory-map tensor storages so weights are paged in lazily
+            checkpoint = self.torch.load(path, map_location='cpu', mmap=True)
+        except (TypeError, RuntimeError):
+            # Older PyTorch or legacy (non-zip) checkpoint format
+            checkpoint = self.torch.load(path, map_location='cpu')
         
         if isinstance(checkpoint, dict):
             # It's a state dict
@@ -221,7 +227,7 @@ class PyTorchParser:
     def _parse_torchscript(self, model, input_shape: Tuple[int, ...],
                            model_name: str = "pytorch_model") -> IRGraph:
         """Parse TorchScript model to IR"""
-        builder = IRBuilder(name=model_name)
+        builder = IRBuilder(name=model_name, compact=self.compact)
         
         # Extract weights from state dict
         self._extract_weights(model, builder)
@@ -261,8 +267,8 @@ class PyTorchParser:
         state_dict = model.state_dict()
         
         for name, param in state_dict.items():
-            # Convert to numpy
-            data = param.cpu().numpy()
+            # Zero-copy view of the (possibly memory-mapped) CPU storage
+            data = param.detach().cpu().numpy()
             
             # Clean up name
             clean_name = name.replace('.', '_')
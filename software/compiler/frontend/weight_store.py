@@ -0,0 +1,161 @@
+"""
+EdgeNPU Compiler - Weight Store
+Lazy, memory-mapped storage for constant tensor data
+
+Weights are exposed as numpy views onto a read-only file mapping
+(copy-on-write), so IRTensor.data keeps behaving like an ndarray while the
+bytes are only paged in when a pass actually touches them. Each file is
+mapped once and shared by all tensors that live in it.
+
+Supported sources:
+- ONNX external data (location/offset/length)
+- .npy files and uncompressed .npz archives
+- Raw byte ranges in the compiler's own cache files
+"""
+
+import hashlib
+import os
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
+
+
+class WeightStore:
+    """
+    Registry of memory-mapped weight files
+    """
+    
+    def __init__(self, mode: str = 'c'):
+        # 'c' = copy-on-write: in-place edits never reach the file
+        self.mode = mode
+        # realpath -> (file identity, mapping)
+        self._maps: Dict[str, Tuple[Tuple[int, int, int], np.memmap]] = {}
+    
+    def map_file(self, path: Union[str, Path]) -> np.memmap:
+        """Map a whole file as bytes (cached per path and file identity)"""
+        real = os.path.realpath(str(path))
+        st = os.stat(real)
+        # A replaced file (new inode/mtime) gets a fresh mapping; the stale
+        # one is dropped and lives on only as long as views still use it
+        identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._maps.get(real)
+        if cached is not None and cached[0] == identity:
+            return cached[1]
+        if st.st_size == 0:
+            mm = np.zeros(0, dtype=np.uint8)
+        else:
+            mm = np.memmap(real, dtype=np.uint8, mode=self.mode)
+        self._maps[real] = (identity, mm)
+        return mm
+    
+    def array(self, path: Union[str, Path], offset: int,
+              dtype: np.dtype, shape: Tuple[int, ...],
+              fortran_order: bool = False) -> np.ndarray:
+        """Return a lazy view of an array stored at a byte offset"""
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape, dtype=np.int64)) if shape else 1
+        length = count * dtype.itemsize
+        
+        mm = self.map_file(path)
+        if offset + length > len(mm):
+            raise ValueError(f"{path}: array at offset {offset} "
+                             f"({length} bytes) exceeds file size {len(mm)}")
+        
+        flat = mm[offset:offset + length].view(dtype)
+        return flat.reshape(shape, order='F' if fortran_order else 'C')
+    
+    def load_npy(self, path: Union[str, Path]) -> np.ndarray:
+        """Memory-map a .npy file"""
+        with open(path, 'rb') as f:
+            shape, fortran_order, dtype, offset = _read_npy_header(f)
+        return self.array(path, offset, dtype, shape, fortran_order)
+    
+    def load_npz(self, path: Union[str, Path]) -> Dict[str, np.ndarray]:
+        """
+        Memory-map the members of a .npz archive
+        
+        Stored (uncompressed) members are mapped in place; compressed
+        members cannot be mapped and are decompressed eagerly.
+        """
+        arrays = {}
+        with zipfile.ZipFile(path) as zf, open(path, 'rb') as raw:
+            for info in zf.infolist():
+                name = info.filename
+                if name.endswith('.npy'):
+                    name = name[:-4]
+                
+                if info.compress_type != zipfile.ZIP_STORED:
+                    with zf.open(info) as member:
+                        arrays[name] = np.lib.format.read_array(member)
+                    continue
+                
+                # Skip local file header to reach the member data
+                raw.seek(info.header_offset)
+                local = raw.read(30)
+                name_len = int.from_bytes(local[26:28], 'little')
+                extra_len = int.from_bytes(local[28:30], 'little')
+                data_offset = info.header_offset + 30 + name_len + extra_len
+                
+                raw.seek(data_offset)
+                shape, fortran_order, dtype, header_len = _read_npy_header(raw)
+                arrays[name] = self.array(path, data_offset + header_len,
+                                          dtype, shape, fortran_order)
+        return arrays
+    
+    def load(self, path: Union[str, Path]) -> Dict[str, np.ndarray]:
+        """Load .npy (keyed by file stem) or .npz lazily"""
+        path = Path(path)
+        if path.suffix == '.npy':
+            return {path.stem: self.load_npy(path)}
+        elif path.suffix == '.npz':
+            return self.load_npz(path)
+        raise ValueError(f"Unsupported weight file: {path}")
+    
+    def close(self):
+        """Drop cached mappings (live views keep their mapping alive)"""
+        self._maps.clear()
+
+
+def _read_npy_header(f) -> Tuple[Tuple[int, ...], bool, np.dtype, int]:
+    """Read .npy header, return (shape, fortran_order, dtype, header_size)"""
+    start = f.tell()
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype.hasobject:
+        raise ValueError("Object arrays cannot be memory-mapped")
+    return shape, fortran_order, dtype, f.tell() - start
+
+
+def is_mapped(array: Optional[np.ndarray]) -> bool:
+    """True if array is a view onto a memory-mapped file"""
+    base = array
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    return False
+
+
+def array_digest(array: np.ndarray) -> str:
+    """SHA-256 of array dtype, shape and contents"""
+    arr = np.ascontiguousarray(array)
+    h = hashlib.sha256()
+    h.update(f"{arr.dtype.str}{arr.shape}".encode('utf-8'))
+    h.update(memoryview(arr.reshape(-1)).cast('B'))
+    return h.hexdigest()
+
+
+# Shared default store
+_default_store: Optional[WeightStore] = None
+
+
+def get_weight_store() -> WeightStore:
+    """Get the process-wide weight store"""
+    global _default_store
+    if _default_store is None:
+        _default_store = WeightStore()
+    return _default_store
@@ -510,18 +510,20 @@ def load_pytorch_model(model_path: str, input_shape: tuple = (1, 3, 224, 224)) -
         from .optimizer import optimize_graph
         from .optimizer.quantizer import quantize_graph
         from .backend import compile_graph
+        from .profiler import profile_stage
         
-        # Parse using new frontend
-        ir_graph = parse_model(model_path, input_shape)
-        
-        # Optimize
-        ir_graph = optimize_graph(ir_graph, opt_level=2)
-        
-        # Quantize
-        ir_graph = quantize_graph(ir_graph)
-        
-        # Compile
-        compiled = compile_graph(ir_graph)
+        with profile_stage('load_pytorch_model'):
+            # Parse using new frontend
+            ir_graph = parse_model(model_path, input_shape)
+            
+            # Optimize
+            ir_graph = optimize_graph(ir_graph, opt_level=2)
+            
+            # Quantize
+            ir_graph = quantize_graph(ir_graph)
+            
+            # Compile
+            compiled = compile_graph(ir_graph)
         
         return compiled
         
@@ -570,10 +572,34 @@ Supported formats:
     parser.add_argument('--model-class', help='Model class for PyTorch state_dict')
     parser.add_argument('--opt-level', type=int, default=2, choices=[0,1,2,3],
                         help='Optimization level (default: 2)')
+    parser.add_argument('--cache-dir',
+                        help='Cache parsed IR in this directory (reused across runs)')
+    parser.add_argument('--profile', nargs='?', const='compile_trace.json', metavar='TRACE',
+                        help='Profile compile stages and write a Chrome trace '
+                             '(default: compile_trace.json)')
     parser.add_argument('-v', '--verbose', action='store_true', help='Verbose output')
     
     args = parser.parse_args()
     
+    if not args.profile:
+        return _compile_cli(args)
+    
+    from .profiler import CompileProfiler
+    
+    with CompileProfiler() as profiler:
+        with profiler.stage('npu_compiler', input=args.input):
+            result = _compile_cli(args)
+    
+    profiler.print_summary()
+    profiler.save_trace(args.profile)
+    print(f"Profile trace: {args.profile} (open in chrome://tracing or ui.perfetto.dev)")
+    return result
+
+
+def _compile_cli(args) -> int:
+    """Run the compile selected by parsed CLI arguments"""
+    from .profiler import profile_stage
+    
     input_file = args.input
     
     # Parse input shape
@@ -585,12 +611,15 @@ Supported formats:
     # Determine format and compile
     if input_file.endswith('.onnx'):
         print("Format: ONNX")
-        model_def = load_onnx_model(input_file)
+        with profile_stage('load_onnx_model'):
+            model_def = load_onnx_model(input_file)
         if model_def is None:
             return 1
         compiler = NPUCompiler()
-        compiled = compiler.compile_model(model_def)
-        compiler.save_binary(compiled, args.output)
+        with profile_stage('compile_model', layers=len(model_def.get('layers', []))):
+            compiled = compiler.compile_model(model_def)
+        with profile_stage('save'):
+            compiler.save_binary(compiled, args.output)
         if args.header:
             compiler.save_c_header(compiled, args.header)
             
@@ -605,7 +634,8 @@ Supported formats:
             from .optimizer.quantizer import quantize_graph
             from .backend import compile_graph
             
-            ir_graph = parse_model(input_file, input_shape)
+            ir_graph = parse_model(input_file, input_shape,
+                                   cache_dir=args.cache_dir)
             if args.verbose:
                 print(ir_graph.summary())
             
@@ -633,8 +663,10 @@ Supported formats:
         with open(input_file) as f:
             model_def = json.load(f)
         compiler = NPUCompiler()
-        compiled = compiler.compile_model(model_def)
-        compiler.save_binary(compiled, args.output)
+        with profile_stage('compile_model', layers=len(model_def.get('layers', []))):
+            compiled = compiler.compile_model(model_def)
+        with profile_stage('save'):
+            compiler.save_binary(compiled, args.output)
         if args.header:
             compiler.save_c_header(compiled, args.header)
     else:
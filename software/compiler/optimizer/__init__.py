@@ -6,13 +6,32 @@ Graph optimization passes
 from .graph_optimizer import GraphOptimizer
 from .passes import (
     OptimizationPass,
+    RewritePass,
     FuseConvBNPass,
     FuseConvReluPass,
     ConstantFoldingPass,
     DeadCodeEliminationPass,
     LayoutOptimizationPass,
+    MemoryOrderingPass,
 )
+from .analysis import (
+    Analysis,
+    AnalysisManager,
+    TopoOrderAnalysis,
+    UseDefAnalysis,
+    LivenessAnalysis,
+    ShapeAnalysis,
+    MacCountAnalysis,
+)
+from .tile_search import TileSearch, tune_tiling
+from .memory_order import MemoryAwareOrderer, activation_peak, memory_aware_order
+from .rewrite import RewriteEngine, RewriteRule, RewriteContext, Match, Op, Const, AnyValue
 from .quantizer import Quantizer, CalibrationData
+from .calibration_stats import TensorStats
+from .calibration_cache import CalibrationCache
+from .calibration_dataset import StreamingDataset, ArrayDataset, FileDataset
+from .parallel_calibration import ParallelCalibrator
+from .reference_executor import ReferenceExecutor, run_graph
 
 __all__ = [
     'GraphOptimizer',
@@ -22,6 +41,35 @@ __all__ = [
     'ConstantFoldingPass',
     'DeadCodeEliminationPass',
     'LayoutOptimizationPass',
+    'MemoryOrderingPass',
+    'RewritePass',
+    'Analysis',
+    'AnalysisManager',
+    'TopoOrderAnalysis',
+    'UseDefAnalysis',
+    'LivenessAnalysis',
+    'ShapeAnalysis',
+    'MacCountAnalysis',
+    'MemoryAwareOrderer',
+    'activation_peak',
+    'memory_aware_order',
+    'TileSearch',
+    'tune_tiling',
+    'RewriteEngine',
+    'RewriteRule',
+    'RewriteContext',
+    'Match',
+    'Op',
+    'Const',
+    'AnyValue',
     'Quantizer',
     'CalibrationData',
+    'TensorStats',
+    'CalibrationCache',
+    'StreamingDataset',
+    'ArrayDataset',
+    'FileDataset',
+    'ParallelCalibrator',
+    'ReferenceExecutor',
+    'run_graph',
 ]
@@ -0,0 +1,199 @@
+"""
+EdgeNPU Compiler - Graph Analyses
+Cached graph analyses shared by optimization passes and backend stages
+
+Analyses are computed on demand through an AnalysisManager and cached
+until the graph changes. A cached result is reused while graph.version is
+unchanged, or when the pass that changed the graph declared (via its
+`preserves` set) that the analysis is still valid.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type
+
+from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+
+
+class Analysis(ABC):
+    """Base class for graph analyses"""
+    
+    name: str = "analysis"
+    
+    @abstractmethod
+    def compute(self, graph: IRGraph, am: 'AnalysisManager') -> Any:
+        """Compute analysis result (may query other analyses through am)"""
+        pass
+
+
+class TopoOrderAnalysis(Analysis):
+    """Topological node order"""
+    
+    name = "topo_order"
+    
+    def compute(self, graph: IRGraph, am: 'AnalysisManager') -> List[IRNode]:
+        return graph.topological_sort()
+
+
+class UseDefAnalysis(Analysis):
+    """Tensor -> producer node and tensor -> consumer nodes"""
+    
+    name = "use_def"
+    
+    def compute(self, graph: IRGraph, am: 'AnalysisManager'
+                ) -> Tuple[Dict[str, IRNode], Dict[str, List[IRNode]]]:
+        producers: Dict[str, IRNode] = {}
+        consumers: Dict[str, List[IRNode]] = {}
+        for node in graph.nodes:
+            for out in node.outputs:
+                producers.setdefault(out, node)
+            for inp in dict.fromkeys(node.inputs):
+                consumers.setdefault(inp, []).append(node)
+        return producers, consumers
+
+
+class LivenessAnalysis(Analysis):
+    """Tensor -> (first_use, last_use) positions in topological order"""
+    
+    name = "liveness"
+    
+    def compute(self, graph: IRGraph, am: 'AnalysisManager') -> Dict[str, Tuple[int, int]]:
+        liveness: Dict[str, Tuple[int, int]] = {}
+        
+        for i, node in enumerate(am.get(TopoOrderAnalysis, graph)):
+            # Inputs extend liveness to this node
+            for inp in node.inputs:
+                if inp not in liveness:
+                    liveness[inp] = (i, i)
+                else:
+                    liveness[inp] = (liveness[inp][0], i)
+            
+            # Outputs become live here
+            for out in node.outputs:
+                if out not in liveness:
+                    liveness[out] = (i, i)
+        
+        return liveness
+
+
+class ShapeAnalysis(Analysis):
+    """Tensor -> shape"""
+    
+    name = "shapes"
+    
+    def compute(self, graph: IRGraph, am: 'AnalysisManager') -> Dict[str, Tuple[int, ...]]:
+        return {name: tuple(t.shape) for name, t in graph.tensors.items()}
+
+
+class MacCountAnalysis(Analysis):
+    """Node name -> multiply-accumulate count"""
+    
+    name = "macs"
+    
+    def compute(self, graph: IRGraph, am: 'AnalysisManager') -> Dict[str, int]:
+        shapes = am.get(ShapeAnalysis, graph)
+        macs: Dict[str, int] = {}
+        
+        for node in graph.nodes:
+            macs[node.name] = self._node_macs(node, shapes)
+        
+        return macs
+    
+    def _node_macs(self, node: IRNode, shapes: Dict[str, Tuple[int, ...]]) -> int:
+        if len(node.inputs) < 2 or not node.outputs:
+            return 0
+        weight = shapes.get(node.inputs[1])
+        output = shapes.get(node.outputs[0])
+        if not weight or not output:
+            return 0
+        
+        if node.op_type == IROpType.CONV2D and len(weight) == 4 and len(output) == 4:
+            out_ch, in_ch, kh, kw = weight
+            _, _, out_h, out_w = output
+            return out_ch * in_ch * out_h * out_w * kh * kw
+        
+        elif node.op_type == IROpType.DEPTHWISE_CONV2D and len(weight) == 4 and len(output) == 4:
+            channels, _, kh, kw = weight
+            _, _, out_h, out_w = output
+            return channels * out_h * out_w * kh * kw
+        
+        elif node.op_type in [IROpType.FULLY_CONNECTED, IROpType.MATMUL] and len(weight) >= 2:
+            batch = output[0] if output else 1
+            return batch * weight[0] * weight[1]
+        
+        return 0
+
+
+# Registry of known analyses
+ANALYSES: Dict[str, Type[Analysis]] = {
+    cls.name: cls for cls in [
+        TopoOrderAnalysis,
+        UseDefAnalysis,
+        LivenessAnalysis,
+        ShapeAnalysis,
+        MacCountAnalysis,
+    ]
+}
+
+# Convenience value for passes that never change what analyses observe
+ALL_ANALYSES: FrozenSet[str] = frozenset(ANALYSES)
+
+
+class AnalysisManager:
+    """
+    Cache of analysis results for a graph
+    """
+    
+    def __init__(self):
+        self.graph: Optional[IRGraph] = None
+        self._cache: Dict[str, Tuple[int, Any]] = {}  # name -> (graph version, result)
+        self.hits = 0
+        self.misses = 0
+    
+    def _bind(self, graph: IRGraph):
+        if graph is not self.graph:
+            self.graph = graph
+            self._cache = {}
+    
+    def get(self, analysis: Type[Analysis], graph: IRGraph) -> Any:
+        """Get (possibly cached) analysis result"""
+        self._bind(graph)
+        
+        entry = self._cache.get(analysis.name)
+        if entry is not None and entry[0] == graph.version:
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        result = analysis().compute(graph, self)
+        self._cache[analysis.name] = (graph.version, result)
+        return result
+    
+    def invalidate(self, preserved: Iterable[str] = ()):
+        """
+        Drop cached results after a graph change
+        
+        Preserved analyses stay valid and are re-stamped with the current
+        graph version; everything else is discarded.
+        """
+        preserved = set(preserved)
+        if self.graph is None:
+            return
+        
+        version = self.graph.version
+        self._cache = {
+            name: (version, result)
+            for name, (_, result) in self._cache.items()
+            if name in preserved
+        }
+    
+    def clear(self):
+        """Drop all cached results"""
+        self._cache = {}
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cached': len(self._cache),
+        }
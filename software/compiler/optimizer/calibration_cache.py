@@ -0,0 +1,188 @@
+"""
+EdgeNPU Compiler - Calibration Cache
+On-disk cache of raw calibration statistics
+
+Entries hold the per-tensor TensorStats (histogram, min/max, moments)
+collected by Quantizer.calibrate(), keyed by the structural hash of the
+float graph, a fingerprint of the calibration dataset and the parameters
+the statistics depend on (histogram bins, batch size). Quantization
+settings are not part of the key: sweeping QuantizationConfig variants
+over a cached entry only reruns the scale / zero-point derivation.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+import numpy as np
+
+from ..frontend.ir_builder import IRGraph
+from ..frontend.ir_cache import default_cache_dir
+from .calibration_stats import TensorStats
+
+CACHE_VERSION = 2
+_ENTRY_SUFFIX = '.npcal'
+
+# Scalar TensorStats fields stored alongside the histogram counts
+_FIELDS = ('width', 'neg', 'min', 'max', 'count', 'zeros', 'mean', 'm2')
+
+
+def dataset_fingerprint(data: Any) -> Optional[str]:
+    """Fingerprint of a calibration dataset, or None if it cannot be identified"""
+    fingerprint = getattr(data, 'fingerprint', None)
+    return fingerprint() if callable(fingerprint) else None
+
+
+class CalibrationCache:
+    """
+    Size-bounded LRU cache of calibration statistics
+    
+    Recency is tracked with file mtimes, so it persists across processes.
+    """
+    
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir() / 'calibration'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def make_key(self, graph: IRGraph, data: Any, bins: int,
+                 batch_size: int) -> Optional[str]:
+        """Cache key for (graph structure, dataset, statistics parameters), or None"""
+        fingerprint = dataset_fingerprint(data)
+        if fingerprint is None:
+            return None
+        # Imported here: compile_cache pulls in the backend, which imports this package
+        from ..compile_cache import graph_digest
+        text = "|".join([f"v{CACHE_VERSION}", graph_digest(graph), fingerprint,
+                         str(bins), str(batch_size)])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_ENTRY_SUFFIX}"
+    
+    def get(self, key: str) -> Optional[Dict[str, TensorStats]]:
+        """Look up statistics by tensor name, or None on miss"""
+        path = self.path_for(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                stats = self._unpack(entry)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: discarding calibration cache entry {path.name}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        
+        # Mark as most recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        self.hits += 1
+        return stats
+    
+    def put(self, key: str, stats: Dict[str, TensorStats]):
+        """Store statistics and evict old entries (failures only warn)"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **self._pack(stats))
+            os.replace(tmp_path, self.path_for(key))
+        except OSError as e:
+            print(f"Warning: could not write calibration cache entry: {e}")
+            return
+        
+        self.evict()
+    
+    @staticmethod
+    def _pack(stats: Dict[str, TensorStats]) -> Dict[str, np.ndarray]:
+        # Tensors that saw no data are rebuilt empty on load
+        names = [name for name, entry in stats.items() if not entry.empty]
+        bins = stats[names[0]].bins if names else 0
+        arrays = {
+            'version': np.array(CACHE_VERSION),
+            'names': np.array(names, dtype=str),
+            'counts': np.array([stats[name].counts for name in names],
+                               dtype=np.float64).reshape(len(names), bins),
+        }
+        for field in _FIELDS:
+            arrays[field] = np.array([getattr(stats[name], field) for name in names],
+                                     dtype=np.float64)
+        return arrays
+    
+    @staticmethod
+    def _unpack(entry) -> Dict[str, TensorStats]:
+        if int(entry['version']) != CACHE_VERSION:
+            raise ValueError(f"entry version {int(entry['version'])}, expected {CACHE_VERSION}")
+        counts = entry['counts']
+        columns = {field: entry[field] for field in _FIELDS}
+        
+        stats = {}
+        for i, name in enumerate(entry['names'].tolist()):
+            item = TensorStats(counts.shape[1])
+            item.counts = counts[i].copy()
+            item.width = float(columns['width'][i])
+            item.neg = int(columns['neg'][i])
+            item.min = float(columns['min'][i])
+            item.max = float(columns['max'][i])
+            item.count = int(columns['count'][i])
+            item.zeros = int(columns['zeros'][i])
+            item.mean = float(columns['mean'][i])
+            item.m2 = float(columns['m2'][i])
+            stats[name] = item
+        return stats
+    
+    def _entries(self):
+        """List (mtime, size, path) of entries, oldest first"""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for path in self.cache_dir.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        entries.sort()
+        return entries
+    
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    
+    def evict(self):
+        """Evict least recently used entries until under max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            self.evictions += 1
+    
+    def clear(self):
+        """Remove all entries"""
+        for _, _, path in self._entries():
+            self._remove(path)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries()),
+        }
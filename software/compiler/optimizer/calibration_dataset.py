@@ -0,0 +1,226 @@
+"""
+EdgeNPU Compiler - Calibration Datasets
+Stream calibration samples from disk instead of holding them in memory
+
+Datasets follow the CalibrationData protocol (num_samples, iter_batches),
+so they plug straight into Quantizer.calibrate() and quantize_graph().
+Samples are decoded and preprocessed on a thread pool while a producer
+thread assembles contiguous float32 batches into a bounded queue, so at
+most `prefetch` finished batches wait ahead of the consumer.
+
+Sources:
+- One large array (.npy, memory-mapped; or any ndarray / np.memmap)
+- A directory (or list) of .npy files and/or images (images need Pillow)
+"""
+
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from ..frontend.weight_store import array_digest, get_weight_store
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.ppm', '.pgm')
+
+# preprocess(raw sample) -> float32 array of the model input shape (no batch axis)
+Preprocess = Callable[[np.ndarray], np.ndarray]
+
+_DONE = object()
+
+
+def _callable_name(fn: Optional[Callable]) -> str:
+    if fn is None:
+        return ''
+    return f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+
+
+class StreamingDataset:
+    """
+    Base class: subclasses provide __len__ and load(index)
+    """
+    
+    def __init__(self, preprocess: Optional[Preprocess] = None,
+                 num_workers: int = 4, prefetch: int = 2):
+        self.preprocess = preprocess
+        self.num_workers = max(1, num_workers)
+        self.prefetch = max(1, prefetch)
+    
+    def __len__(self) -> int:
+        raise NotImplementedError
+    
+    @property
+    def num_samples(self) -> int:
+        return len(self)
+    
+    def load(self, index: int) -> np.ndarray:
+        """Raw sample at index"""
+        raise NotImplementedError
+    
+    def sample(self, index: int) -> np.ndarray:
+        """Decoded and preprocessed sample at index"""
+        data = self.load(index)
+        if self.preprocess is not None:
+            data = self.preprocess(data)
+        return np.asarray(data, dtype=np.float32)
+    
+    def fingerprint(self) -> Optional[str]:
+        """
+        Identity of the samples for the calibration cache (None = uncacheable)
+        
+        The preprocess function is identified by name only, so changing its
+        body under the same name needs a fresh cache.
+        """
+        return None
+    
+    def _fill(self, indices: range, pool: ThreadPoolExecutor) -> np.ndarray:
+        first = self.sample(indices[0])
+        batch = np.empty((len(indices),) + first.shape, dtype=np.float32)
+        batch[0] = first
+        for slot, data in enumerate(pool.map(self.sample, indices[1:]), start=1):
+            batch[slot] = data
+        return batch
+    
+    def _produce(self, batch_size: int, out: queue.Queue, stop: threading.Event):
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        try:
+            with ThreadPoolExecutor(self.num_workers) as pool:
+                for start in range(0, len(self), batch_size):
+                    indices = range(start, min(start + batch_size, len(self)))
+                    if not put(self._fill(indices, pool)):
+                        return
+        except BaseException as e:
+            put(e)
+            return
+        put(_DONE)
+    
+    def iter_batches(self, batch_size: int = 32) -> Iterator[np.ndarray]:
+        """Yield contiguous float32 batches, prepared in the background"""
+        if len(self) == 0:
+            return
+        out: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(batch_size, out, stop),
+                                    name='calibration-prefetch', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early (or finished): release the producer
+            stop.set()
+            producer.join()
+    
+    def get_batched(self, batch_size: int = 32) -> List[np.ndarray]:
+        """Get data in batches (materializes the whole dataset)"""
+        return list(self.iter_batches(batch_size))
+
+
+class ArrayDataset(StreamingDataset):
+    """
+    Samples along the first axis of one large array, memory-mapped from .npy
+    """
+    
+    def __init__(self, source: Union[str, os.PathLike, np.ndarray],
+                 preprocess: Optional[Preprocess] = None,
+                 num_workers: int = 4, prefetch: int = 2):
+        super().__init__(preprocess, num_workers, prefetch)
+        self.path = None
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.path.realpath(source)
+            source = get_weight_store().load_npy(source)
+        self.array = source
+    
+    def __len__(self) -> int:
+        return len(self.array)
+    
+    def load(self, index: int) -> np.ndarray:
+        return self.array[index]
+    
+    def fingerprint(self) -> Optional[str]:
+        if self.path is not None:
+            st = os.stat(self.path)
+            # Files are identified by (size, mtime) rather than rehashed
+            source = f"{self.path}:{st.st_size}:{st.st_mtime_ns}"
+        else:
+            source = array_digest(self.array)
+        text = f"array|{source}|{_callable_name(self.preprocess)}"
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _fill(self, indices: range, pool: ThreadPoolExecutor) -> np.ndarray:
+        if self.preprocess is not None:
+            return super()._fill(indices, pool)
+        # One contiguous copy straight out of the mapping
+        return np.ascontiguousarray(self.array[indices.start:indices.stop], dtype=np.float32)
+
+
+class FileDataset(StreamingDataset):
+    """
+    One sample per file: .npy arrays (memory-mapped) or images
+    
+    Images are decoded with Pillow to RGB, optionally resized to
+    image_size (height, width), and converted to CHW float32 in [0, 1]
+    before the user preprocess runs.
+    """
+    
+    def __init__(self, source: Union[str, os.PathLike, Sequence[Union[str, os.PathLike]]],
+                 preprocess: Optional[Preprocess] = None,
+                 image_size: Optional[Tuple[int, int]] = None,
+                 num_workers: int = 4, prefetch: int = 2):
+        super().__init__(preprocess, num_workers, prefetch)
+        if isinstance(source, (str, os.PathLike)):
+            root = Path(source)
+            self.paths = sorted(p for p in root.iterdir()
+                                if p.suffix.lower() in ('.npy',) + IMAGE_EXTENSIONS)
+        else:
+            self.paths = [Path(p) for p in source]
+        self.image_size = image_size
+        self._image = None
+    
+    def __len__(self) -> int:
+        return len(self.paths)
+    
+    def fingerprint(self) -> Optional[str]:
+        h = hashlib.sha256()
+        h.update(f"files|{self.image_size}|{_callable_name(self.preprocess)}".encode('utf-8'))
+        for path in self.paths:
+            st = path.stat()
+            h.update(f"\n{os.path.realpath(path)}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+        return h.hexdigest()
+    
+    def load(self, index: int) -> np.ndarray:
+        path = self.paths[index]
+        if path.suffix.lower() == '.npy':
+            # Per-file mapping, dropped once the sample is copied into its batch
+            return np.load(path, mmap_mode='r')
+        return self._load_image(path)
+    
+    def _load_image(self, path: Path) -> np.ndarray:
+        if self._image is None:
+            try:
+                from PIL import Image
+            except ImportError:
+                raise ImportError("Pillow not installed. Run: pip install pillow")
+            self._image = Image
+        with self._image.open(path) as img:
+            img = img.convert('RGB')
+            if self.image_size is not None:
+                img = img.resize((self.image_size[1], self.image_size[0]))
+            data = np.asarray(img, dtype=np.float32) / 255.0
+        return data.transpose(2, 0, 1)
@@ -0,0 +1,249 @@
+"""
+EdgeNPU Compiler - Calibration Statistics
+Streaming per-tensor statistics for activation quantization
+
+Each tensor keeps min/max and a fixed-size histogram whose bin grid is
+anchored at zero. Bin widths are powers of two chosen from the observed
+range alone, so when a batch falls outside the current range the bins
+are widened by a power-of-two factor and merged exactly, and memory
+stays constant however many samples are observed.
+
+Statistics are mergeable (merge()), so shards of a dataset can be
+calibrated independently and reduced afterwards; shards always sit on
+commensurate grids, so the merged histogram matches a serial pass.
+"""
+
+import math
+from typing import Optional, Tuple
+import numpy as np
+
+DEFAULT_BINS = 2048
+
+
+def _grid_width(width: float) -> float:
+    """Smallest power of two >= width"""
+    mantissa, exponent = math.frexp(width)
+    return math.ldexp(1.0, exponent - 1 if mantissa == 0.5 else exponent)
+
+
+def _rebin(counts: np.ndarray, neg: int, factor: int, new_neg: int) -> np.ndarray:
+    """Map zero-anchored counts onto a grid factor times wider"""
+    # Both grids contain zero, so every old bin lies inside one new bin
+    target = np.floor_divide(np.arange(len(counts)) - neg, factor) + new_neg
+    np.clip(target, 0, len(counts) - 1, out=target)
+    return np.bincount(target, weights=counts, minlength=len(counts))
+
+
+def _xlogx(x: np.ndarray) -> np.ndarray:
+    """x * log(x), with 0 log 0 = 0"""
+    x = np.asarray(x, dtype=np.float64)
+    return x * np.log(x, out=np.zeros_like(x), where=x > 0)
+
+
+class TensorStats:
+    """
+    Running min/max and zero-anchored histogram of one tensor
+    """
+    
+    def __init__(self, bins: int = DEFAULT_BINS):
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.float64)
+        self.width = 0.0   # bin width (0 = no data yet)
+        self.neg = 0       # bins below zero; bin i covers [(i - neg) * width, ...)
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.count = 0
+        self.zeros = 0     # exact zeros (ReLU outputs, padding)
+        self.mean = 0.0
+        self.m2 = 0.0      # sum of squared deviations from the mean
+    
+    @property
+    def empty(self) -> bool:
+        return self.count == 0
+    
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+    
+    @property
+    def range(self) -> Tuple[float, float]:
+        """Histogram range [low, high)"""
+        return -self.neg * self.width, (self.bins - self.neg) * self.width
+    
+    def update(self, values: np.ndarray):
+        """Fold a batch of values into the statistics"""
+        data = np.asarray(values, dtype=np.float32).reshape(-1)
+        if data.size == 0:
+            return
+        low, high = float(data.min()), float(data.max())
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        
+        total = float(data.sum())
+        mean = total / data.size
+        m2 = max(float(np.dot(data, data)) - total * mean, 0.0)
+        self._merge_moments(data.size, mean, m2)
+        
+        if self.width == 0.0 and low == high == 0.0:
+            # No scale yet; binned once the first non-zero value arrives
+            self.zeros += data.size
+            return
+        self._fit_range(min(low, 0.0), max(high, 0.0))
+        self.zeros += data.size - int(np.count_nonzero(data))
+        
+        # Bin index in float32 (shifted non-negative, so truncation floors)
+        index = data * np.float32(1.0 / self.width)
+        index += np.float32(self.neg)
+        np.clip(index, 0, self.bins - 1, out=index)
+        self.counts += np.bincount(index.astype(np.int32), minlength=self.bins)
+    
+    def _merge_moments(self, count: int, mean: float, m2: float):
+        """Chan et al. pairwise update of count / mean / m2"""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+    
+    def merge(self, other: 'TensorStats'):
+        """Fold another TensorStats (e.g. from a different data shard) into this one"""
+        if other.empty:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._merge_moments(other.count, other.mean, other.m2)
+        
+        if other.width == 0.0:
+            # Only unbinned zeros on the other side
+            if self.width:
+                self.counts[self.neg] += other.zeros
+            self.zeros += other.zeros
+            return
+        if self.width == 0.0:
+            pending = self.zeros
+            self.counts = other.counts.copy()
+            self.width, self.neg = other.width, other.neg
+            self.counts[min(self.neg, self.bins - 1)] += pending
+            self.zeros = pending + other.zeros
+            return
+        
+        self.zeros += other.zeros
+        self._fit_range(min(other.min, 0.0), max(other.max, 0.0), other.width)
+        factor = int(round(self.width / other.width))
+        if factor == 1 and other.neg == self.neg:
+            self.counts += other.counts
+        else:
+            self.counts += _rebin(other.counts, other.neg, factor, self.neg)
+    
+    def _fit_range(self, low: float, high: float, width: float = 0.0):
+        """
+        Grow the histogram to cover [low, high] (low <= 0 <= high) on bins
+        at least width wide
+        """
+        # ceil(-low / w) negative bins plus floor(high / w) + 1 others fit
+        # in bins - 2 widths; rounding to a power of two keeps the width a
+        # function of the range, whatever order the data arrived in
+        if self.width == 0.0:
+            self.width = max(_grid_width((high - low) / (self.bins - 2)), width)
+            self.neg = int(np.ceil(-low / self.width))
+            self.counts[min(self.neg, self.bins - 1)] += self.zeros
+            return
+        
+        # Only the observed extent needs covering, not the old slack
+        low, high = min(low, self.min, 0.0), max(high, self.max, 0.0)
+        width = max(self.width, width, _grid_width((high - low) / (self.bins - 2)))
+        cur_low, cur_high = self.range
+        if width == self.width and low >= cur_low and high < cur_high:
+            return
+        factor = int(round(width / self.width))
+        
+        # Split the spare bins in proportion to each side's extent
+        min_neg = int(np.ceil(-low / width))
+        max_neg = self.bins - 1 - int(np.floor(high / width))
+        neg = min(max(int(round(self.bins * -low / (high - low))), min_neg), max_neg)
+        
+        self.counts = _rebin(self.counts, self.neg, factor, neg)
+        self.width, self.neg = width, neg
+    
+    def percentile(self, q: float) -> float:
+        """Value below which q percent of observations fall (interpolated within bins)"""
+        if self.width == 0.0:
+            return 0.0
+        cdf = np.cumsum(self.counts)
+        target = cdf[-1] * q / 100.0
+        i = int(np.searchsorted(cdf, target))
+        i = min(i, self.bins - 1)
+        below = cdf[i - 1] if i > 0 else 0
+        frac = (target - below) / self.counts[i] if self.counts[i] else 0.0
+        value = (i - self.neg + frac) * self.width
+        return float(np.clip(value, self.min, self.max))
+    
+    def magnitude_histogram(self) -> np.ndarray:
+        """Histogram of |x| on the same bin width"""
+        pos = self.counts[self.neg:]
+        neg = self.counts[:self.neg][::-1]
+        hist = np.zeros(max(len(pos), len(neg)), dtype=np.float64)
+        hist[:len(pos)] += pos
+        hist[:len(neg)] += neg
+        return hist
+    
+    def entropy_threshold(self, levels: int = 128, max_candidates: int = 256) -> float:
+        """
+        Clipping threshold on |x| minimizing KL(P || Q), where P is the
+        clipped distribution and Q its quantization to the given levels
+        """
+        if self.width == 0.0:
+            return 0.0
+        hist = self.magnitude_histogram()
+        # Zero is exact in any range; a ReLU spike there would dominate bucket 0
+        hist[0] = max(hist[0] - self.zeros, 0.0)
+        nonzero = np.nonzero(hist)[0]
+        n = int(nonzero[-1]) + 1 if len(nonzero) else 0
+        if n <= levels:
+            return n * self.width
+        
+        # KL of every candidate at once from prefix sums. With P = sum(hist)
+        # and Q = sum(hist[:i]), KL = (sum p log p - sum p log q) / P + log(Q / P);
+        # bucket b of candidate i covers bins [ceil(b*i/levels), ceil((b+1)*i/levels))
+        # and every used bin of it gets q = mass / used bins
+        step = max(1, (n - levels) // max_candidates)
+        candidates = np.array(list(range(levels, n, step)) + [n])
+        hist = hist[:n]
+        cum = np.concatenate(([0.0], np.cumsum(hist)))
+        total = cum[-1]
+        used = np.concatenate(([0], np.cumsum(hist > 0)))
+        plogp = np.concatenate(([0.0], np.cumsum(_xlogx(hist))))
+        
+        edges = -(-np.arange(levels + 1) * candidates[:, None] // levels)
+        bounds = cum[edges]
+        mass = bounds[:, 1:] - bounds[:, :-1]
+        bounds = used[edges]
+        filled = bounds[:, 1:] - bounds[:, :-1]
+        log_q = np.log(mass, out=np.zeros_like(mass), where=mass > 0)
+        log_q -= np.log(filled, out=np.zeros_like(mass), where=filled > 0)
+        plogq = np.einsum('ij,ij->i', mass, log_q)
+        
+        # The last kept bin also takes the clipped tail; clipped mass landing
+        # on an empty bin has no quantized counterpart
+        last = hist[candidates - 1]
+        tail = total - cum[candidates]
+        plogp = plogp[candidates - 1] + _xlogx(last + tail)
+        plogq += tail * log_q[:, -1]
+        with np.errstate(divide='ignore'):
+            kl = (plogp - plogq) / total + np.log(cum[candidates] / total)
+        kl[(last == 0) & (tail > 0)] = np.inf
+        best = int(candidates[np.argmin(kl)]) if np.isfinite(kl).any() else n
+        return best * self.width
+    
+    def quant_range(self, method: str = 'minmax', percentile: float = 99.99,
+                    levels: Optional[int] = None) -> Tuple[float, float]:
+        """(min, max) to quantize over for a calibration method"""
+        if method == 'percentile':
+            return self.percentile(100 - percentile), self.percentile(percentile)
+        if method == 'entropy':
+            if levels is None:
+                # One-sided data gets every level, two-sided data half per side
+                levels = 256 if self.min >= 0 or self.max <= 0 else 128
+            threshold = self.entropy_threshold(levels)
+            return max(self.min, -threshold), min(self.max, threshold)
+        return self.min, self.max
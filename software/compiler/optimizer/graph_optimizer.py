@@ -7,7 +7,10 @@ from typing import List, Optional, Dict, Any
 import time
 
 from ..frontend.ir_builder import IRGraph
+from ..backend.cost_model import HardwareConfig
 
+from ..profiler import profile_stage
+from .analysis import AnalysisManager, MacCountAnalysis
 from .passes import (
     OptimizationPass,
     FuseConvBNPass,
@@ -15,6 +18,7 @@ from .passes import (
     ConstantFoldingPass,
     DeadCodeEliminationPass,
     LayoutOptimizationPass,
+    MemoryOrderingPass,
     TilingPass,
 )
 
@@ -35,16 +39,21 @@ class GraphOptimizer:
     
     def __init__(self, opt_level: int = OptimizationLevel.O2,
                  pe_rows: int = 16, pe_cols: int = 16,
-                 weight_buf_kb: int = 256, act_buf_kb: int = 256):
+                 weight_buf_kb: int = 256, act_buf_kb: int = 256,
+                 hardware: Optional[HardwareConfig] = None):
         self.opt_level = opt_level
         self.pe_rows = pe_rows
         self.pe_cols = pe_cols
         self.weight_buf_kb = weight_buf_kb
         self.act_buf_kb = act_buf_kb
+        self.hardware = hardware
         
         self.passes: List[OptimizationPass] = []
         self.stats: Dict[str, Any] = {}
         
+        # Analyses cached across passes (and handed on to the backend)
+        self.analyses = AnalysisManager()
+        
         self._setup_passes()
     
     def _setup_passes(self):
@@ -65,11 +74,13 @@ class GraphOptimizer:
         
         if self.opt_level >= OptimizationLevel.O3:
             # Aggressive optimizations
+            self.passes.append(MemoryOrderingPass())
             self.passes.append(TilingPass(
                 pe_rows=self.pe_rows,
                 pe_cols=self.pe_cols,
                 weight_buf_kb=self.weight_buf_kb,
-                act_buf_kb=self.act_buf_kb
+                act_buf_kb=self.act_buf_kb,
+                hardware=self.hardware
             ))
     
     def add_pass(self, pass_: OptimizationPass):
@@ -91,6 +102,10 @@ class GraphOptimizer:
         Returns:
             Optimized IR graph
         """
+        with profile_stage('optimize', graph, opt_level=self.opt_level):
+            return self._run_passes(graph, verbose)
+    
+    def _run_passes(self, graph: IRGraph, verbose: bool) -> IRGraph:
         self.stats = {
             'original_nodes': len(graph.nodes),
             'original_tensors': len(graph.tensors),
@@ -101,16 +116,41 @@ class GraphOptimizer:
             print(f"Starting optimization (level O{self.opt_level})")
             print(f"  Initial: {len(graph.nodes)} nodes, {len(graph.tensors)} tensors")
         
+        # Graph version after the last run of each idempotent pass type
+        last_run: Dict[type, int] = {}
+        
         for pass_ in self.passes:
+            # Skip idempotent passes when nothing changed since their last run
+            if pass_.idempotent and last_run.get(type(pass_)) == graph.version:
+                self.stats['passes'].append({
+                    'name': pass_.name,
+                    'time_ms': 0.0,
+                    'nodes_removed': 0,
+                    'skipped': True,
+                })
+                if verbose:
+                    print(f"  {pass_.name}: skipped (graph unchanged)")
+                continue
+            
             start_time = time.time()
             nodes_before = len(graph.nodes)
             
+            pass_.analyses = self.analyses
             try:
-                graph = pass_.run(graph)
+                with profile_stage(pass_.name, graph, category='pass'):
+                    graph = pass_.run(graph)
             except Exception as e:
                 if verbose:
                     print(f"  Warning: Pass '{pass_.name}' failed: {e}")
+                self.analyses.clear()
                 continue
+            finally:
+                pass_.analyses = None
+            
+            if graph is self.analyses.graph:
+                self.analyses.invalidate(pass_.preserves)
+            if pass_.idempotent:
+                last_run[type(pass_)] = graph.version
             
             elapsed = time.time() - start_time
             nodes_after = len(graph.nodes)
@@ -120,19 +160,27 @@ class GraphOptimizer:
                 'time_ms': elapsed * 1000,
                 'nodes_removed': nodes_before - nodes_after,
             }
+            if hasattr(pass_, 'get_stats'):
+                pass_stats.update(pass_.get_stats())
             self.stats['passes'].append(pass_stats)
             
             if verbose:
                 print(f"  {pass_.name}: {nodes_before} -> {nodes_after} nodes "
                       f"({elapsed*1000:.2f}ms)")
+                if 'peak_reduction' in pass_stats:
+                    print(f"    peak activations: {pass_stats['peak_before']} -> "
+                          f"{pass_stats['peak_after']} bytes")
         
         self.stats['final_nodes'] = len(graph.nodes)
         self.stats['final_tensors'] = len(graph.tensors)
         self.stats['nodes_reduced'] = self.stats['original_nodes'] - self.stats['final_nodes']
+        self.stats['total_macs'] = sum(self.analyses.get(MacCountAnalysis, graph).values())
+        self.stats['analysis_cache'] = self.analyses.get_stats()
         
         if verbose:
             print(f"  Final: {len(graph.nodes)} nodes, {len(graph.tensors)} tensors")
             print(f"  Reduced {self.stats['nodes_reduced']} nodes")
+            print(f"  Total MACs: {self.stats['total_macs']}")
         
         return graph
     
@@ -150,6 +198,8 @@ class GraphOptimizer:
         for p in self.stats.get('passes', []):
             print(f"    {p['name']}: {p['time_ms']:.2f}ms, "
                   f"-{p['nodes_removed']} nodes")
+            if 'peak_reduction' in p:
+                print(f"      peak activations: {p['peak_before']} -> {p['peak_after']} bytes")
 
 
 def optimize_graph(graph: IRGraph, 
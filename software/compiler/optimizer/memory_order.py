@@ -0,0 +1,269 @@
+"""
+EdgeNPU Compiler - Memory-Aware Ordering
+Choose a topological node order that minimizes peak activation memory
+
+The graph is split at cut points (positions that no tensor lives across
+except the outputs of the node right before the cut), which every legal
+order must respect. Small regions between cuts are ordered exactly with a
+DP over subsets of scheduled nodes; larger ones greedily, always running
+the ready node that grows the live set the least.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..frontend.ir_builder import IRGraph, IRNode
+
+
+def _activation_sizes(graph: IRGraph) -> Dict[str, int]:
+    """Activation tensor -> bytes"""
+    return {name: t.nbytes for name, t in graph.tensors.items() if t.data is None}
+
+
+def activation_peak(graph: IRGraph, order: List[IRNode]) -> int:
+    """
+    Peak bytes of live activations when nodes run in the given order
+    
+    A node's inputs and outputs are live together while it runs; inputs
+    are freed after their last consumer, graph outputs never are.
+    """
+    sizes = _activation_sizes(graph)
+    outputs = set(graph.outputs)
+    remaining = {name: len(graph.get_consumers(name)) for name in sizes}
+    
+    live = sum(sizes.get(name, 0) for name in dict.fromkeys(graph.inputs))
+    peak = live
+    for node in order:
+        produced = [out for out in dict.fromkeys(node.outputs) if out in sizes]
+        live += sum(sizes[out] for out in produced)
+        peak = max(peak, live)
+        
+        for inp in dict.fromkeys(node.inputs):
+            if inp in remaining:
+                remaining[inp] -= 1
+                if remaining[inp] == 0 and inp not in outputs:
+                    live -= sizes[inp]
+        for out in produced:
+            if remaining[out] == 0 and out not in outputs:
+                live -= sizes[out]
+    
+    return peak
+
+
+class MemoryAwareOrderer:
+    """
+    Reorders nodes to minimize peak activation memory
+    """
+    
+    def __init__(self, dp_limit: int = 12):
+        self.dp_limit = dp_limit  # largest region ordered exactly
+        
+        self.regions = 0
+        self.dp_regions = 0
+        self.greedy_regions = 0
+    
+    # -------------------------------------------------------------------------
+    # Regions
+    # -------------------------------------------------------------------------
+    
+    def _regions(self, graph: IRGraph, base: List[IRNode],
+                 sizes: Dict[str, int]) -> List[List[IRNode]]:
+        """Split base order at positions every legal order shares"""
+        n = len(base)
+        position = {node.name: i for i, node in enumerate(base)}
+        outputs = set(graph.outputs)
+        
+        # Prefix sum of crossing at i > 0: some tensor produced before node i
+        # is read after it, so the boundary after node i is not a cut
+        crossing = [0] * (n + 1)
+        for name in sizes:
+            producers = graph.get_producers(name)
+            first = position[producers[0].name] if producers else -1
+            consumers = graph.get_consumers(name)
+            last = max((position[c.name] for c in consumers), default=first)
+            if name in outputs:
+                last = n
+            if last - first > 1:
+                crossing[first + 1] += 1
+                crossing[last] -= 1
+        
+        regions = [[]]
+        running = 0
+        for i, node in enumerate(base):
+            running += crossing[i]
+            regions[-1].append(node)
+            if i + 1 < n and running == 0:
+                regions.append([])
+        return [r for r in regions if r]
+    
+    # -------------------------------------------------------------------------
+    # Ordering
+    # -------------------------------------------------------------------------
+    
+    def order(self, graph: IRGraph, base: List[IRNode]) -> List[IRNode]:
+        """Memory-aware order of the nodes in base (a topological order)"""
+        sizes = _activation_sizes(graph)
+        outputs = set(graph.outputs)
+        self._remaining = {name: len(graph.get_consumers(name)) for name in sizes}
+        self._live = sum(sizes.get(name, 0) for name in dict.fromkeys(graph.inputs))
+        
+        result: List[IRNode] = []
+        for region in self._regions(graph, base, sizes):
+            self.regions += 1
+            if len(region) == 1:
+                ordered = region
+            elif len(region) <= self.dp_limit:
+                self.dp_regions += 1
+                ordered = self._dp_order(graph, region, sizes, outputs)
+            else:
+                self.greedy_regions += 1
+                ordered = self._greedy_order(graph, region, sizes, outputs)
+            
+            for node in ordered:
+                self._live += self._delta(node, sizes, outputs, self._remaining)
+                self._commit(node, sizes)
+            result.extend(ordered)
+        
+        return result
+    
+    def _delta(self, node: IRNode, sizes: Dict[str, int], outputs: Set[str],
+               remaining: Dict[str, int]) -> int:
+        """Change of live bytes once node has run"""
+        delta = 0
+        for out in dict.fromkeys(node.outputs):
+            if out in sizes and (remaining[out] > 0 or out in outputs):
+                delta += sizes[out]
+        for inp in dict.fromkeys(node.inputs):
+            if inp in sizes and remaining[inp] == 1 and inp not in outputs:
+                delta -= sizes[inp]
+        return delta
+    
+    def _commit(self, node: IRNode, sizes: Dict[str, int]):
+        for inp in dict.fromkeys(node.inputs):
+            if inp in sizes:
+                self._remaining[inp] -= 1
+    
+    def _produced(self, node: IRNode, sizes: Dict[str, int]) -> int:
+        return sum(sizes[out] for out in dict.fromkeys(node.outputs) if out in sizes)
+    
+    def _greedy_order(self, graph: IRGraph, region: List[IRNode],
+                      sizes: Dict[str, int], outputs: Set[str]) -> List[IRNode]:
+        """Repeatedly run the ready node with the smallest live-set growth"""
+        index = {node.name: i for i, node in enumerate(region)}
+        waiting = {node.name: len(self._region_preds(graph, node, index)) for node in region}
+        successors: Dict[str, List[IRNode]] = {node.name: [] for node in region}
+        for node in region:
+            for pred in self._region_preds(graph, node, index):
+                successors[pred].append(node)
+        
+        remaining = dict(self._remaining)
+        ready = [node for node in region if waiting[node.name] == 0]
+        ordered = []
+        while ready:
+            best = min(ready, key=lambda n: (self._delta(n, sizes, outputs, remaining),
+                                             self._produced(n, sizes), index[n.name]))
+            ready.remove(best)
+            ordered.append(best)
+            for inp in dict.fromkeys(best.inputs):
+                if inp in remaining:
+                    remaining[inp] -= 1
+            for succ in successors[best.name]:
+                waiting[succ.name] -= 1
+                if waiting[succ.name] == 0:
+                    ready.append(succ)
+        
+        return ordered
+    
+    def _region_preds(self, graph: IRGraph, node: IRNode,
+                      index: Dict[str, int]) -> Set[str]:
+        return {p.name for inp in node.inputs for p in graph.get_producers(inp)
+                if p.name in index}
+    
+    def _dp_order(self, graph: IRGraph, region: List[IRNode],
+                  sizes: Dict[str, int], outputs: Set[str]) -> List[IRNode]:
+        """Exact minimum-peak order of a small region (DP over scheduled subsets)"""
+        index = {node.name: i for i, node in enumerate(region)}
+        preds = [0] * len(region)
+        for i, node in enumerate(region):
+            for pred in self._region_preds(graph, node, index):
+                preds[i] |= 1 << index[pred]
+        
+        # Tensor -> bitmask of its unscheduled consumers inside the region
+        readers: Dict[str, int] = {}
+        for i, node in enumerate(region):
+            for inp in dict.fromkeys(node.inputs):
+                if inp in sizes:
+                    readers[inp] = readers.get(inp, 0) | (1 << i)
+        # Consumers outside the region keep a tensor alive regardless
+        pinned = {name for name, mask in readers.items()
+                  if self._remaining[name] > bin(mask).count('1')}
+        
+        produced = [self._produced(node, sizes) for node in region]
+        dead_outputs = [sum(sizes[out] for out in dict.fromkeys(node.outputs)
+                            if out in sizes and self._remaining[out] == 0
+                            and out not in outputs)
+                        for node in region]
+        
+        # mask -> (peak, live, previous mask, node index)
+        best: Dict[int, Tuple[int, int, int, int]] = {0: (self._live, self._live, -1, -1)}
+        frontier = [0]
+        for _ in range(len(region)):
+            next_frontier: Dict[int, None] = {}
+            for mask in frontier:
+                peak, live = best[mask][0], best[mask][1]
+                for i, node in enumerate(region):
+                    bit = 1 << i
+                    if mask & bit or preds[i] & ~mask:
+                        continue
+                    running = live + produced[i]
+                    new_mask = mask | bit
+                    
+                    freed = dead_outputs[i]
+                    for inp in dict.fromkeys(node.inputs):
+                        if (inp in readers and inp not in pinned and inp not in outputs
+                                and readers[inp] & ~new_mask == 0):
+                            freed += sizes[inp]
+                    
+                    entry = (max(peak, running), running - freed, mask, i)
+                    if new_mask not in best or entry[0] < best[new_mask][0]:
+                        best[new_mask] = entry
+                        next_frontier[new_mask] = None
+            frontier = list(next_frontier)
+        
+        # Walk back from the full set
+        ordered = []
+        mask = (1 << len(region)) - 1
+        while mask:
+            _, _, prev, i = best[mask]
+            ordered.append(region[i])
+            mask = prev
+        ordered.reverse()
+        return ordered
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get region statistics"""
+        return {
+            'regions': self.regions,
+            'dp_regions': self.dp_regions,
+            'greedy_regions': self.greedy_regions,
+        }
+
+
+def memory_aware_order(graph: IRGraph, base: Optional[List[IRNode]] = None,
+                       dp_limit: int = 12) -> List[IRNode]:
+    """
+    Convenience function returning a memory-aware topological order
+    
+    Args:
+        graph: IR graph
+        base: Starting topological order (default: graph.topological_sort())
+        dp_limit: Largest region ordered exactly
+    
+    Returns:
+        Node order that is never worse than base in activation_peak
+    """
+    if base is None:
+        base = graph.topological_sort()
+    order = MemoryAwareOrderer(dp_limit).order(graph, base)
+    if activation_peak(graph, order) < activation_peak(graph, base):
+        return order
+    return base
@@ -0,0 +1,164 @@
+"""
+EdgeNPU Compiler - Parallel Calibration
+Shard calibration batches across worker processes
+
+Constant tensors are written once to a float32 file (on /dev/shm when
+available) that every worker maps read-only through the WeightStore, so
+weights are shared page-for-page rather than pickled per worker. Workers
+receive the graph structure once, run the ReferenceExecutor over their
+shards and send back TensorStats, which the parent merges in submission
+order (so results do not depend on scheduling).
+"""
+
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from ..frontend.ir_builder import IRGraph, IRNode, IRTensor
+from ..frontend.weight_store import WeightStore
+from .calibration_stats import DEFAULT_BINS, TensorStats
+from .reference_executor import ReferenceExecutor
+
+# (offset, shape) of each constant in the shared file
+WeightLayout = Dict[str, Tuple[int, Tuple[int, ...]]]
+
+
+class SharedWeights:
+    """
+    Constant tensors of a graph packed into one memory-mappable float32 file
+    """
+    
+    def __init__(self, graph: IRGraph, directory: Optional[str] = None):
+        if directory is None and os.path.isdir('/dev/shm'):
+            directory = '/dev/shm'
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='npu_calib_', suffix='.bin')
+        
+        self.layout: WeightLayout = {}
+        offset = 0
+        with os.fdopen(fd, 'wb') as f:
+            for name, tensor in graph.tensors.items():
+                if tensor.data is None:
+                    continue
+                data = np.ascontiguousarray(tensor.data, dtype=np.float32)
+                f.write(memoryview(data.reshape(-1)).cast('B'))
+                self.layout[name] = (offset, tuple(data.shape))
+                offset += data.nbytes
+        self.nbytes = offset
+    
+    def close(self):
+        """Remove the backing file (existing mappings stay valid)"""
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+        self.path = None
+    
+    def __enter__(self) -> 'SharedWeights':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def graph_structure(graph: IRGraph) -> IRGraph:
+    """Copy of a graph's nodes and tensor shapes without any tensor data"""
+    tensors = {}
+    for name, tensor in graph.tensors.items():
+        tensors[name] = IRTensor(name=name, shape=tuple(tensor.shape),
+                                 dtype=tensor.dtype, layout=tensor.layout)
+    nodes = [IRNode(name=n.name, op_type=n.op_type, inputs=list(n.inputs),
+                    outputs=list(n.outputs), attrs=dict(n.attrs))
+             for n in graph.nodes]
+    return IRGraph(name=graph.name, nodes=nodes, tensors=tensors,
+                   inputs=list(graph.inputs), outputs=list(graph.outputs))
+
+
+# -----------------------------------------------------------------------------
+# Worker side (module-level so it pickles by reference)
+# -----------------------------------------------------------------------------
+
+_worker_executor: Optional[ReferenceExecutor] = None
+_worker_bins = DEFAULT_BINS
+
+
+def _init_worker(structure: IRGraph, path: str, layout: WeightLayout, bins: int):
+    global _worker_executor, _worker_bins
+    store = WeightStore(mode='r')
+    constants = {name: store.array(path, offset, np.float32, shape)
+                 for name, (offset, shape) in layout.items()}
+    _worker_executor = ReferenceExecutor(structure, constants=constants)
+    _worker_bins = bins
+
+
+def _run_shard(batches: List[np.ndarray]) -> Dict[str, TensorStats]:
+    stats: Dict[str, TensorStats] = {}
+    
+    def observe(name: str, value: np.ndarray):
+        entry = stats.get(name)
+        if entry is None:
+            entry = stats[name] = TensorStats(_worker_bins)
+        entry.update(value)
+    
+    _worker_executor.add_hook(observe)
+    try:
+        _worker_executor.run_batches(batches)
+    finally:
+        _worker_executor.remove_hook(observe)
+    return stats
+
+
+def _shards(batches: Iterable[np.ndarray], size: int) -> Iterator[List[np.ndarray]]:
+    shard = []
+    for batch in batches:
+        shard.append(batch)
+        if len(shard) == size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+class ParallelCalibrator:
+    """
+    Run calibration batches through a process pool and merge the statistics
+    """
+    
+    def __init__(self, graph: IRGraph, workers: Optional[int] = None,
+                 bins: int = DEFAULT_BINS, shard_batches: int = 4):
+        self.graph = graph
+        self.workers = workers or os.cpu_count() or 1
+        self.bins = bins
+        self.shard_batches = shard_batches
+        self.shards = 0
+    
+    def run(self, batches: Iterable[np.ndarray]) -> Dict[str, TensorStats]:
+        """
+        Calibrate over batches
+        
+        Returns:
+            Merged activation statistics by tensor name
+        """
+        merged: Dict[str, TensorStats] = {}
+        with SharedWeights(self.graph) as weights, ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(graph_structure(self.graph), weights.path,
+                          weights.layout, self.bins)) as pool:
+            # Bounded in-flight shards keep parent memory flat
+            pending = deque()
+            for shard in _shards(batches, self.shard_batches):
+                if len(pending) >= 2 * self.workers:
+                    self._merge(merged, pending.popleft().result())
+                pending.append(pool.submit(_run_shard, shard))
+                self.shards += 1
+            while pending:
+                self._merge(merged, pending.popleft().result())
+        return merged
+    
+    @staticmethod
+    def _merge(merged: Dict[str, TensorStats], stats: Dict[str, TensorStats]):
+        for name, entry in stats.items():
+            if name in merged:
+                merged[name].merge(entry)
+            else:
+                merged[name] = entry
@@ -4,10 +4,16 @@ Individual optimization transformations
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Set
+from typing import Dict, FrozenSet, List, Optional, Set
 import numpy as np
 
-from ..frontend.ir_builder import IRGraph, IRNode, IRTensor, IROpType, DataType
+from ..frontend.ir_builder import IRGraph, IRNode, IROpType, DataType
+from ..backend.cost_model import HardwareConfig
+
+from .analysis import ALL_ANALYSES, AnalysisManager, TopoOrderAnalysis
+from .memory_order import activation_peak, memory_aware_order
+from .rewrite import Const, Match, Op, RewriteContext, RewriteEngine, RewriteRule
+from .tile_search import TileSearch
 
 
 class OptimizationPass(ABC):
@@ -15,6 +21,15 @@ class OptimizationPass(ABC):
     
     name: str = "base_pass"
     
+    # Analyses (by name) still valid after this pass runs
+    preserves: FrozenSet[str] = frozenset()
+    
+    # Running again on an unchanged graph is a no-op
+    idempotent: bool = False
+    
+    # Shared analysis cache, set by the GraphOptimizer before run()
+    analyses: Optional[AnalysisManager] = None
+    
     @abstractmethod
     def run(self, graph: IRGraph) -> IRGraph:
         """Run optimization pass on graph"""
@@ -24,46 +39,44 @@ class OptimizationPass(ABC):
         return f"{self.__class__.__name__}()"
 
 
-class FuseConvBNPass(OptimizationPass):
+class RewritePass(OptimizationPass, RewriteRule):
+    """
+    Pass expressed as a pattern rewrite rule
+    Subclasses set `pattern` and implement `rewrite`
+    """
+    
+    # The engine runs to a fixed point
+    idempotent = True
+    
+    def __init__(self):
+        self.rewrites = 0
+    
+    def run(self, graph: IRGraph) -> IRGraph:
+        self.rewrites = RewriteEngine([self]).run(graph)
+        return graph
+
+
+class FuseConvBNPass(RewritePass):
     """Fuse Conv2D + BatchNorm into single Conv2D"""
     
     name = "fuse_conv_bn"
     
-    def run(self, graph: IRGraph) -> IRGraph:
-        nodes_to_remove = []
+    # Conv output must be used only by this BN
+    pattern = Op(IROpType.BATCH_NORM,
+                 Op([IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D],
+                    name='conv', single_use=True),
+                 name='bn')
+    
+    def rewrite(self, ctx: RewriteContext, match: Match) -> bool:
+        conv_node, bn_node = match['conv'], match['bn']
         
-        for node in graph.nodes:
-            if node.op_type != IROpType.BATCH_NORM:
-                continue
-            
-            # Find producer conv
-            bn_input = node.inputs[0]
-            producers = graph.get_producers(bn_input)
-            
-            if not producers:
-                continue
-                
-            conv_node = producers[0]
-            if conv_node.op_type not in [IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D]:
-                continue
-            
-            # Check if conv output is only used by this BN
-            consumers = graph.get_consumers(bn_input)
-            if len(consumers) != 1:
-                continue
-            
-            # Fuse BN into Conv
-            self._fuse_bn_into_conv(graph, conv_node, node)
-            
-            # Update conv output to BN output
-            conv_node.outputs = node.outputs
-            nodes_to_remove.append(node)
-        
-        # Remove fused BN nodes
-        for node in nodes_to_remove:
-            graph.nodes.remove(node)
+        # Fuse BN into Conv
+        self._fuse_bn_into_conv(ctx.graph, conv_node, bn_node)
         
-        return graph
+        # Update conv output to BN output
+        ctx.graph.rewire_node(conv_node, outputs=bn_node.outputs)
+        ctx.remove(bn_node)
+        return True
     
     def _fuse_bn_into_conv(self, graph: IRGraph, conv: IRNode, bn: IRNode):
         """Fuse batch norm parameters into conv weights"""
@@ -113,16 +126,16 @@ class FuseConvBNPass(OptimizationPass):
         else:
             # Create new bias tensor
             bias_name = f"{conv.name}_bias"
-            new_bias_tensor = IRTensor(
+            new_bias_tensor = type(weight_tensor)(
                 name=bias_name,
                 shape=new_bias.shape,
                 data=new_bias
             )
             graph.add_tensor(new_bias_tensor)
-            conv.inputs.append(bias_name)
+            graph.rewire_node(conv, inputs=conv.inputs + [bias_name])
 
 
-class FuseConvReluPass(OptimizationPass):
+class FuseConvReluPass(RewritePass):
     """Fuse Conv2D + ReLU into single Conv2D with activation"""
     
     name = "fuse_conv_relu"
@@ -134,81 +147,45 @@ class FuseConvReluPass(OptimizationPass):
         IROpType.TANH: 'tanh',
     }
     
-    def run(self, graph: IRGraph) -> IRGraph:
-        nodes_to_remove = []
-        
-        for node in graph.nodes:
-            if node.op_type not in self.FUSABLE_ACTIVATIONS:
-                continue
-            
-            # Find producer
-            act_input = node.inputs[0]
-            producers = graph.get_producers(act_input)
-            
-            if not producers:
-                continue
-            
-            producer = producers[0]
-            if producer.op_type not in [IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D, 
-                                         IROpType.FULLY_CONNECTED]:
-                continue
-            
-            # Check if producer output is only used by this activation
-            consumers = graph.get_consumers(act_input)
-            if len(consumers) != 1:
-                continue
-            
-            # Check if producer already has activation
-            if producer.get_attr('activation'):
-                continue
-            
-            # Fuse activation into producer
-            producer.set_attr('activation', self.FUSABLE_ACTIVATIONS[node.op_type])
-            producer.outputs = node.outputs
-            
-            nodes_to_remove.append(node)
-        
-        # Remove fused activation nodes
-        for node in nodes_to_remove:
-            graph.nodes.remove(node)
-        
-        return graph
+    # Producer output must be used only by this activation
+    pattern = Op(list(FUSABLE_ACTIVATIONS),
+                 Op([IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D,
+                     IROpType.FULLY_CONNECTED],
+                    name='producer', single_use=True),
+                 name='act')
+    
+    def rewrite(self, ctx: RewriteContext, match: Match) -> bool:
+        producer, act_node = match['producer'], match['act']
+        
+        # Check if producer already has activation
+        if producer.get_attr('activation'):
+            return False
+        
+        # Fuse activation into producer
+        producer.set_attr('activation', self.FUSABLE_ACTIVATIONS[act_node.op_type])
+        ctx.graph.rewire_node(producer, outputs=act_node.outputs)
+        ctx.remove(act_node)
+        return True
 
 
-class ConstantFoldingPass(OptimizationPass):
+class ConstantFoldingPass(RewritePass):
     """Fold constant expressions at compile time"""
     
     name = "constant_folding"
     
-    def run(self, graph: IRGraph) -> IRGraph:
-        changed = True
-        
-        while changed:
-            changed = False
-            
-            for node in graph.nodes:
-                if self._can_fold(graph, node):
-                    self._fold_node(graph, node)
-                    changed = True
-                    break
-        
-        return graph
+    FOLDABLE_OPS = {
+        IROpType.ADD, IROpType.SUB, IROpType.MUL, IROpType.DIV,
+        IROpType.RESHAPE, IROpType.TRANSPOSE,
+    }
     
-    def _can_fold(self, graph: IRGraph, node: IRNode) -> bool:
-        """Check if node can be constant folded"""
-        # All inputs must be constants
-        for inp in node.inputs:
-            tensor = graph.get_tensor(inp)
-            if tensor is None or tensor.data is None:
-                return False
-        
-        # Must be a foldable operation
-        foldable_ops = {
-            IROpType.ADD, IROpType.SUB, IROpType.MUL, IROpType.DIV,
-            IROpType.RESHAPE, IROpType.TRANSPOSE,
-        }
-        
-        return node.op_type in foldable_ops
+    # Foldable op whose inputs are all constants
+    pattern = Op(FOLDABLE_OPS, name='node', all_inputs=Const())
+    
+    def rewrite(self, ctx: RewriteContext, match: Match) -> bool:
+        node = match['node']
+        self._fold_node(ctx.graph, node)
+        ctx.remove(node)
+        return True
     
     def _fold_node(self, graph: IRGraph, node: IRNode):
         """Fold constant node"""
@@ -237,44 +214,40 @@ class ConstantFoldingPass(OptimizationPass):
         if output_tensor:
             output_tensor.data = result
             output_tensor.shape = tuple(result.shape)
-        
-        # Remove node from graph
-        graph.nodes.remove(node)
 
 
 class DeadCodeEliminationPass(OptimizationPass):
-    """Remove unused nodes and tensors"""
+    """Remove unused nodes and tensors (including orphaned constants)"""
     
     name = "dead_code_elimination"
+    idempotent = True
     
     def run(self, graph: IRGraph) -> IRGraph:
         # Find all tensors that are used
         used_tensors: Set[str] = set(graph.outputs)
         
-        # Backward pass to find all required tensors
-        changed = True
-        while changed:
-            changed = False
-            for node in graph.nodes:
-                # If any output is used, all inputs are used
-                if any(out in used_tensors for out in node.outputs):
-                    for inp in node.inputs:
-                        if inp not in used_tensors:
-                            used_tensors.add(inp)
-                            changed = True
+        if self.analyses is not None:
+            sorted_nodes = self.analyses.get(TopoOrderAnalysis, graph)
+        else:
+            sorted_nodes = graph.topological_sort()
+        
+        # Single reverse-topological sweep: every consumer of a node's
+        # outputs is visited before the node itself
+        dead_nodes = []
+        for node in reversed(sorted_nodes):
+            # If any output is used, all inputs are used
+            if any(out in used_tensors for out in node.outputs):
+                used_tensors.update(node.inputs)
+            else:
+                dead_nodes.append(node)
         
         # Add graph inputs
         used_tensors.update(graph.inputs)
         
         # Remove unused nodes
-        nodes_to_keep = []
-        for node in graph.nodes:
-            if any(out in used_tensors for out in node.outputs):
-                nodes_to_keep.append(node)
-        
-        graph.nodes = nodes_to_keep
+        graph.remove_nodes(dead_nodes)
         
-        # Remove unused tensors
+        # Remove unused tensors, e.g. BN parameters left behind by fusion
         tensors_to_remove = [name for name in graph.tensors if name not in used_tensors]
         for name in tensors_to_remove:
             del graph.tensors[name]
@@ -282,10 +255,52 @@ class DeadCodeEliminationPass(OptimizationPass):
         return graph
 
 
+class MemoryOrderingPass(OptimizationPass):
+    """
+    Reorder nodes to minimize peak activation memory
+    
+    graph.nodes is rewritten in the chosen topological order, so every
+    later consumer of the topological order (memory allocator, scheduler,
+    instruction emission) follows it.
+    """
+    
+    name = "memory_ordering"
+    preserves = frozenset({'use_def', 'shapes', 'macs'})  # same nodes, new order
+    idempotent = True
+    
+    def __init__(self, dp_limit: int = 12):
+        self.dp_limit = dp_limit
+        self.peak_before = 0
+        self.peak_after = 0
+    
+    def run(self, graph: IRGraph) -> IRGraph:
+        if self.analyses is not None:
+            base = self.analyses.get(TopoOrderAnalysis, graph)
+        else:
+            base = graph.topological_sort()
+        
+        order = memory_aware_order(graph, base, self.dp_limit)
+        self.peak_before = activation_peak(graph, base)
+        self.peak_after = activation_peak(graph, order)
+        
+        if order is not base:
+            graph.reorder_nodes(order)
+        return graph
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Peak activation bytes before and after reordering"""
+        return {
+            'peak_before': self.peak_before,
+            'peak_after': self.peak_after,
+            'peak_reduction': self.peak_before - self.peak_after,
+        }
+
+
 class LayoutOptimizationPass(OptimizationPass):
     """Optimize tensor layouts for NPU"""
     
     name = "layout_optimization"
+    preserves = ALL_ANALYSES  # only sets attributes
     
     def run(self, graph: IRGraph) -> IRGraph:
         # NPU prefers NHWC layout for activations
@@ -317,23 +332,40 @@ class TilingPass(OptimizationPass):
     """Compute optimal tiling for NPU execution"""
     
     name = "tiling"
+    preserves = ALL_ANALYSES  # only sets tile configs
     
     def __init__(self, pe_rows: int = 16, pe_cols: int = 16,
-                 weight_buf_kb: int = 256, act_buf_kb: int = 256):
+                 weight_buf_kb: int = 256, act_buf_kb: int = 256,
+                 hardware: Optional[HardwareConfig] = None):
         self.pe_rows = pe_rows
         self.pe_cols = pe_cols
         self.weight_buf_size = weight_buf_kb * 1024
         self.act_buf_size = act_buf_kb * 1024
+        if hardware is None:
+            hardware = HardwareConfig(pe_rows=pe_rows, pe_cols=pe_cols)
+        self.search = TileSearch(hardware, weight_buf_kb, act_buf_kb)
     
     def run(self, graph: IRGraph) -> IRGraph:
         for node in graph.nodes:
-            if node.op_type in [IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D]:
+            config = None
+            if node.op_type == IROpType.CONV2D and node.get_attr('groups', 1) == 1:
+                config = self.search.search_conv(graph, node)
+            elif node.op_type == IROpType.FULLY_CONNECTED:
+                config = self.search.search_fc(graph, node)
+            if config is not None:
+                node.tile_config = config
+            elif node.op_type in [IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D]:
+                # Depthwise / grouped or nothing fits: one PE array per tile
                 self._compute_conv_tiling(graph, node)
             elif node.op_type == IROpType.FULLY_CONNECTED:
                 self._compute_fc_tiling(graph, node)
         
         return graph
     
+    def get_stats(self) -> Dict:
+        """Get tile search statistics"""
+        return self.search.get_stats()
+    
     def _compute_conv_tiling(self, graph: IRGraph, node: IRNode):
         """Compute tiling for convolution"""
         weight_tensor = graph.get_tensor(node.inputs[1])
@@ -3,11 +3,19 @@ EdgeNPU Compiler - Quantizer
 Post-training quantization for INT8 inference
 """
 
-from typing import List, Dict, Optional, Tuple, Callable
+from typing import Iterator, List, Dict, Optional, Tuple, Callable, Union
 from dataclasses import dataclass, field
+import hashlib
 import numpy as np
 
 from ..frontend.ir_builder import IRGraph, IRNode, IRTensor, IROpType, DataType
+from ..frontend.weight_store import array_digest
+from ..profiler import profile_stage
+from .calibration_cache import CalibrationCache
+from .calibration_dataset import StreamingDataset
+from .calibration_stats import DEFAULT_BINS, TensorStats
+from .parallel_calibration import ParallelCalibrator
+from .reference_executor import ReferenceExecutor
 
 
 @dataclass
@@ -21,13 +29,21 @@ class CalibrationData:
         self.input_data.append(data)
         self.num_samples += 1
     
+    def iter_batches(self, batch_size: int = 32) -> Iterator[np.ndarray]:
+        """Yield batches one at a time"""
+        for i in range(0, len(self.input_data), batch_size):
+            yield np.stack(self.input_data[i:i+batch_size])
+    
     def get_batched(self, batch_size: int = 32) -> List[np.ndarray]:
         """Get data in batches"""
-        batches = []
-        for i in range(0, len(self.input_data), batch_size):
-            batch = np.stack(self.input_data[i:i+batch_size])
-            batches.append(batch)
-        return batches
+        return list(self.iter_batches(batch_size))
+    
+    def fingerprint(self) -> str:
+        """Content hash of the samples (calibration cache key)"""
+        h = hashlib.sha256()
+        for sample in self.input_data:
+            h.update(array_digest(sample).encode('utf-8'))
+        return h.hexdigest()
 
 
 @dataclass
@@ -45,6 +61,8 @@ class QuantizationConfig:
     # Calibration
     calibration_method: str = "minmax"  # minmax, percentile, entropy
     percentile: float = 99.99
+    histogram_bins: int = DEFAULT_BINS
+    calibration_workers: int = 1  # > 1: shard batches over worker processes
     
     # Ops to quantize
     quantize_ops: List[IROpType] = field(default_factory=lambda: [
@@ -60,70 +78,111 @@ class Quantizer:
     Converts float32 model to int8
     """
     
-    def __init__(self, config: Optional[QuantizationConfig] = None):
+    def __init__(self, config: Optional[QuantizationConfig] = None,
+                 cache_dir: Optional[str] = None):
         self.config = config or QuantizationConfig()
-        self.calibration_stats: Dict[str, Dict] = {}
+        self.calibration_stats: Dict[str, TensorStats] = {}
         self.scale_map: Dict[str, float] = {}
         self.zero_point_map: Dict[str, int] = {}
+        
+        # Quantized weights of the last quantize() call, keyed by content,
+        # so recompiling a mostly unchanged model only requantizes new layers
+        self._weight_cache: Dict[Tuple, Tuple] = {}
+        
+        # Raw activation statistics persisted across runs, off by default
+        self.stats_cache = CalibrationCache(cache_dir) if cache_dir is not None else None
     
-    def calibrate(self, graph: IRGraph, calibration_data: CalibrationData,
-                  forward_fn: Optional[Callable] = None):
+    def calibrate(self, graph: IRGraph,
+                  calibration_data: Union[CalibrationData, StreamingDataset],
+                  forward_fn: Optional[Callable] = None, batch_size: int = 32):
         """
         Calibrate quantization parameters using calibration data
         
         Args:
-            graph: IR graph to calibrate
-            calibration_data: Calibration dataset
-            forward_fn: Optional forward function for inference
+            graph: IR graph to calibrate (float, before quantize())
+            calibration_data: Calibration samples in memory, or a
+                StreamingDataset reading them from disk
+            forward_fn: Optional forward function mapping an input batch to
+                {tensor_name: activation}; defaults to the ReferenceExecutor
+                (results of a forward_fn are not cached)
+            batch_size: Samples per inference batch
         """
         print(f"Calibrating with {calibration_data.num_samples} samples...")
         
-        # Initialize stats for each tensor
-        for name, tensor in graph.tensors.items():
-            self.calibration_stats[name] = {
-                'min': float('inf'),
-                'max': float('-inf'),
-                'values': [],
-            }
+        with profile_stage('calibrate', graph, samples=calibration_data.num_samples):
+            key = None
+            if self.stats_cache is not None and forward_fn is None:
+                key = self.stats_cache.make_key(graph, calibration_data,
+                                                self.config.histogram_bins, batch_size)
+            cached = self.stats_cache.get(key) if key is not None else None
+            if cached is not None:
+                print("Using cached calibration statistics")
+                for name in self._activations(graph):
+                    self.calibration_stats[name] = cached.get(name) or TensorStats(
+                        self.config.histogram_bins)
+                self._compute_quant_params()
+                return
+            
+            self._calibrate(graph, calibration_data, forward_fn, batch_size)
+            if key is not None:
+                self.stats_cache.put(key, self.calibration_stats)
+    
+    def _calibrate(self, graph: IRGraph,
+                   calibration_data: Union[CalibrationData, StreamingDataset],
+                   forward_fn: Optional[Callable], batch_size: int):
+        # Initialize stats for each activation (weights are quantized
+        # from their own data in quantize())
+        for name in self._activations(graph):
+            self.calibration_stats[name] = TensorStats(self.config.histogram_bins)
         
-        # Collect activation statistics
-        # In a real implementation, this would run inference
-        # For now, we'll use the tensor data if available
-        for name, tensor in graph.tensors.items():
-            if tensor.data is not None:
-                data = tensor.data.flatten()
-                self.calibration_stats[name]['min'] = min(
-                    self.calibration_stats[name]['min'],
-                    float(np.min(data))
-                )
-                self.calibration_stats[name]['max'] = max(
-                    self.calibration_stats[name]['max'],
-                    float(np.max(data))
-                )
-                self.calibration_stats[name]['values'].extend(
-                    data[:1000].tolist()  # Sample for histogram
-                )
+        # Run inference batch by batch
+        batches = calibration_data.iter_batches(batch_size)
+        workers = self.config.calibration_workers
+        if workers > 1:
+            if forward_fn is not None:
+                raise ValueError("Parallel calibration runs the reference executor; "
+                                 "forward_fn requires calibration_workers=1")
+            calibrator = ParallelCalibrator(graph, workers, self.config.histogram_bins)
+            for name, stats in calibrator.run(batches).items():
+                if name in self.calibration_stats:
+                    self.calibration_stats[name].merge(stats)
+        elif forward_fn is None:
+            executor = ReferenceExecutor(graph)
+            executor.add_hook(self._observe)
+            executor.run_batches(batches)
+        else:
+            for batch in batches:
+                for name, value in forward_fn(batch).items():
+                    self._observe(name, value)
         
         # Compute quantization parameters
         self._compute_quant_params()
     
+    @staticmethod
+    def _activations(graph: IRGraph) -> List[str]:
+        """Names of the non-constant tensors"""
+        return [name for name, tensor in graph.tensors.items() if tensor.data is None]
+    
+    def _observe(self, name: str, value: np.ndarray):
+        """Fold one tensor value (a batch of activations or a constant) into its stats"""
+        stats = self.calibration_stats.get(name)
+        if stats is not None:
+            stats.update(value)
+    
     def _compute_quant_params(self):
         """Compute scale and zero point for each tensor"""
         for name, stats in self.calibration_stats.items():
-            if stats['min'] == float('inf'):
+            if stats.empty:
                 # No data collected, use defaults
                 self.scale_map[name] = 1.0
                 self.zero_point_map[name] = 0
                 continue
             
-            min_val = stats['min']
-            max_val = stats['max']
-            
-            if self.config.calibration_method == 'percentile':
-                values = np.array(stats['values'])
-                if len(values) > 0:
-                    min_val = np.percentile(values, 100 - self.config.percentile)
-                    max_val = np.percentile(values, self.config.percentile)
+            levels = None
+            if self.config.symmetric_activations:
+                levels = 128
+            min_val, max_val = stats.quant_range(self.config.calibration_method,
+                                                 self.config.percentile, levels)
             
             # Compute scale and zero point
             if self.config.symmetric_activations:
@@ -152,12 +211,18 @@ class Quantizer:
         """
         print("Quantizing graph...")
         
+        with profile_stage('quantize', graph):
+            return self._quantize_graph(graph)
+    
+    def _quantize_graph(self, graph: IRGraph) -> IRGraph:
         # Quantize weights
+        weight_cache: Dict[Tuple, Tuple] = {}
         for node in graph.nodes:
             if node.op_type not in self.config.quantize_ops:
                 continue
             
-            self._quantize_node_weights(graph, node)
+            self._quantize_node_weights(graph, node, weight_cache)
+        self._weight_cache = weight_cache
         
         # Update tensor dtypes
         for name, tensor in graph.tensors.items():
@@ -175,7 +240,8 @@ class Quantizer:
         
         return graph
     
-    def _quantize_node_weights(self, graph: IRGraph, node: IRNode):
+    def _quantize_node_weights(self, graph: IRGraph, node: IRNode,
+                               weight_cache: Optional[Dict[Tuple, Tuple]] = None):
         """Quantize weights for a node"""
         if len(node.inputs) < 2:
             return
@@ -188,6 +254,42 @@ class Quantizer:
         
         weight_data = weight_tensor.data
         
+        bias_tensor = None
+        if len(node.inputs) > 2:
+            bias_tensor = graph.get_tensor(node.inputs[2])
+            if bias_tensor is not None and bias_tensor.data is None:
+                bias_tensor = None
+        
+        key = (
+            array_digest(weight_data),
+            array_digest(bias_tensor.data) if bias_tensor is not None else None,
+            self.config.per_channel_weights,
+            self.config.symmetric_weights,
+        )
+        cached = self._weight_cache.get(key)
+        if cached is None:
+            cached = self._quantize_weights(weight_data,
+                                            bias_tensor.data if bias_tensor is not None else None)
+        if weight_cache is not None:
+            weight_cache[key] = cached
+        quantized, scales, zero_points, quantized_bias = cached
+        
+        weight_tensor.data = quantized
+        weight_tensor.dtype = self.config.weight_dtype
+        weight_tensor.is_quantized = True
+        
+        # Store per-channel scales if needed
+        node.set_attr('weight_scales', list(scales))
+        node.set_attr('weight_zero_points', list(zero_points))
+        
+        # Quantize bias if present
+        if quantized_bias is not None:
+            bias_tensor.data = quantized_bias
+            bias_tensor.dtype = DataType.INT32
+    
+    def _quantize_weights(self, weight_data: np.ndarray,
+                          bias_data: Optional[np.ndarray]) -> Tuple:
+        """Quantize weight (and bias) data, return (weights, scales, zero_points, bias)"""
         if self.config.per_channel_weights:
             # Per-channel quantization
             quantized, scales, zero_points = self._quantize_per_channel(
@@ -199,28 +301,14 @@ class Quantizer:
             scales = [scale]
             zero_points = [zero_point]
         
-        weight_tensor.data = quantized
-        weight_tensor.dtype = self.config.weight_dtype
-        weight_tensor.is_quantized = True
+        quantized_bias = None
+        if bias_data is not None:
+            # Bias is quantized with input_scale * weight_scale
+            # For simplicity, use int32 for bias
+            bias_scale = scales[0] if len(scales) == 1 else np.mean(scales)
+            quantized_bias = np.round(bias_data / bias_scale).astype(np.int32)
         
-        # Store per-channel scales if needed
-        node.set_attr('weight_scales', scales)
-        node.set_attr('weight_zero_points', zero_points)
-        
-        # Quantize bias if present
-        if len(node.inputs) > 2:
-            bias_name = node.inputs[2]
-            bias_tensor = graph.get_tensor(bias_name)
-            
-            if bias_tensor and bias_tensor.data is not None:
-                # Bias is quantized with input_scale * weight_scale
-                # For simplicity, use int32 for bias
-                bias_data = bias_tensor.data
-                bias_scale = scales[0] if len(scales) == 1 else np.mean(scales)
-                
-                quantized_bias = np.round(bias_data / bias_scale).astype(np.int32)
-                bias_tensor.data = quantized_bias
-                bias_tensor.dtype = DataType.INT32
+        return quantized, scales, zero_points, quantized_bias
     
     def _quantize_tensor(self, data: np.ndarray) -> Tuple[np.ndarray, float, int]:
         """Quantize tensor with per-tensor scale"""
@@ -275,8 +363,9 @@ class Quantizer:
 
 
 def quantize_graph(graph: IRGraph, 
-                   calibration_data: Optional[CalibrationData] = None,
-                   config: Optional[QuantizationConfig] = None) -> IRGraph:
+                   calibration_data: Optional[Union[CalibrationData, StreamingDataset]] = None,
+                   config: Optional[QuantizationConfig] = None,
+                   cache_dir: Optional[str] = None) -> IRGraph:
     """
     Convenience function to quantize a graph
     
@@ -284,11 +373,12 @@ def quantize_graph(graph: IRGraph,
         graph: Float32 IR graph
         calibration_data: Optional calibration data
         config: Quantization configuration
+        cache_dir: Optional directory caching calibration statistics
         
     Returns:
         Quantized graph
     """
-    quantizer = Quantizer(config)
+    quantizer = Quantizer(config, cache_dir)
     
     if calibration_data:
         quantizer.calibrate(graph, calibration_data)
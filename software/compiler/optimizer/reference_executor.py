@@ -0,0 +1,323 @@
+"""
+EdgeNPU Compiler - Reference Executor
+Batched float32 NumPy execution of an IRGraph
+
+Runs the float graph (before quantize()) on host, vectorized across the
+batch dimension: convolutions lower to im2col + one GEMM per group,
+depthwise convs accumulate one shifted multiply per kernel tap. Hooks see
+every activation as it is produced, which is how the quantizer collects
+calibration statistics.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+
+# hook(tensor_name, value) called for graph inputs and every node output
+ActivationHook = Callable[[str, np.ndarray], None]
+
+# Upper bound on one im2col buffer; larger batches are run in slices
+IM2COL_BYTES = 64 * 1024 * 1024
+
+
+def _pair(value, default: Tuple[int, int]) -> Tuple[int, int]:
+    if value is None:
+        return default
+    if isinstance(value, (int, np.integer)):
+        return int(value), int(value)
+    return int(value[0]), int(value[-1])
+
+
+def _apply_activation(x: np.ndarray, activation: Optional[str]) -> np.ndarray:
+    """Apply a fused activation attribute"""
+    if activation == 'relu':
+        return np.maximum(x, 0, out=x)
+    if activation == 'relu6':
+        return np.clip(x, 0, 6, out=x)
+    if activation == 'sigmoid':
+        return 1.0 / (1.0 + np.exp(-x))
+    if activation == 'tanh':
+        return np.tanh(x)
+    return x
+
+
+class ReferenceExecutor:
+    """
+    Batched NumPy interpreter for IR graphs
+    """
+    
+    def __init__(self, graph: IRGraph, im2col_bytes: int = IM2COL_BYTES,
+                 constants: Optional[Dict[str, np.ndarray]] = None):
+        self.graph = graph
+        self.im2col_bytes = im2col_bytes
+        self.hooks: List[ActivationHook] = []
+        
+        self.order = graph.topological_sort()
+        # float32 constant data by tensor name (filled lazily from the graph)
+        self.constants: Dict[str, np.ndarray] = dict(constants or {})
+        
+        # Index of the last node reading each activation (freed after it)
+        self.last_use: Dict[str, int] = {}
+        for index, node in enumerate(self.order):
+            for name in node.inputs:
+                self.last_use[name] = index
+        
+        self.batches = 0
+        self.samples = 0
+    
+    def add_hook(self, hook: ActivationHook):
+        """Call hook(tensor_name, value) for every activation produced"""
+        self.hooks.append(hook)
+    
+    def remove_hook(self, hook: ActivationHook):
+        """Stop calling a hook"""
+        self.hooks.remove(hook)
+    
+    def _constant(self, name: str) -> Optional[np.ndarray]:
+        value = self.constants.get(name)
+        if value is None:
+            tensor = self.graph.get_tensor(name)
+            if tensor is None or tensor.data is None:
+                return None
+            value = self.constants[name] = np.asarray(tensor.data, dtype=np.float32)
+        return value
+    
+    def _emit(self, name: str, value: np.ndarray):
+        for hook in self.hooks:
+            hook(name, value)
+    
+    def run(self, inputs: Union[np.ndarray, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        Execute the graph on one batch
+        
+        Args:
+            inputs: Batch for the single graph input, or arrays by input name
+        
+        Returns:
+            Graph outputs by tensor name
+        """
+        if not isinstance(inputs, dict):
+            if len(self.graph.inputs) != 1:
+                raise ValueError(f"Graph has {len(self.graph.inputs)} inputs; "
+                                 f"pass a dict of arrays by input name")
+            inputs = {self.graph.inputs[0]: inputs}
+        
+        values: Dict[str, np.ndarray] = {}
+        batch = None
+        for name in self.graph.inputs:
+            if name not in inputs:
+                raise ValueError(f"Missing graph input: {name}")
+            tensor = self.graph.get_tensor(name)
+            value = np.asarray(inputs[name], dtype=np.float32)
+            if tensor is not None and len(tensor.shape) > 1:
+                # Samples may be stacked with or without their own batch axis
+                value = value.reshape((-1,) + tuple(tensor.shape[1:]))
+            values[name] = value
+            batch = len(value)
+            self._emit(name, value)
+        
+        keep = set(self.graph.outputs)
+        for index, node in enumerate(self.order):
+            args = []
+            for name in node.inputs:
+                value = values.get(name)
+                if value is None:
+                    value = self._constant(name)
+                args.append(value)
+            
+            results = self._execute(node, args)
+            for name, value in zip(node.outputs, results):
+                values[name] = value
+                self._emit(name, value)
+            
+            for name in node.inputs:
+                if self.last_use.get(name) == index and name not in keep:
+                    values.pop(name, None)
+        
+        self.batches += 1
+        self.samples += batch or 0
+        return {name: values[name] for name in self.graph.outputs if name in values}
+    
+    def run_batches(self, batches: Iterable) -> int:
+        """Stream batches through the graph (hooks collect the results); returns samples run"""
+        start = self.samples
+        for batch in batches:
+            self.run(batch)
+        return self.samples - start
+    
+    # -------------------------------------------------------------------------
+    # Operators
+    # -------------------------------------------------------------------------
+    
+    def _execute(self, node: IRNode, args: List[np.ndarray]) -> List[np.ndarray]:
+        op = node.op_type
+        x = args[0] if args else None
+        
+        if op in (IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D):
+            out = self._conv2d(node, x, args[1], args[2] if len(args) > 2 else None)
+            return [_apply_activation(out, node.get_attr('activation'))]
+        if op == IROpType.FULLY_CONNECTED:
+            out = x.reshape(len(x), -1) @ args[1].reshape(len(args[1]), -1).T
+            if len(args) > 2 and args[2] is not None:
+                out += args[2]
+            return [_apply_activation(out, node.get_attr('activation'))]
+        if op == IROpType.MATMUL:
+            return [np.matmul(x, args[1])]
+        
+        if op == IROpType.RELU:
+            return [np.maximum(x, 0)]
+        if op == IROpType.RELU6:
+            return [np.clip(x, 0, 6)]
+        if op == IROpType.SIGMOID:
+            return [1.0 / (1.0 + np.exp(-x))]
+        if op == IROpType.TANH:
+            return [np.tanh(x)]
+        if op == IROpType.LEAKY_RELU:
+            alpha = node.get_attr('alpha', 0.01)
+            return [np.where(x > 0, x, x * alpha)]
+        if op == IROpType.SWISH:
+            return [x / (1.0 + np.exp(-x))]
+        if op == IROpType.GELU:
+            inner = np.sqrt(2.0 / np.pi) * (x + 0.044715 * x ** 3)
+            return [0.5 * x * (1.0 + np.tanh(inner))]
+        if op == IROpType.SOFTMAX:
+            axis = node.get_attr('axis', -1)
+            shifted = np.exp(x - x.max(axis=axis, keepdims=True))
+            return [shifted / shifted.sum(axis=axis, keepdims=True)]
+        
+        if op in (IROpType.MAX_POOL2D, IROpType.AVG_POOL2D):
+            return [self._pool2d(node, x)]
+        if op == IROpType.GLOBAL_AVG_POOL:
+            return [x.mean(axis=(2, 3), keepdims=True)]
+        
+        if op == IROpType.ADD:
+            return [args[0] + args[1]]
+        if op == IROpType.SUB:
+            return [args[0] - args[1]]
+        if op == IROpType.MUL:
+            return [args[0] * args[1]]
+        if op == IROpType.DIV:
+            return [args[0] / args[1]]
+        
+        if op == IROpType.BATCH_NORM:
+            return [self._batch_norm(node, x, args[1:5])]
+        if op == IROpType.LAYER_NORM:
+            eps = node.get_attr('epsilon', 1e-5)
+            out = (x - x.mean(axis=-1, keepdims=True)) / np.sqrt(x.var(axis=-1, keepdims=True) + eps)
+            if len(args) > 1 and args[1] is not None:
+                out = out * args[1]
+            if len(args) > 2 and args[2] is not None:
+                out = out + args[2]
+            return [out]
+        
+        if op == IROpType.RESHAPE:
+            shape = tuple(node.get_attr('shape', (-1,)))
+            # Leading dim of the recorded shape is the batch
+            return [x.reshape((len(x),) + shape[1:] if len(shape) > 1 else (len(x), -1))]
+        if op == IROpType.TRANSPOSE:
+            return [np.transpose(x, node.get_attr('perm'))]
+        if op == IROpType.CONCAT:
+            return [np.concatenate(args, axis=node.get_attr('axis', 1))]
+        if op == IROpType.SPLIT:
+            return self._split(node, x)
+        if op == IROpType.PAD:
+            return [self._pad(node, x)]
+        if op in (IROpType.INPUT, IROpType.OUTPUT):
+            return [x]
+        if op == IROpType.CONSTANT:
+            return [self._constant(node.outputs[0])]
+        
+        raise NotImplementedError(f"Reference executor has no kernel for {op.name} ({node.name})")
+    
+    def _conv2d(self, node: IRNode, x: np.ndarray, weight: np.ndarray,
+                bias: Optional[np.ndarray]) -> np.ndarray:
+        """Grouped conv as im2col + batched GEMM; depthwise as per-tap accumulation"""
+        out_ch, group_ch, kh, kw = weight.shape
+        sh, sw = _pair(node.get_attr('stride'), (1, 1))
+        ph, pw = _pair(node.get_attr('padding'), (0, 0))
+        groups = node.get_attr('groups', 1)
+        batch, in_ch = x.shape[:2]
+        
+        if ph or pw:
+            x = np.pad(x, ((0, 0), (0, 0), (ph, ph), (pw, pw)))
+        out_h = (x.shape[2] - kh) // sh + 1
+        out_w = (x.shape[3] - kw) // sw + 1
+        
+        if groups == in_ch == out_ch and group_ch == 1:
+            out = np.zeros((batch, out_ch, out_h, out_w), dtype=np.float32)
+            for i in range(kh):
+                for j in range(kw):
+                    patch = x[:, :, i:i + sh * (out_h - 1) + 1:sh, j:j + sw * (out_w - 1) + 1:sw]
+                    out += patch * weight[:, 0, i, j][None, :, None, None]
+        else:
+            out_per_group = out_ch // groups
+            # (groups, K, out_per_group) with K ordered (channel, kh, kw)
+            w = weight.reshape(groups, out_per_group, -1).transpose(0, 2, 1)
+            k = group_ch * kh * kw
+            step = max(1, self.im2col_bytes // max(k * out_h * out_w * groups * 4, 1))
+            
+            out = np.empty((batch, out_ch, out_h, out_w), dtype=np.float32)
+            for start in range(0, batch, step):
+                xs = x[start:start + step]
+                windows = sliding_window_view(xs, (kh, kw), axis=(2, 3))[:, :, ::sh, ::sw]
+                windows = windows[:, :, :out_h, :out_w]
+                # (b, groups, out_h * out_w, K) im2col matrix
+                cols = windows.reshape(len(xs), groups, group_ch, out_h, out_w, kh, kw)
+                cols = cols.transpose(0, 1, 3, 4, 2, 5, 6).reshape(len(xs), groups, out_h * out_w, k)
+                result = np.matmul(cols, w)  # (b, groups, out_h * out_w, out_per_group)
+                out[start:start + step] = result.transpose(0, 1, 3, 2).reshape(
+                    len(xs), out_ch, out_h, out_w)
+        
+        if bias is not None:
+            out += bias.reshape(1, -1, 1, 1)
+        return out
+    
+    def _pool2d(self, node: IRNode, x: np.ndarray) -> np.ndarray:
+        kh, kw = _pair(node.get_attr('kernel_size'), (2, 2))
+        sh, sw = _pair(node.get_attr('stride'), (kh, kw))
+        ph, pw = _pair(node.get_attr('padding'), (0, 0))
+        is_max = node.op_type == IROpType.MAX_POOL2D
+        
+        if ph or pw:
+            x = np.pad(x, ((0, 0), (0, 0), (ph, ph), (pw, pw)),
+                       constant_values=-np.inf if is_max else 0)
+        windows = sliding_window_view(x, (kh, kw), axis=(2, 3))[:, :, ::sh, ::sw]
+        return windows.max(axis=(4, 5)) if is_max else windows.mean(axis=(4, 5))
+    
+    def _batch_norm(self, node: IRNode, x: np.ndarray, params: List[np.ndarray]) -> np.ndarray:
+        gamma, beta, mean, var = params
+        eps = node.get_attr('epsilon', 1e-5)
+        shape = (1, -1) + (1,) * (x.ndim - 2)
+        scale = gamma / np.sqrt(var + eps)
+        return x * scale.reshape(shape) + (beta - mean * scale).reshape(shape)
+    
+    def _split(self, node: IRNode, x: np.ndarray) -> List[np.ndarray]:
+        axis = node.get_attr('axis', 0)
+        sizes = node.get_attr('split')
+        if sizes:
+            return np.split(x, np.cumsum(sizes)[:-1], axis=axis)
+        return np.array_split(x, len(node.outputs), axis=axis)
+    
+    def _pad(self, node: IRNode, x: np.ndarray) -> np.ndarray:
+        # ONNX order: all begins, then all ends
+        pads = list(node.get_attr('pads', [0] * (2 * x.ndim)))
+        half = len(pads) // 2
+        widths = list(zip(pads[:half], pads[half:]))
+        widths = [(0, 0)] * (x.ndim - len(widths)) + widths
+        return np.pad(x, widths, constant_values=node.get_attr('value', 0.0))
+
+
+def run_graph(graph: IRGraph, inputs: Union[np.ndarray, Dict[str, np.ndarray]],
+              hooks: Optional[List[ActivationHook]] = None) -> Dict[str, np.ndarray]:
+    """
+    Convenience function to run a float graph on one batch
+    
+    Returns:
+        Graph outputs by tensor name
+    """
+    executor = ReferenceExecutor(graph)
+    for hook in hooks or ():
+        executor.add_hook(hook)
+    return executor.run(inputs)
@@ -0,0 +1,263 @@
+"""
+EdgeNPU Compiler - Pattern Rewrite Engine
+Declarative DAG pattern matching and worklist-driven graph rewriting
+
+Patterns are rooted at the last node of a chain and match upward through
+producers, e.g.
+    
+    Op(IROpType.BATCH_NORM,
+       Op({IROpType.CONV2D, IROpType.DEPTHWISE_CONV2D}, name='conv', single_use=True),
+       name='bn')
+
+The engine seeds a worklist with every node and, after each successful
+rewrite, only revisits the neighbours of the nodes involved. Removed nodes
+are hidden from matching immediately but deleted from the graph in a
+single batch at the end, so a full run is near-linear in graph size.
+"""
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+
+
+# =============================================================================
+# Patterns
+# =============================================================================
+
+class Match:
+    """Bindings produced by a successful pattern match"""
+    
+    def __init__(self):
+        self.nodes: Dict[str, IRNode] = {}
+        self.tensors: Dict[str, str] = {}
+        self.matched: List[IRNode] = []  # all matched nodes, root first
+    
+    def __getitem__(self, name: str):
+        if name in self.nodes:
+            return self.nodes[name]
+        return self.tensors[name]
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.nodes or name in self.tensors
+
+
+class Pattern(ABC):
+    """Base class for patterns matched against a tensor (an edge)"""
+    
+    name: Optional[str] = None
+    
+    @abstractmethod
+    def match_value(self, ctx: 'RewriteContext', tensor_name: str, m: Match) -> bool:
+        """Match pattern against the value flowing through tensor_name"""
+        pass
+
+
+class Const(Pattern):
+    """Matches a constant tensor (one with data)"""
+    
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+    
+    def match_value(self, ctx: 'RewriteContext', tensor_name: str, m: Match) -> bool:
+        tensor = ctx.graph.get_tensor(tensor_name)
+        if tensor is None or tensor.data is None:
+            return False
+        if self.name:
+            m.tensors[self.name] = tensor_name
+        return True
+
+
+class AnyValue(Pattern):
+    """Matches any tensor"""
+    
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+    
+    def match_value(self, ctx: 'RewriteContext', tensor_name: str, m: Match) -> bool:
+        if self.name:
+            m.tensors[self.name] = tensor_name
+        return True
+
+
+class Op(Pattern):
+    """
+    Matches a node by op type and (optionally) its inputs
+    
+    Args:
+        op_types: Op type or set of op types
+        *inputs: Patterns for the leading positional inputs
+        name: Binding name for the matched node
+        single_use: As an input pattern, require that the node's output
+            feeds only the consuming node
+        all_inputs: Pattern every input must match (e.g. Const())
+    """
+    
+    def __init__(self, op_types: Union[IROpType, Iterable[IROpType]],
+                 *inputs: Pattern, name: Optional[str] = None,
+                 single_use: bool = False,
+                 all_inputs: Optional[Pattern] = None):
+        if isinstance(op_types, IROpType):
+            op_types = {op_types}
+        self.op_types = frozenset(op_types)
+        self.inputs = list(inputs)
+        self.name = name
+        self.single_use = single_use
+        self.all_inputs = all_inputs
+    
+    def match_node(self, ctx: 'RewriteContext', node: IRNode, m: Match) -> bool:
+        """Match pattern against node"""
+        if node.op_type not in self.op_types:
+            return False
+        if len(node.inputs) < len(self.inputs):
+            return False
+        
+        for sub, inp in zip(self.inputs, node.inputs):
+            if not sub.match_value(ctx, inp, m):
+                return False
+        
+        if self.all_inputs is not None:
+            for inp in node.inputs:
+                if not self.all_inputs.match_value(ctx, inp, m):
+                    return False
+        
+        if self.name:
+            m.nodes[self.name] = node
+        m.matched.append(node)
+        return True
+    
+    def match_value(self, ctx: 'RewriteContext', tensor_name: str, m: Match) -> bool:
+        producers = ctx.producers(tensor_name)
+        if not producers:
+            return False
+        if self.single_use and len(ctx.consumers(tensor_name)) != 1:
+            return False
+        return self.match_node(ctx, producers[0], m)
+
+
+# =============================================================================
+# Rules
+# =============================================================================
+
+class RewriteRule(ABC):
+    """A pattern plus the rewrite applied to its matches"""
+    
+    name: str = "rewrite_rule"
+    pattern: Op = None
+    
+    @abstractmethod
+    def rewrite(self, ctx: 'RewriteContext', match: Match) -> bool:
+        """Apply rewrite, return True if the graph changed"""
+        pass
+
+
+class RewriteContext:
+    """Graph view handed to rules: live-node queries and batched removal"""
+    
+    def __init__(self, graph: IRGraph):
+        self.graph = graph
+        self.removed: List[IRNode] = []
+        self._dead: Set[int] = set()
+    
+    def is_dead(self, node: IRNode) -> bool:
+        return id(node) in self._dead
+    
+    def producers(self, tensor_name: str) -> List[IRNode]:
+        """Live producers of a tensor"""
+        return [n for n in self.graph.get_producers(tensor_name)
+                if id(n) not in self._dead]
+    
+    def consumers(self, tensor_name: str) -> List[IRNode]:
+        """Live consumers of a tensor"""
+        return [n for n in self.graph.get_consumers(tensor_name)
+                if id(n) not in self._dead]
+    
+    def remove(self, node: IRNode):
+        """Schedule node for removal (hidden from matching immediately)"""
+        if id(node) not in self._dead:
+            self._dead.add(id(node))
+            self.removed.append(node)
+    
+    def commit(self):
+        """Apply pending removals"""
+        self.graph.remove_nodes(self.removed)
+        self.removed = []
+        self._dead = set()
+
+
+class RewriteEngine:
+    """
+    Worklist-driven rewrite driver
+    """
+    
+    def __init__(self, rules: List[RewriteRule]):
+        self.rules = list(rules)
+        self.stats: Dict[str, int] = {}
+    
+    def run(self, graph: IRGraph) -> int:
+        """Rewrite graph to a fixed point, return number of rewrites"""
+        ctx = RewriteContext(graph)
+        self.stats = {rule.name: 0 for rule in self.rules}
+        
+        worklist = deque(graph.nodes)
+        queued = {id(n) for n in worklist}
+        total = 0
+        
+        # Removals are committed even if a rule raises, so rewired edges
+        # never point at nodes that should have been deleted
+        try:
+            while worklist:
+                node = worklist.popleft()
+                queued.discard(id(node))
+                if ctx.is_dead(node):
+                    continue
+                
+                for rule in self.rules:
+                    m = Match()
+                    if not rule.pattern.match_node(ctx, node, m):
+                        continue
+                    
+                    # Edges touched before the rewrite (it may rewire nodes)
+                    tensors = self._edges(m.matched)
+                    if not rule.rewrite(ctx, m):
+                        continue
+                    
+                    self.stats[rule.name] += 1
+                    total += 1
+                    
+                    # Revisit everything adjacent to the rewritten region
+                    tensors.update(self._edges(m.matched))
+                    for t in tensors:
+                        for n in ctx.producers(t) + ctx.consumers(t):
+                            if id(n) not in queued:
+                                queued.add(id(n))
+                                worklist.append(n)
+                    break
+        finally:
+            ctx.commit()
+        return total
+    
+    @staticmethod
+    def _edges(nodes: List[IRNode]) -> Dict[str, None]:
+        """Tensors adjacent to nodes (insertion ordered, for determinism)"""
+        tensors: Dict[str, None] = {}
+        for n in nodes:
+            tensors.update(dict.fromkeys(n.inputs))
+            tensors.update(dict.fromkeys(n.outputs))
+        return tensors
+
+
+def apply_rewrites(graph: IRGraph, rules: List[RewriteRule]) -> IRGraph:
+    """
+    Convenience function to run rewrite rules on a graph
+    
+    Args:
+        graph: IR graph
+        rules: Rewrite rules, tried in order on each node
+    
+    Returns:
+        Rewritten graph
+    """
+    RewriteEngine(rules).run(graph)
+    return graph
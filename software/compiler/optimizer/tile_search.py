@@ -0,0 +1,209 @@
+"""
+EdgeNPU Compiler - Tile Search
+Pick conv / FC tilings by scoring every candidate with the cost model
+
+Candidates span output/input channel tiles, output row/column tiles, the
+number of kernel taps folded into the PE rows and the loop order. Those
+that overflow the weight buffer half (double buffering), the accumulators
+or the activation buffer are dropped; the rest are scored in one
+vectorized CostModel call per layer.
+"""
+
+from typing import Dict, List, Optional
+import numpy as np
+
+from ..frontend.ir_builder import IRGraph, IRNode, IROpType
+from ..backend.cost_model import CostModel, HardwareConfig
+
+LOOP_ORDERS = ('oc', 'spatial')
+
+
+def _dim_candidates(n: int, unit: int, limit: int = 8) -> List[int]:
+    """Tile sizes for a dimension of n: multiples of unit, even splits and n itself"""
+    values = {min(n, unit * m) for m in range(1, -(-n // unit) + 1)}
+    values.update(-(-n // k) for k in range(1, min(n, limit) + 1))
+    values = sorted(values)
+    if len(values) > 2 * limit:
+        # Keep the largest sizes and a geometric spread of the rest
+        picks = np.unique(np.geomspace(1, len(values), 2 * limit).astype(int) - 1)
+        values = sorted({values[i] for i in picks} | set(values[-limit:]))
+    return values
+
+
+class TileSearch:
+    """
+    Cost-model-driven tiling of conv and FC layers
+    """
+    
+    def __init__(self, hardware: Optional[HardwareConfig] = None,
+                 weight_buf_kb: int = 256, act_buf_kb: int = 256,
+                 spatial_candidates: int = 8):
+        self.cost_model = CostModel(hardware=hardware)
+        self.hw = self.cost_model.hw
+        self.weight_budget = weight_buf_kb * 1024 // 2  # one half of the ping-pong buffer
+        self.act_budget = act_buf_kb * 1024
+        self.spatial_candidates = spatial_candidates
+        
+        # Repeated layer shapes reuse their search result
+        self._results: Dict[tuple, tuple] = {}
+        
+        self.tuned_nodes = 0
+        self.candidates = 0
+        self.baseline_cycles = 0
+        self.tuned_cycles = 0
+        self.macs = 0
+    
+    def _spatial(self, n: int) -> List[int]:
+        values = sorted({-(-n // k) for k in range(1, n + 1)})
+        if len(values) > self.spatial_candidates:
+            picks = np.linspace(0, len(values) - 1, self.spatial_candidates).round().astype(int)
+            values = sorted({values[i] for i in picks})
+        return values
+    
+    def search_conv(self, graph: IRGraph, node: IRNode) -> Optional[Dict]:
+        """Best tiling of a (non-grouped) Conv2D, or None if nothing fits"""
+        weight = graph.get_tensor(node.inputs[1])
+        output = graph.get_tensor(node.outputs[0])
+        if weight is None or output is None or len(weight.shape) != 4:
+            return None
+        
+        out_ch, in_ch, kh, kw = weight.shape
+        batch, _, out_h, out_w = output.shape
+        stride = node.get_attr('stride', (1, 1))[0]
+        taps = kh * kw
+        
+        key = ('conv', out_ch, in_ch, kh, kw, batch, out_h, out_w, stride)
+        if key in self._results:
+            return self._reuse(key)
+        
+        folds = list(range(1, min(taps, self.hw.pe_rows) + 1))
+        ic_values = set(_dim_candidates(in_ch, self.hw.pe_rows))
+        ic_values.update(min(in_ch, max(1, self.hw.pe_rows // f)) for f in folds)
+        
+        grid = np.meshgrid(
+            np.array(_dim_candidates(out_ch, self.hw.pe_cols)),
+            np.array(sorted(ic_values)),
+            np.array(self._spatial(out_h)),
+            np.array(self._spatial(out_w)),
+            np.array(folds),
+            np.array([False, True]),
+            indexing='ij'
+        )
+        tile_oc, tile_ic, tile_oh, tile_ow, fold, spatial_outer = (g.ravel() for g in grid)
+        
+        # Buffer limits: weight tile, partial sums, input window + output block
+        window = ((tile_oh - 1) * stride + kh) * ((tile_ow - 1) * stride + kw)
+        staged_ch = np.where(spatial_outer, in_ch, tile_ic)
+        fits = tile_oc * tile_ic * taps <= self.weight_budget
+        fits &= batch * tile_oh * tile_ow <= self.hw.acc_depth
+        fits &= window * staged_ch * fold + tile_oc * tile_oh * tile_ow * 4 <= self.act_budget
+        if not fits.any():
+            return None
+        
+        tile_oc, tile_ic, tile_oh, tile_ow, fold, spatial_outer = (
+            v[fits] for v in (tile_oc, tile_ic, tile_oh, tile_ow, fold, spatial_outer))
+        costs = self.cost_model.conv_tile_costs(in_ch, out_ch, out_h, out_w, kh, kw, stride,
+                                                tile_oc, tile_ic, tile_oh, tile_ow, fold,
+                                                spatial_outer, batch)
+        # Fewest cycles, then least overhead, then largest tiles
+        best = np.lexsort((-tile_oh * tile_ow, -tile_oc * tile_ic,
+                           costs['overhead'], costs['cycles']))[0]
+        
+        # Baseline: one PE array of channels per tile, row bands, no folding
+        band = max(1, min(out_h, self.hw.acc_depth // max(batch * out_w, 1)))
+        baseline = self.cost_model.conv_tile_costs(
+            in_ch, out_ch, out_h, out_w, kh, kw, stride,
+            min(out_ch, self.hw.pe_cols), min(in_ch, self.hw.pe_rows),
+            band, min(out_w, self.hw.acc_depth), 1, False, batch)['cycles']
+        return self._record(key, len(tile_oc), int(costs['cycles'][best]), int(baseline),
+                            batch * out_ch * in_ch * out_h * out_w * taps, {
+            'tile_oc': int(tile_oc[best]),
+            'tile_ic': int(tile_ic[best]),
+            'tile_oh': int(tile_oh[best]),
+            'tile_ow': int(tile_ow[best]),
+            'fold': int(fold[best]),
+            'loop_order': LOOP_ORDERS[int(spatial_outer[best])],
+            'cycles': int(costs['cycles'][best]),
+        })
+    
+    def search_fc(self, graph: IRGraph, node: IRNode) -> Optional[Dict]:
+        """Best tiling of a fully connected layer, or None if nothing fits"""
+        weight = graph.get_tensor(node.inputs[1])
+        output = graph.get_tensor(node.outputs[0])
+        if weight is None or output is None:
+            return None
+        
+        out_f, in_f = weight.shape[:2]
+        batch = max(output.size // max(out_f, 1), 1)
+        
+        key = ('fc', out_f, in_f, batch)
+        if key in self._results:
+            return self._reuse(key)
+        
+        grid = np.meshgrid(np.array(_dim_candidates(out_f, self.hw.pe_cols)),
+                           np.array(_dim_candidates(in_f, self.hw.pe_rows)),
+                           indexing='ij')
+        tile_out, tile_in = (g.ravel() for g in grid)
+        fits = tile_out * tile_in <= self.weight_budget
+        if not fits.any():
+            return None
+        
+        tile_out, tile_in = tile_out[fits], tile_in[fits]
+        costs = self.cost_model.fc_tile_costs(in_f, out_f, batch, tile_out, tile_in)
+        best = np.lexsort((-tile_out * tile_in, costs['overhead'], costs['cycles']))[0]
+        
+        baseline = self.cost_model.fc_tile_costs(in_f, out_f, batch,
+                                                 min(out_f, self.hw.pe_cols),
+                                                 min(in_f, self.hw.pe_rows))['cycles']
+        return self._record(key, len(tile_out), int(costs['cycles'][best]), int(baseline),
+                            batch * in_f * out_f, {
+            'tile_out': int(tile_out[best]),
+            'tile_in': int(tile_in[best]),
+            'cycles': int(costs['cycles'][best]),
+        })
+    
+    def _record(self, key: tuple, candidates: int, tuned: int, baseline: int,
+                macs: int, config: Dict) -> Dict:
+        self.candidates += candidates
+        self._results[key] = (tuned, baseline, macs, config)
+        return self._reuse(key)
+    
+    def _reuse(self, key: tuple) -> Dict:
+        tuned, baseline, macs, config = self._results[key]
+        self.tuned_nodes += 1
+        self.tuned_cycles += tuned
+        self.baseline_cycles += baseline
+        self.macs += macs
+        return dict(config)
+    
+    def get_stats(self) -> Dict:
+        """Get search statistics"""
+        pes = self.hw.pe_rows * self.hw.pe_cols
+        return {
+            'tuned_nodes': self.tuned_nodes,
+            'candidates': self.candidates,
+            'baseline_cycles': self.baseline_cycles,
+            'tuned_cycles': self.tuned_cycles,
+            'baseline_utilization': self.macs / (self.baseline_cycles * pes) if self.baseline_cycles else 0,
+            'tuned_utilization': self.macs / (self.tuned_cycles * pes) if self.tuned_cycles else 0,
+        }
+
+
+def tune_tiling(graph: IRGraph, hardware: Optional[HardwareConfig] = None,
+                weight_buf_kb: int = 256, act_buf_kb: int = 256) -> Dict:
+    """
+    Convenience function setting node.tile_config on every conv / FC
+    
+    Returns:
+        Search statistics
+    """
+    search = TileSearch(hardware, weight_buf_kb, act_buf_kb)
+    for node in graph.nodes:
+        config = None
+        if node.op_type == IROpType.CONV2D and node.get_attr('groups', 1) == 1:
+            config = search.search_conv(graph, node)
+        elif node.op_type == IROpType.FULLY_CONNECTED:
+            config = search.search_fc(graph, node)
+        if config is not None:
+            node.tile_config = config
+    return search.get_stats()
@@ -0,0 +1,279 @@
+"""
+EdgeNPU Compiler - Profiler
+Opt-in profiling of the compile pipeline with Chrome/Perfetto trace export
+
+Pipeline stages are wrapped in profile_stage(); while no profiler is
+active this is a no-op. When enabled, each stage records wall time, CPU
+time, peak traced memory (tracemalloc) and graph node/tensor counts, and
+the whole run can be saved as a Chrome trace (chrome://tracing, Perfetto).
+
+Usage:
+    with CompileProfiler() as prof:
+        compiler.compile(model_path)
+    prof.print_summary()
+    prof.save_trace('compile_trace.json')
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class StageRecord:
+    """Measurements for one profiled stage"""
+    name: str
+    category: str
+    depth: int
+    start_us: float
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    peak_mem_bytes: int = 0      # peak traced memory above the stage's start
+    mem_delta_bytes: int = 0     # traced memory retained at stage end
+    nodes_before: Optional[int] = None
+    nodes_after: Optional[int] = None
+    tensors_before: Optional[int] = None
+    tensors_after: Optional[int] = None
+    args: Dict[str, Any] = field(default_factory=dict)
+    
+    # Graph to count at exit (set by the stage body if not known at entry)
+    graph: Any = field(default=None, repr=False)
+
+
+class _NullStage:
+    """Stand-in record yielded while profiling is disabled"""
+    
+    __slots__ = ()
+    
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class CompileProfiler:
+    """
+    Collects stage records for one or more compiles
+    """
+    
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.records: List[StageRecord] = []
+        self._stack: List[StageRecord] = []
+        self._peaks: List[int] = []  # running peak per open stage
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+        self._previous: Optional['CompileProfiler'] = None
+    
+    # -------------------------------------------------------------------------
+    # Activation
+    # -------------------------------------------------------------------------
+    
+    def start(self):
+        """Make this the active profiler"""
+        global _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._previous = _active
+        _active = self
+    
+    def stop(self):
+        """Deactivate profiler"""
+        global _active
+        _active = self._previous
+        self._previous = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+    
+    def __enter__(self) -> 'CompileProfiler':
+        self.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    # -------------------------------------------------------------------------
+    # Recording
+    # -------------------------------------------------------------------------
+    
+    def _memory(self) -> Optional[tuple]:
+        if self.trace_memory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()
+        return None
+    
+    def _fold_peak(self) -> int:
+        """Fold the peak since the last reset into all open stages"""
+        mem = self._memory()
+        if mem is None:
+            return 0
+        peak = mem[1]
+        self._peaks = [max(p, peak) for p in self._peaks]
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return peak
+    
+    @contextmanager
+    def stage(self, name: str, graph: Any = None, category: str = 'stage', **args):
+        """Profile a block of code"""
+        self._fold_peak()
+        mem = self._memory()
+        start_mem = mem[0] if mem else 0
+        
+        record = StageRecord(
+            name=name,
+            category=category,
+            depth=len(self._stack),
+            start_us=(time.perf_counter() - self._origin) * 1e6,
+            args=dict(args),
+            graph=graph,
+        )
+        if graph is not None:
+            record.nodes_before = len(graph.nodes)
+            record.tensors_before = len(graph.tensors)
+        
+        self._stack.append(record)
+        self._peaks.append(start_mem)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_ms = (time.perf_counter() - wall_start) * 1000
+            record.cpu_ms = (time.process_time() - cpu_start) * 1000
+            
+            self._fold_peak()
+            peak = self._peaks.pop()
+            self._stack.pop()
+            mem = self._memory()
+            if mem is not None:
+                record.peak_mem_bytes = max(0, peak - start_mem)
+                record.mem_delta_bytes = mem[0] - start_mem
+            
+            if record.graph is not None:
+                record.nodes_after = len(record.graph.nodes)
+                record.tensors_after = len(record.graph.tensors)
+                if record.nodes_before is None:
+                    record.nodes_before = record.nodes_after
+                    record.tensors_before = record.tensors_after
+            record.graph = None
+            
+            self.records.append(record)
+    
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+    
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Build Chrome trace event JSON (complete + memory counter events)"""
+        pid = os.getpid()
+        tid = threading.get_ident() & 0xFFFFFFFF
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+            'args': {'name': 'edgenpu-compiler'},
+        }]
+        
+        for r in sorted(self.records, key=lambda r: (r.start_us, r.depth)):
+            args = {
+                'cpu_ms': round(r.cpu_ms, 3),
+                'peak_mem_bytes': r.peak_mem_bytes,
+                'mem_delta_bytes': r.mem_delta_bytes,
+            }
+            if r.nodes_after is not None:
+                args.update(nodes_before=r.nodes_before, nodes_after=r.nodes_after,
+                            tensors_before=r.tensors_before, tensors_after=r.tensors_after)
+            args.update(r.args)
+            
+            events.append({
+                'name': r.name,
+                'cat': r.category,
+                'ph': 'X',
+                'ts': round(r.start_us, 3),
+                'dur': round(r.wall_ms * 1000, 3),
+                'pid': pid,
+                'tid': tid,
+                'args': args,
+            })
+            if self.trace_memory:
+                events.append({
+                    'name': 'peak_mem',
+                    'ph': 'C',
+                    'ts': round(r.start_us + r.wall_ms * 1000, 3),
+                    'pid': pid,
+                    'args': {'bytes': r.peak_mem_bytes},
+                })
+        
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    
+    def save_trace(self, path: str):
+        """Write Chrome trace JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+    
+    def summary(self) -> str:
+        """Text table of stages in execution order"""
+        lines = [f"{'Stage':<40} {'Wall ms':>10} {'CPU ms':>10} {'Peak MB':>9} {'Nodes':>13}"]
+        for r in sorted(self.records, key=lambda r: (r.start_us, r.depth)):
+            name = "  " * r.depth + r.name
+            nodes = ""
+            if r.nodes_after is not None:
+                nodes = f"{r.nodes_before}->{r.nodes_after}"
+            lines.append(f"{name:<40} {r.wall_ms:>10.2f} {r.cpu_ms:>10.2f} "
+                         f"{r.peak_mem_bytes / 1e6:>9.2f} {nodes:>13}")
+        return "\n".join(lines)
+    
+    def print_summary(self):
+        """Print stage table"""
+        print("\nCompile Profile:")
+        print(self.summary())
+    
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get stage records as dictionaries"""
+        stats = []
+        for r in self.records:
+            stats.append({
+                'name': r.name,
+                'category': r.category,
+                'depth': r.depth,
+                'wall_ms': r.wall_ms,
+                'cpu_ms': r.cpu_ms,
+                'peak_mem_bytes': r.peak_mem_bytes,
+                'nodes_before': r.nodes_before,
+                'nodes_after': r.nodes_after,
+                'tensors_before': r.tensors_before,
+                'tensors_after': r.tensors_after,
+            })
+        return stats
+
+
+# Currently active profiler (None = profiling disabled)
+_active: Optional[CompileProfiler] = None
+
+
+def get_profiler() -> Optional[CompileProfiler]:
+    """Get the active profiler, if any"""
+    return _active
+
+
+@contextmanager
+def _null_stage():
+    yield _NULL_STAGE
+
+
+def profile_stage(name: str, graph: Any = None, category: str = 'stage', **args):
+    """
+    Context manager profiling a pipeline stage (no-op unless a profiler is active)
+    
+    Yields the stage record; set `.graph` on it to count nodes/tensors of a
+    graph that only exists once the stage has run.
+    """
+    if _active is None:
+        return _null_stage()
+    return _active.stage(name, graph=graph, category=category, **args)
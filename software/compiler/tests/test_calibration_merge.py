@@ -0,0 +1,39 @@
+"""
+Merging sharded calibration statistics must reproduce a serial pass
+"""
+
+import numpy as np
+import pytest
+
+from compiler.optimizer.calibration_stats import TensorStats
+
+
+def binned(stats: TensorStats) -> dict:
+    """Non-empty bins keyed by their position relative to zero"""
+    return {i - stats.neg: c for i, c in enumerate(stats.counts) if c}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_merge_matches_serial(seed):
+    rng = np.random.default_rng(seed)
+    batches = [rng.standard_normal(int(rng.integers(10, 2000))) * rng.uniform(0.01, 50)
+               + rng.uniform(-5, 5) for _ in range(int(rng.integers(2, 10)))]
+    if seed % 2:
+        batches = [np.maximum(batch, 0) for batch in batches]
+    
+    serial = TensorStats(256)
+    for batch in batches:
+        serial.update(batch)
+    
+    split = int(rng.integers(1, len(batches)))
+    merged, shard = TensorStats(256), TensorStats(256)
+    for batch in batches[:split]:
+        merged.update(batch)
+    for batch in batches[split:]:
+        shard.update(batch)
+    merged.merge(shard)
+    
+    assert merged.width == serial.width
+    assert binned(merged) == binned(serial)
+    assert merged.zeros == serial.zeros
+    assert merged.entropy_threshold(128) == serial.entropy_threshold(128)
@@ -0,0 +1,44 @@
+"""
+Mappings of rewritten weight files are replaced, not accumulated
+"""
+
+import gc
+import os
+import weakref
+import numpy as np
+
+from compiler.frontend.weight_store import WeightStore
+
+
+def test_rewritten_file_replaces_mapping(tmp_path):
+    path = tmp_path / "w.npy"
+    store = WeightStore()
+    stale = []
+    for i in range(20):
+        # Write and swap in a new file, as cache writers do
+        tmp = tmp_path / "w.tmp.npy"
+        np.save(tmp, np.full((64, 64), i, dtype=np.float32))
+        os.replace(tmp, path)
+        
+        weights = store.load_npy(path)
+        assert float(weights[0, 0]) == i
+        stale.append(weakref.ref(store.map_file(path)))
+        del weights
+    
+    assert len(store._maps) == 1
+    gc.collect()
+    assert sum(ref() is not None for ref in stale) == 1
+
+
+def test_live_view_outlives_replacement(tmp_path):
+    path = tmp_path / "w.npy"
+    np.save(path, np.arange(16, dtype=np.float32))
+    store = WeightStore()
+    old = store.load_npy(path)
+    
+    tmp = tmp_path / "w.tmp.npy"
+    np.save(tmp, np.zeros(16, dtype=np.float32))
+    os.replace(tmp, path)
+    
+    assert float(store.load_npy(path).sum()) == 0.0
+    assert np.array_equal(old, np.arange(16, dtype=np.float32))